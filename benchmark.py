@@ -0,0 +1,1881 @@
+"""
+Demo Notes - Benchmarks
+
+Benchmark and load-generation harness for the Demo Notes data layer, grid
+and exports. Every benchmark runs against a throwaway database in a
+temporary directory, so the real notes.db next to the application is never
+touched (only `seed` writes to a database you name explicitly).
+
+USAGE:
+======
+    python benchmark.py suite [--rows N] [--length-dist D] [--output results.json]
+    python benchmark.py compare baseline.json candidate.json [--threshold PCT]
+    python benchmark.py seed --db PATH [--rows N] [--length-dist D]
+    python benchmark.py connections [--ops N]
+    python benchmark.py search [--sizes 10000,100000,1000000] [--queries N]
+    python benchmark.py excel [--rows 1000000] [--skip-legacy]
+    python benchmark.py markdown [--rows 1000000]
+    python benchmark.py import [--rows 1000000]
+    python benchmark.py startup [--runs N] [--cli-budget S] [--gui-budget S]
+    python benchmark.py instrumentation [--rows N] [--ops N]
+    python benchmark.py writes [--writes N] [--synchronous full]
+    python benchmark.py cache [--rows N] [--ops N]
+    python benchmark.py sort [--rows 1000000] [--ops N]
+    python benchmark.py maintenance [--rows N] [--time-limit S]
+    python benchmark.py delta [--rows 1000000] [--changes N]
+    python benchmark.py bundle [--rows 1000000] [--formats xlsx,md,csv,jsonl] [--compress gz]
+    python benchmark.py batch [--rows N] [--batch N]
+    python benchmark.py concurrency [--processes N] [--seconds S] [--busy-timeout MS]
+    python benchmark.py api [--rows N] [--clients N] [--seconds S] [--workers 1,4]
+    python benchmark.py duplicates [--rows N] [--planted N] [--checks N]
+    python benchmark.py editor [--keys N] [--sizes 0,10000,1000000]
+    python benchmark.py memory [--rows 1000000] [--length-dist D]
+
+BENCHMARKS:
+===========
+- suite: the full run used to compare commits. Seeds a corpus, measures
+  CRUD/page/search latency percentiles, refresh_notes_grid and scrolling
+  wall time in a real Tk window (under Xvfb when there is no display), and
+  Excel/Markdown export throughput and peak RSS. Results are written as
+  JSON together with the git commit, Python and SQLite versions.
+- compare: print the change of every metric between two suite result files
+  and exit 1 if any got worse by more than the threshold
+- seed: fill a database with synthetic notes (for manual testing of the app)
+- connections: ops/sec of the pooled connection layer in main.py versus the
+  original open/close-per-call strategy, for insert/select/update/delete
+- search: FTS5 search_notes() latency versus a naive LIKE '%term%' scan at
+  several table sizes
+- excel: time and peak RSS of the streaming write-only Excel export versus
+  the original fetchall() + in-memory Workbook export
+- markdown: throughput of the chunked, buffered Markdown export (plain and
+  compressed) versus the original one-write-per-row export
+- import: bulk import_notes() throughput for each supported file format,
+  compared with one add_note() commit per note
+- startup: cold-start wall time of the headless CLI and time to first window
+  of the GUI; exits with status 1 when either exceeds its budget, so it can
+  be used as a startup regression check in CI
+- writes: a storm of note saves through the background writer (group
+  commit) versus one synchronous add_note() commit each, with the longest
+  time the Tk thread spends queueing or delivering results
+- cache: grid page reads and a Markdown export served from the in-memory
+  read cache versus SQLite, plus the cache's load time
+- sort: grid pages sorted by ID or note text and filtered by prefix, all
+  served by indexed SQL: first page (count + page), next page by keyset and
+  a jump to the middle by offset
+- maintenance: file size, free space, full scan and sorted page times
+  after heavy delete/update churn, then after the idle-time maintenance
+  (incremental vacuum) and after a full VACUUM; and an online backup while
+  another connection commits continuously, holding one read transaction
+  versus letting SQLite restart the stepped copy after each commit
+- delta: a full CSV export versus a delta export (changes since the last
+  export's watermark) after a day's worth of edits, inserts and deletes
+- bundle: writing several export formats (xlsx, Markdown, CSV, JSON Lines)
+  as one bundle, from a single scan with one writer thread per format or
+  without, versus one export (and one scan) per format
+- batch: deleting and find-and-replacing a selection of notes as one batch
+  (one transaction, executemany) versus one delete_note()/update_note()
+  commit per note
+- concurrency: multi-process stress test of a shared database. Worker
+  processes read pages, add, edit and delete notes and increment shared
+  counter notes by read-modify-write, first with optimistic versions and
+  then without. Reports throughput, latency, conflicts and lock errors,
+  checks integrity and counts lost updates; exits with status 1 if the
+  versioned run lost an update or the database is damaged
+- api: load test of `main.py serve`: keep-alive clients issue a mix of
+  page, get, search, update and add requests; requests/sec and latency
+  percentiles per request type for each read worker count, plus the
+  throughput of a streamed JSON Lines export
+- duplicates: building the MinHash/LSH duplicate index, the duplicate
+  report and the similar-note check on save, with how many planted exact
+  and near-duplicate copies the report groups with their original, versus
+  a pairwise word-set comparison against every note
+- editor: per-keystroke time in the note editor with the original
+  validation (copy the whole text and reconfigure the label on every key)
+  versus the <<Modified>>-driven, once-per-frame validation, for editors
+  already holding 0 to 1M characters, plus the cost of one check after a
+  large paste. Needs a display or Xvfb
+- memory: Python heap held by the loaded note set at 1M notes: the
+  original fetchall() list of tuples, the previous read cache (ID array
+  plus a list of interned strings) and the columnar store (ID array, text
+  offsets and one UTF-8 buffer), with load time and the cost of a page
+  read from each. Also shows what the grid keeps per visible row
+- instrumentation: cost of the @instrumented wrappers and timed connections
+  on get_note()/get_notes_page(), disabled and enabled, versus the bare
+  functions
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from array import array
+from datetime import datetime
+
+import main
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def use_temp_database(directory, name="bench_notes.db"):
+    """
+    Point main.DB_FILE at a fresh database inside directory and create the schema.
+
+    Args:
+        directory (str): Temporary directory that will hold the database
+        name (str, optional): Database file name
+
+    Returns:
+        str: Full path of the new database file
+    """
+    main.close_connection()
+    main.DB_FILE = os.path.join(directory, name)
+    success, error = main.init_database()
+    if not success:
+        raise SystemExit(f"Could not create benchmark database: {error}")
+    return main.DB_FILE
+
+def time_ops(label, func, count):
+    """
+    Call func(i) count times and print the throughput.
+
+    Args:
+        label (str): Name shown in the report
+        func (callable): Operation to run, receives the iteration index
+        count (int): Number of iterations
+
+    Returns:
+        float: Operations per second
+    """
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    elapsed = time.perf_counter() - start
+    ops = count / elapsed if elapsed else float("inf")
+    print(f"  {label:<28} {ops:>12,.0f} ops/sec  ({elapsed:.3f}s)")
+    return ops
+
+def make_vocabulary(rng, size=5000):
+    """Build a deterministic list of pseudo-words for synthetic notes."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10)))
+            for _ in range(size)]
+
+# Note length distributions for synthetic corpora, all capped below the
+# 255 character limit enforced by the editor and the importer
+LENGTH_DISTRIBUTIONS = ("uniform", "short", "normal", "long")
+
+def note_length(rng, distribution):
+    """
+    Draw a note length in characters from the named distribution.
+
+    - uniform: any length from 1 to the limit, equally likely
+    - short: mostly brief notes (exponential, mean 40 characters)
+    - normal: bell curve around 120 characters
+    - long: close to the limit (180 characters and up)
+    """
+    limit = main.NOTE_MAX_LENGTH - 1
+    if distribution == "short":
+        length = int(rng.expovariate(1 / 40)) + 1
+    elif distribution == "normal":
+        length = int(rng.gauss(120, 50))
+    elif distribution == "long":
+        length = rng.randint(180, limit)
+    else:
+        length = rng.randint(1, limit)
+    return max(1, min(limit, length))
+
+def make_note(rng, vocabulary, distribution):
+    """Build one synthetic note of words, trimmed to a drawn length."""
+    length = note_length(rng, distribution)
+    words = rng.choices(vocabulary, k=length // 6 + 1)
+    return " ".join(words)[:length].strip() or words[0][:length]
+
+def seed_notes(count, rng, vocabulary, distribution="uniform", batch_size=10000):
+    """
+    Insert count synthetic notes into main.DB_FILE in large transactions.
+
+    Args:
+        count (int): Notes to insert
+        rng (random.Random): Seeded generator, for reproducible corpora
+        vocabulary (list): Words to build notes from (see make_vocabulary)
+        distribution (str, optional): One of LENGTH_DISTRIBUTIONS
+        batch_size (int, optional): Notes per transaction
+    """
+    conn = main.get_connection()
+    remaining = count
+    while remaining:
+        batch = min(batch_size, remaining)
+        rows = [(make_note(rng, vocabulary, distribution),) for _ in range(batch)]
+        main.insert_notes_batch(conn, rows)
+        remaining -= batch
+
+def percentiles(samples):
+    """
+    Summarize durations in seconds as milliseconds.
+
+    Returns:
+        dict: count, mean, p50, p90, p99 and max (all in ms except count)
+    """
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+    return {"count": len(ordered), "mean": statistics.fmean(ordered) * 1000,
+            "p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+def time_calls(func, count):
+    """Call func(i) count times and return the per-call durations in seconds."""
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+# =============================================================================
+# CONNECTION STRATEGY BENCHMARK
+# =============================================================================
+
+def legacy_execute(sql, params=(), fetch=False):
+    """
+    Run one statement the way main.py did before connection pooling:
+    open the file, execute, commit, close.
+    """
+    conn = sqlite3.connect(main.DB_FILE)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall() if fetch else None
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+def bench_connections(args):
+    """Compare pooled connections against open/close per operation."""
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Connection strategy benchmark ({args.ops:,} ops per phase)")
+        print(f"  journal_mode={main.DB_JOURNAL_MODE} synchronous={main.DB_SYNCHRONOUS} "
+              f"cache_size={main.DB_CACHE_SIZE}")
+        results = {}
+
+        # Legacy strategy: default rollback journal, fresh connection per call
+        use_temp_database(directory, "legacy.db")
+        main.close_connection()
+        legacy_execute("PRAGMA journal_mode = DELETE", fetch=True)
+        print("open/close per call:")
+        results["legacy"] = [
+            time_ops("insert", lambda i: legacy_execute(
+                "INSERT INTO notes (note) VALUES (?)", (f"note {i}",)), args.ops),
+            time_ops("select by id", lambda i: legacy_execute(
+                "SELECT note_id, note FROM notes WHERE note_id = ?", (i + 1,), fetch=True), args.ops),
+            time_ops("update", lambda i: legacy_execute(
+                "UPDATE notes SET note = ? WHERE note_id = ?", (f"edited {i}", i + 1)), args.ops),
+            time_ops("delete", lambda i: legacy_execute(
+                "DELETE FROM notes WHERE note_id = ?", (i + 1,)), args.ops),
+        ]
+
+        # Pooled strategy: the real main.py functions
+        use_temp_database(directory, "pooled.db")
+        conn = main.get_connection()
+        print("pooled connection:")
+        results["pooled"] = [
+            time_ops("insert", lambda i: main.add_note(f"note {i}"), args.ops),
+            time_ops("select by id", lambda i: conn.execute(
+                "SELECT note_id, note FROM notes WHERE note_id = ?", (i + 1,)).fetchall(), args.ops),
+            time_ops("update", lambda i: main.update_note(i + 1, f"edited {i}"), args.ops),
+            time_ops("delete", lambda i: main.delete_note(i + 1), args.ops),
+        ]
+        main.close_connection()
+
+        print("speedup (pooled / legacy):")
+        for label, legacy, pooled in zip(("insert", "select by id", "update", "delete"),
+                                         results["legacy"], results["pooled"]):
+            print(f"  {label:<28} {pooled / legacy:>12.1f}x")
+
+# =============================================================================
+# SEARCH BENCHMARK
+# =============================================================================
+
+def bench_search(args):
+    """Compare FTS5 search latency with a LIKE scan as the table grows."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "search.db")
+        conn = main.get_connection()
+        seeded = 0
+        print(f"Search benchmark ({args.queries} queries per size, limit {main.SEARCH_RESULT_LIMIT})")
+        print(f"  {'rows':>10}  {'FTS median':>11} {'FTS p90':>9}  {'LIKE median':>12} {'LIKE p90':>9}")
+        for size in sizes:
+            # Grow the same database to each size instead of rebuilding it
+            seed_notes(size - seeded, rng, vocabulary)
+            seeded = size
+
+            # Mix of whole words and prefixes, common and rare
+            terms = [rng.choice(vocabulary)[:rng.randint(3, 6)] for _ in range(args.queries)]
+
+            fts_times = []
+            for term in terms:
+                start = time.perf_counter()
+                success, results = main.search_notes(term)
+                fts_times.append(time.perf_counter() - start)
+                if not success:
+                    raise SystemExit(f"Search failed: {results}")
+
+            like_times = []
+            for term in terms:
+                start = time.perf_counter()
+                conn.execute("SELECT note_id, note FROM notes WHERE note LIKE ? "
+                             "ORDER BY note_id LIMIT ?",
+                             (f"%{term}%", main.SEARCH_RESULT_LIMIT)).fetchall()
+                like_times.append(time.perf_counter() - start)
+
+            fts, like = percentiles(fts_times), percentiles(like_times)
+            print(f"  {size:>10,}  {fts['p50']:>9.2f}ms {fts['p90']:>7.2f}ms  "
+                  f"{like['p50']:>10.2f}ms {like['p90']:>7.2f}ms")
+        main.close_connection()
+
+# =============================================================================
+# EXCEL EXPORT BENCHMARK
+# Each strategy runs in a child process so its peak RSS is measured on its
+# own, not mixed with the seeding work done by the parent.
+# =============================================================================
+
+def peak_rss_mb():
+    """Return this process's peak resident set size in MiB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def legacy_excel_export(filename):
+    """The original export: fetchall() into a regular in-memory Workbook."""
+    import openpyxl
+    from datetime import datetime
+    success, notes = main.get_notes()
+    if not success:
+        raise SystemExit(f"Database error: {notes}")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Exported Notes"
+    ws.append(["Note ID", "Note", "Export Date"])
+    export_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for note_id, note_text in notes:
+        ws.append([note_id, note_text, export_time])
+    wb.save(filename)
+    return len(notes)
+
+def export_child(args):
+    """Run one export against an existing database and print its stats as JSON."""
+    main.DB_FILE = args.db
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if args.legacy:
+        rows = legacy_excel_export(args.output)
+    else:
+        success, rows = main.write_export_bundle([args.output])
+        if not success:
+            raise SystemExit(f"Export failed: {rows}")
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed,
+                      "baseline_mb": baseline, "peak_mb": peak_rss_mb(),
+                      "file_mb": os.path.getsize(args.output) / 2**20}))
+
+def run_export_child(db_path, output, legacy=False):
+    """Run export_child in a fresh Python process and return its stats dict."""
+    command = [sys.executable, os.path.abspath(__file__), "export-child",
+               "--db", db_path, "--output", output]
+    if legacy:
+        command.append("--legacy")
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"Export child failed: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+def bench_excel(args):
+    """Compare streaming and in-memory Excel export time and peak memory."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = use_temp_database(directory, "excel.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary)
+        main.close_connection()
+
+        strategies = ["stream"] if args.skip_legacy else ["stream", "legacy"]
+        print(f"Excel export benchmark ({args.rows:,} rows)")
+        for strategy in strategies:
+            result = run_export_child(db_path, os.path.join(directory, f"{strategy}.xlsx"),
+                                      legacy=strategy == "legacy")
+            print(f"  {strategy:<8} {result['seconds']:>8.2f}s  "
+                  f"{result['rows'] / result['seconds']:>10,.0f} rows/sec  "
+                  f"peak RSS {result['peak_mb']:>7.1f} MiB "
+                  f"(+{result['peak_mb'] - result['baseline_mb']:.1f} over startup)  "
+                  f"file {result['file_mb']:.1f} MiB")
+
+# =============================================================================
+# MARKDOWN EXPORT BENCHMARK
+# =============================================================================
+
+def legacy_markdown_export(filename):
+    """The original export: get_notes() then one f.write() per row."""
+    success, notes = main.get_notes()
+    if not success:
+        raise SystemExit(f"Database error: {notes}")
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("# Exported Notes\n\n")
+        f.write("| Note ID | Note |\n")
+        f.write("|---------|------|\n")
+        for note_id, note_text in notes:
+            escaped_note = note_text.replace("|", "\\|")
+            f.write(f"| {note_id} | {escaped_note} |\n")
+    return True, len(notes)
+
+def bench_markdown(args):
+    """Compare Markdown export strategies and output compression."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "markdown.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary)
+
+        cases = [("per-row writes", "legacy.md", legacy_markdown_export),
+                 ("chunked .md", "chunked.md", main.write_markdown_export),
+                 ("chunked .txt", "chunked.txt", main.write_markdown_export),
+                 ("chunked .md.gz", "chunked.md.gz", main.write_markdown_export),
+                 ("chunked .md.zst", "chunked.md.zst", main.write_markdown_export)]
+        print(f"Markdown export benchmark ({args.rows:,} rows)")
+        for label, name, export in cases:
+            filename = os.path.join(directory, name)
+            start = time.perf_counter()
+            success, rows = export(filename)
+            elapsed = time.perf_counter() - start
+            if not success:
+                print(f"  {label:<18} skipped: {rows}")
+                continue
+            size_mb = os.path.getsize(filename) / 2**20
+            print(f"  {label:<18} {elapsed:>7.2f}s  {rows / elapsed:>12,.0f} rows/sec  "
+                  f"{size_mb:>8.1f} MiB  ({size_mb / elapsed:.1f} MiB/s written)")
+        main.close_connection()
+
+# =============================================================================
+# IMPORT BENCHMARK
+# =============================================================================
+
+def bench_import(args):
+    """Measure bulk import throughput per format against per-note commits."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        # Build the source files from one seeded database
+        use_temp_database(directory, "source.db")
+        print(f"Seeding {args.rows:,} notes and writing source files...")
+        seed_notes(args.rows, rng, vocabulary)
+        sources = []
+        for name in ("notes.md", "notes.txt", "notes.md.gz"):
+            path = os.path.join(directory, name)
+            main.write_markdown_export(path)
+            sources.append(path)
+        csv_path = os.path.join(directory, "notes.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            import csv
+            writer = csv.writer(f)
+            writer.writerow(["Note ID", "Note"])
+            for chunk in main.iter_note_chunks():
+                writer.writerows(chunk)
+        sources.append(csv_path)
+        if args.rows <= main.EXCEL_MAX_ROWS:
+            xlsx_path = os.path.join(directory, "notes.xlsx")
+            main.write_excel_export(xlsx_path)
+            sources.append(xlsx_path)
+
+        print(f"Import benchmark ({args.rows:,} rows, batch size {main.IMPORT_BATCH_SIZE:,})")
+        for index, path in enumerate(sources):
+            use_temp_database(directory, f"import{index}.db")
+            success, result = main.import_notes(path)
+            if not success:
+                print(f"  {os.path.basename(path):<14} failed: {result}")
+                continue
+            rate = result["imported"] / result["seconds"]
+            print(f"  {os.path.basename(path):<14} {result['seconds']:>7.2f}s  "
+                  f"{rate:>10,.0f} rows/sec  ({rate * 60 / 1e6:.2f}M rows/min)")
+
+        # Baseline: what the dialog does, one commit per note (sampled)
+        use_temp_database(directory, "single.db")
+        sample = min(args.rows, 2000)
+        ops = time_ops(f"add_note x{sample}", lambda i: main.add_note(f"note {i}"), sample)
+        print(f"  one commit per note would take ~{args.rows / ops:,.0f}s for {args.rows:,} rows")
+        main.close_connection()
+
+# =============================================================================
+# STARTUP BENCHMARK / REGRESSION CHECK
+# =============================================================================
+
+def has_display():
+    """Return True if a Tk window can be opened in this environment."""
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+def bench_startup(args):
+    """Time cold starts and fail when they exceed the configured budgets."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    over_budget = False
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "startup.db")
+        rng = random.Random(42)
+        use_temp_database(directory, "startup.db")
+        seed_notes(args.notes, rng, make_vocabulary(rng))
+        main.close_connection()
+
+        cli_times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script, "--db", db_path, "list", "--limit", "1"],
+                           check=True, capture_output=True)
+            cli_times.append(time.perf_counter() - start)
+        cli_median = statistics.median(cli_times)
+        status = "OK" if cli_median <= args.cli_budget else "OVER BUDGET"
+        over_budget |= cli_median > args.cli_budget
+        print(f"CLI cold start (list --limit 1): median {cli_median * 1000:.0f} ms "
+              f"over {args.runs} runs, budget {args.cli_budget * 1000:.0f} ms  [{status}]")
+
+        if not has_display():
+            print("GUI time to first window: SKIPPED (no display available)")
+        else:
+            window_times = []
+            report = ""
+            for _ in range(args.runs):
+                report = subprocess.run(
+                    [sys.executable, script, "--db", db_path,
+                     "--startup-report", "--exit-after-startup"],
+                    check=True, capture_output=True, text=True).stderr
+                for line in report.splitlines():
+                    if "time to first window" in line:
+                        window_times.append(float(line.split("|")[1]) / 1000)
+            window_median = statistics.median(window_times)
+            status = "OK" if window_median <= args.gui_budget else "OVER BUDGET"
+            over_budget |= window_median > args.gui_budget
+            print(report.rstrip())
+            print(f"GUI time to first window: median {window_median * 1000:.0f} ms "
+                  f"over {args.runs} runs, budget {args.gui_budget * 1000:.0f} ms  [{status}]")
+
+    if over_budget:
+        raise SystemExit(1)
+
+# =============================================================================
+# WRITE STORM BENCHMARK
+# =============================================================================
+
+def bench_writes(args):
+    """Compare group-committed background writes with per-call commits."""
+    main.DB_SYNCHRONOUS = args.synchronous.upper()
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Write storm ({args.writes:,} note saves, synchronous={main.DB_SYNCHRONOUS})")
+        use_temp_database(directory, "sync.db")
+        time_ops("add_note (commit each)", lambda i: main.add_note(f"note {i}"), args.writes)
+        main.close_connection()
+
+        # Stand-in for the Tk event loop: after() callbacks run in order.
+        # Instrumentation is on to count the group commits.
+        use_temp_database(directory, "writer.db")
+        main.set_instrumentation(True, slow_ms=1000)
+        scheduled = []
+        widget = types.SimpleNamespace(after=lambda ms, callback: scheduled.append(callback))
+        results = []
+        longest = 0.0
+        start = time.perf_counter()
+        for i in range(args.writes):
+            began = time.perf_counter()
+            main.submit_write(widget, "add", (f"note {i}",), results.append)
+            longest = max(longest, time.perf_counter() - began)
+        while scheduled:
+            time.sleep(main.WRITE_POLL_MS / 1000)
+            began = time.perf_counter()
+            scheduled.pop(0)()
+            longest = max(longest, time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        failed = sum(not success for success, _ in results)
+        print(f"  {'background writer':<28} {args.writes / elapsed:>12,.0f} ops/sec  "
+              f"({elapsed:.3f}s, {failed} failed)")
+        print(f"  longest Tk-thread step {longest * 1000:.2f} ms (frame budget at 60 fps: 16.7 ms)")
+        stats = main.instrumentation_snapshot()["operations"].get("commit_write_batch")
+        if stats:
+            print(f"  {stats['calls']} group commits, {stats['rows'] / stats['calls']:.0f} writes each")
+        main.stop_writer()
+        main.set_instrumentation(False)
+        main.reset_instrumentation()
+        main.close_connection()
+
+# =============================================================================
+# READ CACHE BENCHMARK
+# =============================================================================
+
+def bench_cache(args):
+    """Compare reads served by the read cache with reads from SQLite."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "cache.db")
+        seed_notes(args.rows, rng, make_vocabulary(rng))
+        offsets = [rng.randint(0, args.rows - 40) for _ in range(args.ops)]
+        ids = [rng.randint(1, args.rows) for _ in range(args.ops)]
+        export_path = os.path.join(directory, "notes.md")
+
+        def refresh(i):
+            # What a grid refresh or a scrollbar jump reads
+            main.count_notes()
+            main.get_notes_page(40, offset=offsets[i])
+
+        print(f"Read cache benchmark ({args.rows:,} notes, {args.ops:,} calls each)")
+        for enabled in (False, True):
+            main.READ_CACHE_ENABLED = enabled
+            label = "cache" if enabled else "SQLite"
+            if enabled:
+                success, rows = main.load_note_cache()
+                stats = main.note_cache_stats()
+                print(f"  cache load: {rows:,} notes in {stats['load_ms']:.0f} ms "
+                      f"({(stats['id_bytes'] + stats['text_bytes']) / 2**20:.1f} MiB)")
+            time_ops(f"refresh page ({label})", refresh, args.ops)
+            time_ops(f"keyset page ({label})",
+                     lambda i: main.get_notes_page(40, after_id=ids[i]), args.ops)
+            start = time.perf_counter()
+            main.write_markdown_export(export_path)
+            print(f"  {'markdown export (' + label + ')':<28} {time.perf_counter() - start:>9.3f}s")
+        stats = main.note_cache_stats()
+        print(f"  cache hits {stats['hits']:,}, misses {stats['misses']:,}")
+        main.READ_CACHE_ENABLED = False
+        main.close_note_cache()
+        main.close_connection()
+
+# =============================================================================
+# MEMORY FOOTPRINT BENCHMARK
+# =============================================================================
+
+def load_tuples():
+    """The original get_notes(): every note as a (note_id, note) tuple."""
+    cursor = main.get_connection().cursor()
+    cursor.execute("SELECT note_id, note FROM notes ORDER BY note_id")
+    return cursor.fetchall()
+
+def load_interned_columns():
+    """The previous read cache layout: an ID array and a list of interned strings."""
+    ids, texts = array("q"), []
+    for chunk in main.iter_note_chunks():
+        ids.extend([row[0] for row in chunk])
+        texts.extend([sys.intern(row[1]) for row in chunk])
+    return ids, texts
+
+def load_compact_store():
+    """The current read cache: ID array, text offsets and one UTF-8 buffer."""
+    main.READ_CACHE_ENABLED = True
+    success, rows = main.load_note_cache()
+    if not success:
+        raise SystemExit(f"Cache load failed: {rows}")
+    return main.note_cache_snapshot()
+
+def bench_memory(args):
+    """Measure the memory held by each in-process representation of the notes."""
+    import tracemalloc
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "memory.db")
+        print(f"Seeding {args.rows:,} notes ({args.length_dist} lengths)...")
+        seed_notes(args.rows, rng, make_vocabulary(rng), args.length_dist)
+        text_bytes = main.get_connection().execute(
+            "SELECT SUM(length(CAST(note AS BLOB))) FROM notes").fetchone()[0]
+        print(f"Memory footprint benchmark ({args.rows:,} notes, {text_bytes / 2**20:.1f} MiB of UTF-8 text)")
+        print(f"  {'representation':<30} {'held MiB':>9} {'peak MiB':>9} {'bytes/note':>10} "
+              f"{'load s':>7} {'page ms':>8}")
+        cases = [("fetchall() tuples", load_tuples,
+                  lambda rows, start: rows[start:start + 40]),
+                 ("ID array + interned strings", load_interned_columns,
+                  lambda cached, start: list(zip(cached[0][start:start + 40],
+                                                 cached[1][start:start + 40]))),
+                 ("columnar UTF-8 store", load_compact_store,
+                  lambda cached, start: main.cached_rows(cached, start, start + 40))]
+        for label, load, page in cases:
+            # Sized under tracemalloc first (interned strings are immortal
+            # since Python 3.12, so a second interned load would allocate
+            # nothing), then timed again without tracing, which slows
+            # allocation-heavy loads unevenly
+            tracemalloc.start()
+            loaded = load()
+            held, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del loaded
+            start = time.perf_counter()
+            loaded = load()
+            elapsed = time.perf_counter() - start
+            starts = [rng.randrange(args.rows - 40) for _ in range(1000)]
+            page_ms = statistics.median(time_calls(lambda i: page(loaded, starts[i]), 1000)) * 1000
+            print(f"  {label:<30} {held / 2**20:>9.1f} {peak / 2**20:>9.1f} "
+                  f"{held / args.rows:>10.1f} {elapsed:>7.2f} {page_ms:>8.4f}")
+            del loaded
+        main.close_note_cache()
+        main.READ_CACHE_ENABLED = False
+
+        longest = main.get_connection().execute("SELECT MAX(length(note)) FROM notes").fetchone()[0]
+        print(f"  grid: only the visible rows plus {main.GRID_OVERSCAN} are materialized, each "
+              f"with at most {main.GRID_TEXT_CHARS} of the note's characters (longest note: {longest})")
+        main.close_connection()
+
+# =============================================================================
+# SORT AND FILTER BENCHMARK
+# =============================================================================
+
+def bench_sort(args):
+    """Time grid pages for each sort order and a few prefix filters."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "sort.db")
+        vocabulary = make_vocabulary(rng)
+        seed_notes(args.rows, rng, vocabulary)
+        prefixes = ["", vocabulary[0][:1], vocabulary[1][:3], "zzzz"]
+        views = [{"sort": sort, "descending": descending, "prefix": prefix}
+                 for sort in ("id", "note") for descending in (False, True) for prefix in prefixes]
+
+        print(f"Sort/filter benchmark ({args.rows:,} notes, median of {args.ops} runs, ms)")
+        print(f"  {'view':<26} {'matches':>9} {'first page':>11} {'next page':>10} {'jump':>8}")
+        for view in views:
+            first, following, jump = [], [], []
+            total = main.count_notes(view["prefix"])[1]
+            for _ in range(args.ops):
+                start = time.perf_counter()
+                main.count_notes(view["prefix"])
+                success, page = main.get_notes_page(40, view=view)
+                first.append(time.perf_counter() - start)
+                if page:
+                    start = time.perf_counter()
+                    main.get_notes_page(40, after_id=page[-1][0], view=view)
+                    following.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                main.get_notes_page(40, offset=total // 2, view=view)
+                jump.append(time.perf_counter() - start)
+            label = f"{view['sort']} {'desc' if view['descending'] else 'asc'} {view['prefix']!r}"
+            next_ms = f"{statistics.median(following) * 1000:>10.3f}" if following else f"{'-':>10}"
+            print(f"  {label:<26} {total:>9,} {statistics.median(first) * 1000:>11.3f} "
+                  f"{next_ms} {statistics.median(jump) * 1000:>8.3f}")
+        main.close_connection()
+
+# =============================================================================
+# MAINTENANCE BENCHMARK
+# =============================================================================
+
+def churn_notes(rng, vocabulary, rows):
+    """Delete half of the notes at random and rewrite a quarter of the rest."""
+    ids = list(range(1, rows + 1))
+    rng.shuffle(ids)
+    deleted = ids[:rows // 2]
+    for start in range(0, len(deleted), 10000):
+        main.delete_notes(deleted[start:start + 10000])
+    conn = main.get_connection()
+    conn.executemany("UPDATE notes SET note = ? WHERE note_id = ?",
+                     [(make_note(rng, vocabulary, "long"), note_id) for note_id in ids[rows // 2:rows * 5 // 8]])
+    conn.commit()
+
+def measure_reads():
+    """Return (seconds to stream every note, seconds for 200 random grid pages)."""
+    start = time.perf_counter()
+    for chunk in main.iter_note_chunks():
+        pass
+    scan = time.perf_counter() - start
+    success, total = main.count_notes()
+    rng = random.Random(7)
+    view = {"sort": "note", "descending": False, "prefix": ""}
+    start = time.perf_counter()
+    for _ in range(200):
+        main.get_notes_page(50, offset=rng.randrange(max(total - 50, 1)), view=view)
+    return scan, time.perf_counter() - start
+
+def backup_under_writes(source, filename, pinned, time_limit):
+    """
+    Back up source while another connection commits inserts as fast as it can.
+
+    Returns:
+        dict: seconds, steps, finished, writes during the backup and the
+              writer's longest commit in ms
+    """
+    stop = threading.Event()
+    latencies = []
+
+    def writer():
+        conn = sqlite3.connect(source, timeout=5)
+        while not stop.is_set():
+            start = time.perf_counter()
+            conn.execute("INSERT INTO notes (note) VALUES ('backup benchmark')")
+            conn.commit()
+            latencies.append(time.perf_counter() - start)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.1)
+    latencies.clear()
+    steps = [0]
+    start = time.perf_counter()
+    if pinned:
+        def progress(value):
+            steps[0] += 1
+        success, result = main.backup_database(filename, progress)
+        finished = success
+    else:
+        # The stepped backup without a read transaction held open, which
+        # SQLite restarts whenever the writer commits
+        def on_step(status, remaining, total):
+            steps[0] += 1
+            if time.perf_counter() - start > time_limit:
+                raise TimeoutError
+        conn = sqlite3.connect(source)
+        target = sqlite3.connect(filename)
+        try:
+            conn.backup(target, pages=main.BACKUP_STEP_PAGES, progress=on_step)
+            finished = True
+        except TimeoutError:
+            finished = False
+        target.close()
+        conn.close()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return {"seconds": elapsed, "steps": steps[0], "finished": finished, "writes": len(latencies),
+            "max_commit_ms": max(latencies, default=0) * 1000}
+
+def bench_maintenance(args):
+    """Database size and read speed after churn, before and after maintenance; backups under load."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = use_temp_database(directory, "maintenance.db")
+        print(f"Seeding {args.rows:,} notes, then deleting half and rewriting a quarter of the rest...")
+        seed_notes(args.rows, rng, vocabulary)
+        churn_notes(rng, vocabulary, args.rows)
+
+        print(f"Maintenance benchmark ({args.rows:,} notes seeded)")
+        print(f"  {'state':<24} {'file MiB':>9} {'free MiB':>9} {'scan s':>8} {'200 pages s':>12}  run")
+        for label, vacuum in (("after churn", None), ("incremental vacuum", "incremental"),
+                              ("full VACUUM", "full")):
+            run = ""
+            if vacuum:
+                success, summary = main.run_maintenance(vacuum="full" if vacuum == "full" else None)
+                if not success:
+                    raise SystemExit(f"Maintenance failed: {summary}")
+                run = main.format_maintenance_summary(summary)
+            success, stats = main.get_database_stats()
+            scan, pages = measure_reads()
+            print(f"  {label:<24} {stats['file_bytes'] / 2**20:>9.1f} {stats['free_bytes'] / 2**20:>9.1f} "
+                  f"{scan:>8.3f} {pages:>12.3f}  {run}")
+        main.close_connection()
+
+        print(f"Online backup while another connection commits continuously")
+        for label, pinned in (("read transaction held", True), ("restarting steps", False)):
+            result = backup_under_writes(db_path, os.path.join(directory, f"backup_{pinned}.db"),
+                                         pinned, args.time_limit)
+            state = (f"{result['seconds']:.2f}s" if result["finished"]
+                     else f"not finished after {result['seconds']:.0f}s")
+            print(f"  {label:<24} {state:<26} {result['steps']:>7,} steps  "
+                  f"{result['writes']:>8,} commits meanwhile, longest {result['max_commit_ms']:.1f} ms")
+        main.close_connection()
+
+# =============================================================================
+# DELTA EXPORT BENCHMARK
+# =============================================================================
+
+def bench_delta(args):
+    """Compare a full export with a delta export after a batch of changes."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "delta.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary)
+        filename = os.path.join(directory, "delta.csv")
+        # No overlap window, so the delta holds only the changes made below
+        main.DELTA_EXPORT_OVERLAP_MS = 0
+
+        start = time.perf_counter()
+        success, rows = main.write_delta_export(filename, target="bench", full=True)
+        full_elapsed = time.perf_counter() - start
+        full_mb = os.path.getsize(filename) / 2**20
+        time.sleep(0.01)
+
+        ids = rng.sample(range(1, args.rows + 1), args.changes)
+        third = args.changes // 3
+        for note_id in ids[:third]:
+            main.update_note(note_id, make_note(rng, vocabulary, "uniform"))
+        for note_id in ids[third:2 * third]:
+            main.delete_note(note_id)
+        for _ in range(args.changes - 2 * third):
+            main.add_note(make_note(rng, vocabulary, "uniform"))
+
+        start = time.perf_counter()
+        success, delta_rows = main.write_delta_export(filename, target="bench")
+        delta_elapsed = time.perf_counter() - start
+        delta_mb = os.path.getsize(filename) / 2**20
+        if not success:
+            print(f"Delta export failed: {delta_rows}")
+            return
+
+        print(f"Delta export benchmark ({args.rows:,} notes, {args.changes:,} changes)")
+        print(f"  {'full export':<14} {full_elapsed:>8.3f}s  {rows:>10,} rows  {full_mb:>8.1f} MiB")
+        print(f"  {'delta export':<14} {delta_elapsed:>8.3f}s  {delta_rows:>10,} rows  {delta_mb:>8.2f} MiB")
+        print(f"  speedup: {full_elapsed / delta_elapsed:.0f}x")
+        main.close_connection()
+
+def bench_bundle(args):
+    """Compare one export per format with a single-scan bundle, sequential and threaded."""
+    kinds = args.formats.split(",")
+    try:
+        import openpyxl
+    except ImportError:
+        if "xlsx" in kinds:
+            print("openpyxl is not installed: leaving out xlsx")
+            kinds.remove("xlsx")
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "bundle.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary)
+        suffix = f".{args.compress}" if args.compress else ""
+        filenames = [os.path.join(directory, f"bundle.{kind}") + (suffix if kind != "xlsx" else "")
+                     for kind in kinds]
+
+        def separate():
+            for filename in filenames:
+                success, rows = main.write_export_bundle([filename])
+                if not success:
+                    raise SystemExit(f"Export failed: {rows}")
+
+        def bundle(parallel):
+            success, rows = main.write_export_bundle(filenames, parallel=parallel)
+            if not success:
+                raise SystemExit(f"Export failed: {rows}")
+
+        cases = [("one export per format", len(filenames), separate),
+                 ("bundle, one thread", 1, lambda: bundle(False)),
+                 ("bundle, writer threads", 1, lambda: bundle(True))]
+        print(f"Export bundle benchmark ({args.rows:,} rows; {', '.join(os.path.basename(f) for f in filenames)})")
+        elapsed = {}
+        for label, scans, func in cases:
+            start = time.perf_counter()
+            func()
+            elapsed[label] = time.perf_counter() - start
+            print(f"  {label:<24} {elapsed[label]:>8.2f}s  {scans} scan(s)  "
+                  f"{args.rows / elapsed[label]:>10,.0f} rows/sec")
+        size_mb = sum(os.path.getsize(filename) for filename in filenames) / 2**20
+        print(f"  {size_mb:.1f} MiB written per run; bundle speedup "
+              f"{elapsed[cases[0][0]] / min(elapsed[cases[1][0]], elapsed[cases[2][0]]):.2f}x")
+        main.close_connection()
+
+# =============================================================================
+# BATCH OPERATIONS BENCHMARK
+# =============================================================================
+
+def bench_batch(args):
+    """Compare batch delete/replace with one commit per note."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "batch.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary, "short")
+        ids = rng.sample(range(1, args.rows + 1), 4 * args.batch)
+        selections = [sorted(ids[i * args.batch:(i + 1) * args.batch]) for i in range(4)]
+
+        def replace_each(note_ids):
+            for note_id in note_ids:
+                success, note = main.get_note(note_id)
+                main.update_note(note_id, note[1] + " (edited)")
+
+        def delete_each(note_ids):
+            for note_id in note_ids:
+                main.delete_note(note_id)
+
+        cases = [("replace", "per note", lambda: replace_each(selections[0])),
+                 ("replace", "batch", lambda: main.replace_in_notes(" ", "  ", selections[1])),
+                 ("delete", "per note", lambda: delete_each(selections[2])),
+                 ("delete", "batch", lambda: main.delete_notes(selections[3]))]
+        print(f"Batch operations benchmark ({args.rows:,} notes, {args.batch:,} selected)")
+        elapsed = {}
+        for operation, strategy, func in cases:
+            start = time.perf_counter()
+            func()
+            elapsed[operation, strategy] = time.perf_counter() - start
+            print(f"  {operation:<8} {strategy:<9} {elapsed[operation, strategy]:>8.3f}s  "
+                  f"{args.batch / elapsed[operation, strategy]:>12,.0f} notes/sec")
+        for operation in ("replace", "delete"):
+            print(f"  {operation} speedup: "
+                  f"{elapsed[operation, 'per note'] / elapsed[operation, 'batch']:.0f}x")
+        main.close_connection()
+
+# =============================================================================
+# MULTI-PROCESS CONCURRENCY STRESS TEST
+# =============================================================================
+
+# Operation mix of each stress worker: (operation, weight)
+STRESS_MIX = [("read", 40), ("add", 15), ("update", 15), ("delete", 5), ("increment", 25)]
+
+def stress_child(args):
+    """Run one stress worker against a shared database and print its stats as JSON."""
+    main.DB_FILE = args.db
+    main.DB_BUSY_TIMEOUT_MS = args.busy_timeout
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, 500)
+    counter_ids = [int(note_id) for note_id in args.counter_ids.split(",")]
+    operations, weights = zip(*STRESS_MIX)
+    latencies = {operation: [] for operation in operations}
+    stats = {"increments": 0, "conflicts": 0, "locked": 0, "errors": 0,
+             "added": 0, "deleted": 0, "error_samples": []}
+    own_ids = []
+
+    def record_error(error):
+        if main.is_conflict_error(error):
+            stats["conflicts"] += 1
+        elif main.is_locked_error(error):
+            stats["locked"] += 1
+        else:
+            stats["errors"] += 1
+            if len(stats["error_samples"]) < 5:
+                stats["error_samples"].append(error)
+
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        start = time.perf_counter()
+        if operation == "read":
+            success, result = main.get_notes_page(40, after_id=rng.randint(0, args.rows))
+        elif operation == "add":
+            success, result = main.add_note(make_note(rng, vocabulary, "short"))
+            if success:
+                own_ids.append(result[0])
+                stats["added"] += 1
+        elif operation == "update":
+            success, result = main.update_note(rng.randint(1, args.rows),
+                                               make_note(rng, vocabulary, "short"))
+        elif operation == "delete":
+            if not own_ids:
+                continue
+            # Only notes this worker added, so the final row count is exact
+            success, result = main.delete_note(own_ids.pop(rng.randrange(len(own_ids))))
+            if success:
+                stats["deleted"] += 1
+        else:
+            # Read-modify-write of a shared counter: retry until the write
+            # lands; without versions concurrent increments overwrite each other
+            counter_id = rng.choice(counter_ids)
+            while True:
+                success, result = main.get_note(counter_id)
+                if not success:
+                    break
+                note_id, note_text, version = result
+                value = int(note_text.split()[1]) + 1
+                success, result = main.update_note(note_id, f"counter {value}",
+                                                   None if args.naive else version)
+                if success:
+                    stats["increments"] += 1
+                    break
+                record_error(result)
+                if not main.is_conflict_error(result):
+                    break
+        if success:
+            latencies[operation].append(time.perf_counter() - start)
+        elif operation != "increment":
+            record_error(result)
+    main.close_connection()
+    stats["latencies"] = latencies
+    print(json.dumps(stats))
+
+def run_stress(db_path, processes, seconds, rows, counter_ids, busy_timeout, naive):
+    """
+    Run stress_child in several processes at once and merge their stats.
+
+    Returns:
+        dict: Summed counters plus "latencies" (operation -> list of seconds)
+    """
+    children = []
+    for seed in range(processes):
+        command = [sys.executable, os.path.abspath(__file__), "stress-child", "--db", db_path,
+                   "--seconds", str(seconds), "--rows", str(rows), "--seed", str(seed),
+                   "--counter-ids", ",".join(map(str, counter_ids)),
+                   "--busy-timeout", str(busy_timeout)]
+        if naive:
+            command.append("--naive")
+        children.append(subprocess.Popen(command, stdout=subprocess.PIPE, text=True))
+    merged = {"latencies": {operation: [] for operation, _ in STRESS_MIX}, "error_samples": []}
+    for child in children:
+        output, _ = child.communicate()
+        if child.returncode != 0:
+            raise SystemExit(f"Stress worker failed with exit code {child.returncode}")
+        stats = json.loads(output)
+        for key, value in stats.items():
+            if key == "latencies":
+                for operation, samples in value.items():
+                    merged["latencies"][operation].extend(samples)
+            elif key == "error_samples":
+                merged["error_samples"].extend(value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+def check_shared_database(counter_ids):
+    """
+    Verify the database after a stress run.
+
+    Returns:
+        dict: integrity (str), fts_ok (bool), notes (int) and counter_total (int)
+    """
+    conn = main.get_connection()
+    integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    try:
+        conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('integrity-check')")
+        fts_ok = True
+    except sqlite3.DatabaseError:
+        fts_ok = False
+    notes = conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+    counter_total = sum(int(main.get_note(note_id)[1][1].split()[1]) for note_id in counter_ids)
+    return {"integrity": integrity, "fts_ok": fts_ok, "notes": notes,
+            "counter_total": counter_total}
+
+def bench_concurrency(args):
+    """Stress a shared database from several processes and check for lost updates."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for naive in (False, True):
+            db_path = use_temp_database(directory, f"shared_{'naive' if naive else 'versioned'}.db")
+            seed_notes(args.rows, rng, vocabulary, "short")
+            counter_ids = [main.add_note("counter 0")[1][0] for _ in range(args.counters)]
+            main.close_connection()
+
+            stats = run_stress(db_path, args.processes, args.seconds, args.rows, counter_ids,
+                               args.busy_timeout, naive)
+            check = check_shared_database(counter_ids)
+            expected_notes = args.rows + args.counters + stats["added"] - stats["deleted"]
+            lost = stats["increments"] - check["counter_total"]
+            total_ops = sum(len(samples) for samples in stats["latencies"].values())
+
+            label = "without versions (last write wins)" if naive else "optimistic versions"
+            print(f"Concurrency stress: {args.processes} processes x {args.seconds:g}s, {label}")
+            print(f"  {'operation':<10} {'ops':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+            for operation, samples in stats["latencies"].items():
+                if samples:
+                    summary = percentiles(samples)
+                    print(f"  {operation:<10} {summary['count']:>8,} {summary['p50']:>9.2f} "
+                          f"{summary['p99']:>9.2f} {summary['max']:>9.2f}")
+            print(f"  throughput: {total_ops / args.seconds:,.0f} ops/sec")
+            print(f"  version conflicts (retried): {stats['conflicts']:,}  "
+                  f"lock timeouts: {stats['locked']:,}  other errors: {stats['errors']:,}")
+            for error in stats["error_samples"]:
+                print(f"    {error}")
+            print(f"  lost counter updates: {lost:,} of {stats['increments']:,}")
+            print(f"  integrity: {check['integrity']}, FTS index {'ok' if check['fts_ok'] else 'CORRUPT'}, "
+                  f"notes {check['notes']:,} (expected {expected_notes:,})")
+            main.close_connection()
+            if not naive and (lost or check["integrity"] != "ok" or not check["fts_ok"]
+                              or check["notes"] != expected_notes or stats["errors"]):
+                failed = True
+    if failed:
+        print("FAILED: the versioned run lost updates or left the database inconsistent")
+        raise SystemExit(1)
+
+# =============================================================================
+# HTTP API LOAD TEST
+# =============================================================================
+
+# Request mix of the load test clients: (operation, weight)
+API_MIX = [("page", 50), ("get", 25), ("search", 10), ("update", 10), ("add", 5)]
+
+def start_api_server(db_path, workers):
+    """Start `main.py serve` on a free port in a new process; return (process, port)."""
+    process = subprocess.Popen([sys.executable, os.path.abspath(main.__file__), "--db", db_path,
+                                "serve", "--port", "0", "--workers", str(workers)],
+                               stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    match = re.search(r"http://[^:]+:(\d+)/", line)
+    if not match:
+        process.kill()
+        raise SystemExit(f"API server did not start: {line}{process.stderr.read()}")
+    return process, int(match.group(1))
+
+async def api_call(reader, writer, method, path, body=None):
+    """Send one keep-alive request and return (status, body bytes); reads chunked bodies too."""
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(data)}\r\n"
+    if body is not None:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while True:
+            size = int(await reader.readline(), 16)
+            parts.append(await reader.readexactly(size + 2))
+            if not size:
+                break
+        return status, b"".join(part[:-2] for part in parts)
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+async def api_client(port, seconds, rows, vocabulary, seed, latencies, errors):
+    """One keep-alive client issuing the API_MIX of requests until seconds have passed."""
+    import asyncio
+    rng = random.Random(seed)
+    operations, weights = zip(*API_MIX)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        note_id = rng.randint(1, rows)
+        if operation == "page":
+            request = ("GET", f"/notes?limit=50&cursor={note_id}")
+        elif operation == "get":
+            request = ("GET", f"/notes/{note_id}")
+        elif operation == "search":
+            request = ("GET", f"/search?q={rng.choice(vocabulary)[:3]}&limit=20")
+        elif operation == "update":
+            request = ("PUT", f"/notes/{note_id}", {"note": make_note(rng, vocabulary, "short")})
+        else:
+            request = ("POST", "/notes", {"note": make_note(rng, vocabulary, "short")})
+        start = time.perf_counter()
+        status, body = await api_call(reader, writer, *request)
+        latencies[operation].append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(f"{request[0]} {request[1]}: {status} {body[:100]!r}")
+    writer.close()
+
+def run_api_load(port, clients, seconds, rows, vocabulary):
+    """Run the load test clients concurrently; return their latencies per operation and errors."""
+    import asyncio
+    latencies = {operation: [] for operation, weight in API_MIX}
+    errors = []
+
+    async def run_clients():
+        await asyncio.gather(*[api_client(port, seconds, rows, vocabulary, seed, latencies, errors)
+                               for seed in range(clients)])
+
+    asyncio.run(run_clients())
+    return latencies, errors
+
+def bench_api(args):
+    """Load test the HTTP API: requests/sec and latency percentiles per request type."""
+    import asyncio
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = use_temp_database(directory, "api.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary, "short")
+        main.close_connection()
+
+        for workers in [int(count) for count in args.workers.split(",")]:
+            process, port = start_api_server(db_path, workers)
+            try:
+                latencies, errors = run_api_load(port, args.clients, args.seconds, args.rows, vocabulary)
+
+                async def export():
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    start = time.perf_counter()
+                    status, body = await api_call(reader, writer, "GET", "/export?format=jsonl")
+                    writer.close()
+                    return time.perf_counter() - start, body
+
+                export_seconds, body = asyncio.run(export())
+            finally:
+                process.send_signal(signal.SIGINT)
+                process.wait(timeout=30)
+
+            total = sum(len(samples) for samples in latencies.values())
+            print(f"HTTP API load test: {args.clients} keep-alive clients x {args.seconds:g}s, "
+                  f"{workers} read worker(s)")
+            print(f"  {'request':<8} {'count':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+            for operation, samples in latencies.items():
+                if samples:
+                    summary = percentiles(samples)
+                    print(f"  {operation:<8} {summary['count']:>8,} {summary['p50']:>9.2f} "
+                          f"{summary['p99']:>9.2f} {summary['max']:>9.2f}")
+            overall = percentiles([sample for samples in latencies.values() for sample in samples])
+            print(f"  all      {total:>8,} {overall['p50']:>9.2f} {overall['p99']:>9.2f} "
+                  f"{overall['max']:>9.2f}   {total / args.seconds:,.0f} requests/sec")
+            print(f"  errors: {len(errors):,}")
+            for error in errors[:5]:
+                print(f"    {error}")
+            rows = body.count(b"\n")
+            print(f"  streamed export: {rows:,} notes, {len(body) / 2**20:.1f} MiB in {export_seconds:.2f}s "
+                  f"({rows / export_seconds:,.0f} notes/sec)")
+
+# =============================================================================
+# DUPLICATE DETECTION BENCHMARK
+# =============================================================================
+
+def plant_duplicates(rng, count):
+    """
+    Copy count random notes as exact duplicates (different case and
+    punctuation) and as near-duplicates (one word replaced).
+
+    Returns:
+        list: (original_id, copy_text, exact) per planted copy
+    """
+    total = main.count_notes()[1]
+    planted = []
+    for note_id in rng.sample(range(1, total + 1), count):
+        text = main.get_note(note_id)[1][1]
+        words = text.split()
+        if len(words) < 8:
+            continue
+        if rng.random() < 0.5:
+            planted.append((note_id, text.upper() + "!", True))
+        else:
+            words[rng.randrange(len(words))] = "changed"
+            planted.append((note_id, " ".join(words), False))
+    main.insert_notes_batch(main.get_connection(), [(text,) for _, text, _ in planted])
+    return planted
+
+def pairwise_similar(note_text, threshold):
+    """The baseline check: Jaccard similarity of word sets against every note."""
+    words = set(note_text.casefold().split())
+    matches = []
+    for note_id, other in main.get_connection().execute("SELECT note_id, note FROM notes"):
+        other_words = set(other.casefold().split())
+        union = len(words | other_words)
+        if union and len(words & other_words) / union >= threshold:
+            matches.append(note_id)
+    return matches
+
+def bench_duplicates(args):
+    """Time the duplicate index build, the report and the check on save versus a pairwise scan."""
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "duplicates.db")
+        print(f"Seeding {args.rows:,} notes...")
+        seed_notes(args.rows, rng, vocabulary, "normal")
+        planted = plant_duplicates(rng, args.planted)
+        print(f"Duplicate detection benchmark ({args.rows:,} notes, {len(planted):,} planted copies)")
+
+        start = time.perf_counter()
+        success, signed = main.sync_duplicate_index()
+        elapsed = time.perf_counter() - start
+        print(f"  index build      {elapsed:>8.2f}s  {signed / elapsed:>10,.0f} notes/sec")
+
+        success, report = main.find_duplicate_groups()
+        group_of = {note_id: number for number, group in enumerate(report["groups"])
+                    for note_id, _, _ in group["notes"]}
+        # The copies were inserted after the seeded notes, in order
+        print(f"  report           {main.format_duplicate_summary(report)}")
+        for exact, kind in ((True, "exact"), (False, "near (one word changed)")):
+            copies = [(copy_id, note_id) for copy_id, (note_id, _, copy_exact)
+                      in enumerate(planted, args.rows + 1) if copy_exact == exact]
+            found = sum(1 for copy_id, note_id in copies
+                        if note_id in group_of and group_of[note_id] == group_of.get(copy_id))
+            print(f"  planted {kind} copies grouped with their original: {found:,} of {len(copies):,}")
+
+        checks = [text for _, text, _ in planted[:args.checks]]
+        summary = percentiles(time_calls(lambda i: main.find_similar_notes(checks[i % len(checks)]),
+                                         len(checks)))
+        print(f"  check on save    p50 {summary['p50']:.2f} ms  p99 {summary['p99']:.2f} ms")
+        samples = time_calls(lambda i: pairwise_similar(checks[i], main.DUPLICATE_SIMILARITY), 3)
+        scan = statistics.fmean(samples)
+        print(f"  pairwise check   {scan * 1000:>8.1f} ms per note; an all-pairs report would take "
+              f"~{scan * args.rows / 2 / 3600:,.1f} hours")
+        main.close_connection()
+
+# =============================================================================
+# NOTE EDITOR VALIDATION BENCHMARK
+# =============================================================================
+
+def legacy_validate(text_widget, validation_label):
+    """The original per-event validation: copy the text, always reconfigure the label."""
+    length = len(text_widget.get("1.0", "end-1c"))
+    if length >= main.NOTE_MAX_LENGTH:
+        validation_label.config(text=f"Error: Note exceeds {main.NOTE_MAX_LENGTH} characters", fg="red")
+    elif length >= main.NOTE_WARN_LENGTH:
+        validation_label.config(text=f"Warning: {length}/{main.NOTE_MAX_LENGTH} characters", fg="orange")
+    else:
+        validation_label.config(text=f"{length}/{main.NOTE_MAX_LENGTH} characters", fg="black")
+
+def bench_editor(args):
+    """Compare editor validation strategies while typing into large texts."""
+    available, stop = ensure_display()
+    if not available:
+        print("Editor benchmark skipped: no display and no Xvfb available")
+        return
+    try:
+        main.load_gui()
+        tk = main.tk
+        root = tk.Tk()
+        sizes = [int(size) for size in args.sizes.split(",")]
+        print(f"Note editor benchmark ({args.keys} keystrokes per run, ms per keystroke incl. redraw)")
+        print(f"  {'chars':>9}  {'legacy mean':>11} {'legacy max':>10}  {'watched mean':>12} "
+              f"{'watched max':>11}  {'get() after paste':>17} {'count after paste':>17}")
+        for size in sizes:
+            # 80-character lines, like pasted prose
+            prefill = ("x" * 79 + "\n") * (size // 80)
+            row = []
+            for strategy in ("legacy", "watched"):
+                frame = tk.Frame(root)
+                frame.pack()
+                text = tk.Text(frame, wrap=tk.WORD, height=15)
+                label = tk.Label(frame)
+                button = tk.Button(frame, text="Save")
+                for widget in (text, label, button):
+                    widget.pack()
+                text.insert("1.0", prefill)
+                if strategy == "watched":
+                    main.watch_note_length(text, label, button)
+                root.update()
+
+                def keystroke(i):
+                    text.insert("end", "y")
+                    if strategy == "legacy":
+                        legacy_validate(text, label)
+                    root.update()
+
+                summary = percentiles(time_calls(keystroke, args.keys))
+                row.extend([summary["mean"], summary["max"]])
+                if strategy == "watched":
+                    paste = percentiles(time_calls(lambda i: len(text.get("1.0", "end-1c")), 20))
+                    counted = percentiles(time_calls(lambda i: main.text_length(text), 20))
+                    row.extend([paste["p50"], counted["p50"]])
+                frame.destroy()
+            print(f"  {size:>9,}  {row[0]:>11.3f} {row[1]:>10.3f}  {row[2]:>12.3f} {row[3]:>11.3f}  "
+                  f"{row[4]:>17.3f} {row[5]:>17.3f}")
+        root.destroy()
+    finally:
+        stop()
+
+# =============================================================================
+# INSTRUMENTATION OVERHEAD BENCHMARK
+# =============================================================================
+
+def bench_instrumentation(args):
+    """Compare bare, disabled and enabled instrumentation on hot read paths."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as directory:
+        use_temp_database(directory, "instrumentation.db")
+        seed_notes(args.rows, rng, make_vocabulary(rng))
+        ids = [rng.randint(1, args.rows) for _ in range(args.ops)]
+        operations = {
+            "get_note": lambda func: (lambda i: func(ids[i])),
+            "get_notes_page": lambda func: (lambda i: func(40, after_id=ids[i])),
+        }
+
+        print(f"Instrumentation overhead ({args.rows:,} notes, {args.ops:,} calls each)")
+        for name, make_call in operations.items():
+            wrapped = getattr(main, name)
+            main.set_instrumentation(False)
+            bare = time_ops(f"{name} (bare)", make_call(wrapped.__wrapped__), args.ops)
+            disabled = time_ops(f"{name} (disabled)", make_call(wrapped), args.ops)
+            main.set_instrumentation(True, slow_ms=1000)
+            enabled = time_ops(f"{name} (enabled)", make_call(wrapped), args.ops)
+            main.set_instrumentation(False)
+            print(f"    disabled overhead {(bare / disabled - 1) * 100:+.1f}%, "
+                  f"enabled overhead {(bare / enabled - 1) * 100:+.1f}%")
+        main.reset_instrumentation()
+        main.close_connection()
+
+# =============================================================================
+# FULL SUITE, COMPARE AND SEED
+# =============================================================================
+
+def ensure_display():
+    """
+    Make sure Tk can open a window, starting Xvfb when there is no display.
+
+    Returns:
+        tuple: (available: bool, stop: callable) - call stop() when done
+    """
+    if has_display():
+        return True, lambda: None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        return False, lambda: None
+    display = ":97"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    os.environ["DISPLAY"] = display
+    return process.poll() is None, process.terminate
+
+def git_commit():
+    """Return the current git commit (with '-dirty' for local changes), or None."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+def suite_crud(rng, rows, ops):
+    """Latency percentiles of the single-note database functions."""
+    words = [main.get_note(rng.randint(1, rows))[1][1].split()[0] for _ in range(20)]
+    results = {
+        "add_note": time_calls(lambda i: main.add_note(f"benchmark note {i}"), ops),
+        "get_note": time_calls(lambda i: main.get_note(rng.randint(1, rows)), ops),
+        "get_notes_page": time_calls(
+            lambda i: main.get_notes_page(40, after_id=rng.randint(1, rows)), ops),
+        "get_notes_page_offset": time_calls(
+            lambda i: main.get_notes_page(40, offset=rng.randint(0, rows - 1)), ops),
+        "count_notes": time_calls(lambda i: main.count_notes(), ops),
+        "search_notes": time_calls(lambda i: main.search_notes(words[i % len(words)][:4]), ops),
+        "update_note": time_calls(
+            lambda i: main.update_note(rng.randint(1, rows), f"benchmark edit {i}"), ops),
+        "delete_note": time_calls(lambda i: main.delete_note(rows + i + 1), ops),
+    }
+    return {name: percentiles(samples) for name, samples in results.items()}
+
+def suite_grid(ops):
+    """Wall time of refresh_notes_grid and virtual grid scrolling in a real Tk window."""
+    available, stop = ensure_display()
+    if not available:
+        return {"skipped": "no display and no Xvfb available"}
+    try:
+        root, error_label, tree = main.create_main_window()
+        root.update()
+        results = {
+            "refresh_notes_grid": time_calls(
+                lambda i: (main.refresh_notes_grid(tree, error_label), root.update()), ops),
+            "scroll_3_rows": time_calls(
+                lambda i: (main.scroll_virtual_grid_by(tree, 3), root.update()), ops),
+            "scroll_jump": time_calls(
+                lambda i: (main.on_virtual_scrollbar(tree, "moveto", str(i / ops)), root.update()), ops),
+        }
+        root.destroy()
+        return {name: percentiles(samples) for name, samples in results.items()}
+    finally:
+        stop()
+
+def suite_exports(directory, db_path):
+    """Throughput and peak RSS of each export format, each in a fresh process."""
+    results = {}
+    for name in ("notes.xlsx", "notes.md", "notes.txt", "notes.md.gz"):
+        results[name] = run_export_child(db_path, os.path.join(directory, name))
+    return results
+
+def bench_suite(args):
+    """Run the full benchmark suite and write the results as JSON."""
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "length_distribution": args.length_dist,
+            "ops": args.ops,
+            "seed": args.seed,
+        },
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = use_temp_database(directory, "suite.db")
+        print(f"Seeding {args.rows:,} notes ({args.length_dist} lengths)...")
+        start = time.perf_counter()
+        seed_notes(args.rows, rng, vocabulary, args.length_dist)
+        results["seed_rows_per_sec"] = args.rows / (time.perf_counter() - start)
+
+        print("Measuring CRUD latency...")
+        results["crud"] = suite_crud(rng, args.rows, args.ops)
+        if not args.skip_gui:
+            print("Measuring grid refresh...")
+            results["grid"] = suite_grid(min(args.ops, 200))
+        main.close_connection()
+        if not args.skip_exports:
+            print("Measuring exports...")
+            results["exports"] = suite_exports(directory, db_path)
+
+    print_suite(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+def print_suite(results):
+    """Print suite results as readable tables."""
+    meta = results["meta"]
+    print(f"\nSuite results: commit {meta['commit']}, {meta['rows']:,} rows, "
+          f"Python {meta['python']}, SQLite {meta['sqlite']}")
+    for section in ("crud", "grid"):
+        stats = results.get(section)
+        if not stats:
+            continue
+        if "skipped" in stats:
+            print(f"  {section}: skipped ({stats['skipped']})")
+            continue
+        print(f"  {'operation':<24} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, summary in stats.items():
+            print(f"  {name:<24} {summary['p50']:>9.3f} {summary['p90']:>9.3f} "
+                  f"{summary['p99']:>9.3f} {summary['max']:>9.3f}")
+    for name, stats in results.get("exports", {}).items():
+        print(f"  export {name:<16} {stats['rows_per_sec']:>10,.0f} rows/sec  "
+              f"peak RSS {stats['peak_mb']:.1f} MiB")
+
+def flatten_metrics(results):
+    """
+    Pull the comparable metrics out of a suite result.
+
+    Returns:
+        dict: {metric_name: (value, higher_is_better)}
+    """
+    metrics = {}
+    for section in ("crud", "grid"):
+        for name, summary in results.get(section, {}).items():
+            if isinstance(summary, dict):
+                metrics[f"{section}.{name}.p50_ms"] = (summary["p50"], False)
+                metrics[f"{section}.{name}.p99_ms"] = (summary["p99"], False)
+    for name, stats in results.get("exports", {}).items():
+        metrics[f"export.{name}.rows_per_sec"] = (stats["rows_per_sec"], True)
+        metrics[f"export.{name}.peak_mb"] = (stats["peak_mb"], False)
+    return metrics
+
+def bench_compare(args):
+    """Compare two suite result files metric by metric."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    print(f"Comparing {baseline['meta']['commit']} -> {candidate['meta']['commit']} "
+          f"(regression threshold {args.threshold:.0f}%)")
+
+    before, after = flatten_metrics(baseline), flatten_metrics(candidate)
+    regressions = 0
+    for name in sorted(before.keys() & after.keys()):
+        old, higher_is_better = before[name]
+        new = after[name][0]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {name:<44} {old:>12.3f} -> {new:>12.3f}  {change:>+7.1f}%{flag}")
+    if regressions:
+        raise SystemExit(1)
+
+def bench_seed(args):
+    """Fill an explicitly named database with synthetic notes."""
+    rng = random.Random(args.seed)
+    main.close_connection()
+    main.DB_FILE = args.db
+    success, error = main.init_database()
+    if not success:
+        raise SystemExit(f"Could not open {args.db}: {error}")
+    start = time.perf_counter()
+    seed_notes(args.rows, rng, make_vocabulary(rng), args.length_dist)
+    elapsed = time.perf_counter() - start
+    main.close_connection()
+    print(f"Added {args.rows:,} notes to {args.db} in {elapsed:.1f}s")
+
+# =============================================================================
+# ENTRY POINT
+# =============================================================================
+
+def main_cli(argv=None):
+    """Parse command line arguments and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description="Demo Notes benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    p_conn = subparsers.add_parser("connections",
+                                   help="pooled connections vs open/close per call")
+    p_conn.add_argument("--ops", type=int, default=2000,
+                        help="operations per phase (default: 2000)")
+    p_conn.set_defaults(func=bench_connections)
+
+    p_search = subparsers.add_parser("search", help="FTS5 search vs LIKE scan")
+    p_search.add_argument("--sizes", default="10000,100000,1000000",
+                          help="comma-separated table sizes (default: 10000,100000,1000000)")
+    p_search.add_argument("--queries", type=int, default=50,
+                          help="queries per size (default: 50)")
+    p_search.set_defaults(func=bench_search)
+
+    p_excel = subparsers.add_parser("excel", help="streaming vs in-memory Excel export")
+    p_excel.add_argument("--rows", type=int, default=1000000,
+                         help="notes to export (default: 1000000)")
+    p_excel.add_argument("--skip-legacy", action="store_true",
+                         help="only run the streaming export")
+    p_excel.set_defaults(func=bench_excel)
+
+    p_markdown = subparsers.add_parser("markdown", help="chunked vs per-row Markdown export")
+    p_markdown.add_argument("--rows", type=int, default=1000000,
+                            help="notes to export (default: 1000000)")
+    p_markdown.set_defaults(func=bench_markdown)
+
+    p_import = subparsers.add_parser("import", help="bulk import throughput per format")
+    p_import.add_argument("--rows", type=int, default=1000000,
+                          help="notes per source file (default: 1000000)")
+    p_import.set_defaults(func=bench_import)
+
+    p_startup = subparsers.add_parser("startup",
+                                      help="startup timings; exit 1 when over budget")
+    p_startup.add_argument("--runs", type=int, default=5, help="launches per measurement")
+    p_startup.add_argument("--notes", type=int, default=100000,
+                           help="notes in the test database (default: 100000)")
+    p_startup.add_argument("--cli-budget", type=float, default=0.5,
+                           help="seconds allowed for a CLI cold start (default: 0.5)")
+    p_startup.add_argument("--gui-budget", type=float, default=1.5,
+                           help="seconds allowed until the window is shown (default: 1.5)")
+    p_startup.set_defaults(func=bench_startup)
+
+    p_writes = subparsers.add_parser("writes", help="background writer vs commit per save")
+    p_writes.add_argument("--writes", type=int, default=20000)
+    p_writes.add_argument("--synchronous", choices=["off", "normal", "full"], default="normal",
+                          help="PRAGMA synchronous for the run; full approximates a slow disk")
+    p_writes.set_defaults(func=bench_writes)
+
+    p_cache = subparsers.add_parser("cache", help="read cache vs SQLite reads")
+    p_cache.add_argument("--rows", type=int, default=200000)
+    p_cache.add_argument("--ops", type=int, default=1000)
+    p_cache.set_defaults(func=bench_cache)
+
+    p_sort = subparsers.add_parser("sort", help="indexed sort and filter page times")
+    p_sort.add_argument("--rows", type=int, default=1000000)
+    p_sort.add_argument("--ops", type=int, default=20, help="runs per view")
+    p_sort.set_defaults(func=bench_sort)
+
+    p_maintenance = subparsers.add_parser("maintenance",
+                                          help="maintenance after churn and online backup under load")
+    p_maintenance.add_argument("--rows", type=int, default=200000)
+    p_maintenance.add_argument("--time-limit", type=float, default=20,
+                               help="seconds before the restarting backup is given up")
+    p_maintenance.set_defaults(func=bench_maintenance)
+
+    p_delta = subparsers.add_parser("delta", help="full vs delta CSV export")
+    p_delta.add_argument("--rows", type=int, default=1000000)
+    p_delta.add_argument("--changes", type=int, default=3000,
+                         help="notes edited, deleted and added between the exports")
+    p_delta.set_defaults(func=bench_delta)
+
+    p_bundle = subparsers.add_parser("bundle", help="single-scan export bundle vs one export per format")
+    p_bundle.add_argument("--rows", type=int, default=1000000)
+    p_bundle.add_argument("--formats", default="xlsx,md,csv,jsonl",
+                          help="comma-separated formats written together")
+    p_bundle.add_argument("--compress", choices=["gz", "zst"], help="compress the text formats")
+    p_bundle.set_defaults(func=bench_bundle)
+
+    p_batch = subparsers.add_parser("batch", help="batch delete/replace vs one commit per note")
+    p_batch.add_argument("--rows", type=int, default=100000)
+    p_batch.add_argument("--batch", type=int, default=2000, help="notes selected per operation")
+    p_batch.set_defaults(func=bench_batch)
+
+    p_concurrency = subparsers.add_parser("concurrency",
+                                          help="multi-process stress test of a shared database")
+    p_concurrency.add_argument("--processes", type=int, default=4)
+    p_concurrency.add_argument("--seconds", type=float, default=5.0, help="run time per phase")
+    p_concurrency.add_argument("--rows", type=int, default=10000)
+    p_concurrency.add_argument("--counters", type=int, default=5,
+                               help="shared counter notes incremented by every process")
+    p_concurrency.add_argument("--busy-timeout", type=int, default=main.DB_BUSY_TIMEOUT_MS,
+                               help="busy timeout of the worker processes (ms)")
+    p_concurrency.set_defaults(func=bench_concurrency)
+
+    p_api = subparsers.add_parser("api", help="HTTP API load test")
+    p_api.add_argument("--rows", type=int, default=100000)
+    p_api.add_argument("--clients", type=int, default=16, help="concurrent keep-alive connections")
+    p_api.add_argument("--seconds", type=float, default=10)
+    p_api.add_argument("--workers", default="1,4", help="read worker counts to compare")
+    p_api.set_defaults(func=bench_api)
+
+    p_duplicates = subparsers.add_parser("duplicates", help="duplicate index, report and save check")
+    p_duplicates.add_argument("--rows", type=int, default=200000)
+    p_duplicates.add_argument("--planted", type=int, default=2000, help="duplicate copies to plant")
+    p_duplicates.add_argument("--checks", type=int, default=500, help="save checks to time")
+    p_duplicates.set_defaults(func=bench_duplicates)
+
+    p_editor = subparsers.add_parser("editor", help="note editor validation while typing")
+    p_editor.add_argument("--keys", type=int, default=300, help="keystrokes per run")
+    p_editor.add_argument("--sizes", default="0,10000,1000000",
+                          help="characters already in the editor, comma-separated")
+    p_editor.set_defaults(func=bench_editor)
+
+    p_memory = subparsers.add_parser("memory", help="memory footprint of the loaded notes")
+    p_memory.add_argument("--rows", type=int, default=1000000)
+    p_memory.add_argument("--length-dist", choices=sorted(LENGTH_DISTRIBUTIONS), default="uniform")
+    p_memory.set_defaults(func=bench_memory)
+
+    p_instrumentation = subparsers.add_parser("instrumentation",
+                                              help="overhead of the instrumentation layer")
+    p_instrumentation.add_argument("--rows", type=int, default=100000)
+    p_instrumentation.add_argument("--ops", type=int, default=100000)
+    p_instrumentation.set_defaults(func=bench_instrumentation)
+
+    p_suite = subparsers.add_parser("suite", help="full suite with JSON results")
+    p_suite.add_argument("--rows", type=int, default=100000,
+                         help="notes in the corpus (default: 100000)")
+    p_suite.add_argument("--length-dist", choices=LENGTH_DISTRIBUTIONS, default="uniform",
+                         help="note length distribution (default: uniform)")
+    p_suite.add_argument("--ops", type=int, default=1000,
+                         help="samples per latency measurement (default: 1000)")
+    p_suite.add_argument("--seed", type=int, default=42, help="random seed")
+    p_suite.add_argument("--output", help="write results to this JSON file")
+    p_suite.add_argument("--skip-gui", action="store_true", help="skip the Tk grid timings")
+    p_suite.add_argument("--skip-exports", action="store_true", help="skip export timings")
+    p_suite.set_defaults(func=bench_suite)
+
+    p_compare = subparsers.add_parser("compare", help="compare two suite result files")
+    p_compare.add_argument("baseline")
+    p_compare.add_argument("candidate")
+    p_compare.add_argument("--threshold", type=float, default=10.0,
+                           help="percent change counted as a regression (default: 10)")
+    p_compare.set_defaults(func=bench_compare)
+
+    p_seed = subparsers.add_parser("seed", help="fill a database with synthetic notes")
+    p_seed.add_argument("--db", required=True, help="database to fill, e.g. notes.db")
+    p_seed.add_argument("--rows", type=int, default=100000)
+    p_seed.add_argument("--length-dist", choices=LENGTH_DISTRIBUTIONS, default="uniform")
+    p_seed.add_argument("--seed", type=int, default=42, help="random seed")
+    p_seed.set_defaults(func=bench_seed)
+
+    # Internal: runs one export in a fresh process so its peak RSS is its own
+    p_export_child = subparsers.add_parser("export-child")
+    p_export_child.add_argument("--db", required=True)
+    p_export_child.add_argument("--output", required=True)
+    p_export_child.add_argument("--legacy", action="store_true")
+    p_export_child.set_defaults(func=export_child)
+
+    p_stress_child = subparsers.add_parser("stress-child")
+    p_stress_child.add_argument("--db", required=True)
+    p_stress_child.add_argument("--seconds", type=float, required=True)
+    p_stress_child.add_argument("--rows", type=int, required=True)
+    p_stress_child.add_argument("--seed", type=int, required=True)
+    p_stress_child.add_argument("--counter-ids", required=True)
+    p_stress_child.add_argument("--busy-timeout", type=int, required=True)
+    p_stress_child.add_argument("--naive", action="store_true")
+    p_stress_child.set_defaults(func=stress_child)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main_cli()
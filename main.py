@@ -7,7 +7,7 @@ and SQLite database. Features CRUD operations, data validation, and export funct
 ARCHITECTURE OVERVIEW:
 ====================
 - Single file design using functional programming
-- SQLite database with open/close per operation for robustness
+- SQLite database with one long-lived connection per thread (WAL journal)
 - Tkinter for cross-platform GUI (Windows 11, Ubuntu 22.04)
 - Modal dialogs for user interactions
 - Real-time character validation and error handling
@@ -15,11 +15,22 @@ ARCHITECTURE OVERVIEW:
 CODE STRUCTURE:
 ===============
 1. IMPORTS & CONSTANTS: Required libraries and global constants
-2. DATABASE FUNCTIONS: All SQLite operations (init, CRUD operations)
-3. UI FUNCTIONS: GUI operations, event handlers, dialogs
-4. EXPORT FUNCTIONS: Excel and Markdown export functionality
-5. MAIN WINDOW: Window creation, layout, and styling
-6. APPLICATION ENTRY: Main function and startup logic
+2. INSTRUMENTATION / STALL WATCHDOG: Opt-in operation timings, slow
+   statement log and the log of UI stalls with the Tk thread's stack
+3. CONNECTION MANAGEMENT: Pooled per-thread SQLite connections
+4. DATABASE FUNCTIONS / DUPLICATE DETECTION / READ CACHE: All SQLite
+   operations (init, CRUD, paging, search), the MinHash/LSH duplicate index
+   and the in-memory copy of the note set
+5. UI FUNCTIONS: GUI operations, event handlers, dialogs
+6. BACKGROUND WORKERS / WRITER / VIRTUAL GRID: Threaded jobs, the write
+   queue and the windowed data grid
+7. EXPORT FUNCTIONS: Excel, Markdown and delta (CSV) export functionality
+8. IMPORT FUNCTIONS: Bulk import of CSV, Markdown and Excel files
+9. MAINTENANCE: Online backup, idle-time ANALYZE/vacuum and tombstone pruning
+10. MAIN WINDOW: Window creation, layout, and styling
+11. HTTP API: Local asyncio HTTP/JSON server for other tools (serve)
+12. COMMAND LINE INTERFACE: Headless subcommands for scripts and cron jobs
+13. APPLICATION ENTRY: Main function and startup logic
 
 KEY DESIGN PATTERNS:
 ===================
@@ -29,38 +40,846 @@ KEY DESIGN PATTERNS:
 - Real-time user feedback through UI labels
 - File dialogs for export operations
 - Keyboard shortcuts for common operations
+- Optimistic versions on update_note and a data_version poll, so several
+  instances can share one notes.db without losing or missing edits
+- Headless command line interface (python main.py <command>) sharing the
+  database functions, without importing Tkinter
+- Note saves and deletes from the window are queued to one background
+  writer thread that group-commits bursts (submit_write)
+- In-memory read cache of the note set, invalidated by PRAGMA data_version
+- Duplicate detection through an indexed MinHash/LSH signature per note
+  (note_signatures), kept current by the write paths and sync_duplicate_index
+- Opt-in instrumentation (--instrument, F12 diagnostics window) wrapping the
+  hot paths with @instrumented
+- A watchdog thread logs Tk event loop stalls (--stall-ms) with the running
+  callback and stack to a rotating notes_stalls.log
 
 DEPENDENCIES:
 =============
 - tkinter: Built-in GUI framework (cross-platform)
 - sqlite3: Built-in database (no external server needed)
-- openpyxl: Excel file creation (only external dependency)
+- openpyxl: Excel file creation (only external dependency, imported on first use)
 - datetime: Timestamp generation for exports
 
 Author: Generated with Claude Code
 Date: 2025-07-13
 """
 
-# Standard library imports for GUI, database, and file operations
-import tkinter as tk                    # Main GUI framework
-from tkinter import ttk, messagebox, filedialog  # Enhanced widgets and dialogs
+# Standard library imports for database and file operations
+import time                            # Throughput and startup measurement
+_startup_marks = [("main.py import started", time.perf_counter())]
+import sys                             # Command line arguments and exit codes
 import sqlite3                         # Embedded database
 import os                              # File system operations
-from datetime import datetime          # Timestamp generation for exports
-import openpyxl                        # Excel file creation
-from openpyxl.worksheet.table import Table, TableStyleInfo  # Excel formatting
+import io                              # Buffered export writers
+import gzip                            # Compressed exports and imports
+import csv                             # CSV import
+import re                              # Search term tokenizing
+import queue                           # Handing results from worker threads to Tk
+import threading                       # Per-thread connections and worker threads
+import functools                       # Instrumentation wrappers
+import collections                     # Bounded slow-statement log
+import bisect                          # Page lookups in the read cache, MinHash bins
+import hashlib                         # Exact duplicate detection
+import zlib                            # Word hashes of the duplicate signatures
+import string                          # Punctuation ignored by duplicate detection
+import struct                          # Band keys of the duplicate signatures
+import itertools                       # Text offsets of the read cache
+from array import array                # Compact note_id and offset columns of the read cache
+from datetime import datetime, timezone  # Timestamp generation for exports
+
+# Heavy modules are imported on first use to keep startup fast:
+# - tkinter by load_gui() when the window is created, so command-line use
+#   never loads Tk or needs a display
+# - openpyxl inside the Excel export/import functions
+# - asyncio by run_api_server, only for `python main.py serve`
+tk = ttk = messagebox = filedialog = None
+asyncio = None
 
 # Global constant for database filename
 # Database will be created in the same directory as the executable
 DB_FILE = "notes.db"
 
+# Connection tuning applied to every pooled connection (see get_connection)
+# WAL lets readers and the writer work concurrently; it needs every process
+# using the file to be on the same host, so set DB_JOURNAL_MODE to "DELETE"
+# when notes.db is shared between machines over a network filesystem.
+DB_JOURNAL_MODE = "WAL"
+DB_SYNCHRONOUS = "NORMAL"              # OFF | NORMAL | FULL | EXTRA
+DB_CACHE_SIZE = -8000                  # Negative = KiB, positive = pages
+DB_STATEMENT_CACHE_SIZE = 128          # Prepared statements kept per connection
+DB_BUSY_TIMEOUT_MS = 5000              # How long SQLite waits for another writer's lock
+DB_JOURNAL_MODES = ("WAL", "DELETE", "TRUNCATE", "PERSIST")  # Accepted by --journal-mode
+DB_WATCH_MS = 1000                     # How often an open window checks for other processes' commits
+DB_AUTO_VACUUM = "INCREMENTAL"         # New databases can release free pages (see run_maintenance)
+
+# Note validation: texts must be non-empty and shorter than NOTE_MAX_LENGTH
+NOTE_MAX_LENGTH = 255
+NOTE_WARN_LENGTH = 200                 # Editor shows a warning from here on
+EDITOR_VALIDATE_MS = 16                # Editor re-validates at most once per frame (~60 Hz)
+BATCH_ID_CHUNK = 500                   # Note IDs per "IN (...)" query in batch edits
+NOTE_CONFLICT_ERROR = "Edit conflict"  # Prefix of errors from update_note's version check
+
+# Data grid layout
+GRID_TEXT_CHARS = 120                  # Note text shown per grid row; editors load the full text
+GRID_ROW_HEIGHT = 25                   # Treeview row height in pixels
+GRID_OVERSCAN = 10                     # Extra rows materialized below the visible ones
+GRID_WHEEL_ROWS = 3                    # Rows scrolled per mouse wheel notch
+
+# Full-text search
+SEARCH_RESULT_LIMIT = 200              # Best-ranked matches shown in the grid
+SEARCH_DEBOUNCE_MS = 250               # Quiet time after typing before searching
+BACKGROUND_POLL_MS = 50                # How often Tk checks for worker results
+
+# Exports
+EXPORT_CHUNK_SIZE = 5000               # Rows fetched from SQLite per chunk
+EXCEL_SHEET_NAME = "Exported Notes"
+EXCEL_MAX_ROWS = 1048576               # Excel's hard row limit per worksheet
+EXPORT_BUFFER_SIZE = 4 * 1024 * 1024   # Write buffer for text exports (bytes)
+EXPORT_GZIP_LEVEL = 1                  # 1 = fastest (keeps up with the disk), 9 = smallest
+EXPORT_ZSTD_LEVEL = 3
+PIPE_ESCAPE = "\\|"                    # Markdown table cells escape | as \|
+EXPORT_FORMATS = ("xlsx", "md", "txt", "csv", "jsonl")
+EXPORT_QUEUE_CHUNKS = 4                # Chunks queued per writer thread in parallel bundle exports
+
+# Imports
+IMPORT_BATCH_SIZE = 50000              # Rows inserted per transaction
+
+# HTTP API (python main.py serve); only ever bound to the loopback interface
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_READ_WORKERS = 4                   # Threads serving reads, each with its own pooled connection
+API_PAGE_SIZE = 100                    # Notes per GET /notes page unless ?limit= is given
+API_PAGE_MAX = 1000                    # Largest page or search result a client can ask for
+API_MAX_BODY = 64 * 1024               # Largest request body accepted (bytes)
+API_STREAM_QUEUE = 4                   # Formatted chunks buffered per streaming response
+API_STREAM_WORKERS = 2                 # Threads serving streamed responses, apart from the read workers
+
+# Delta export: rows stamped up to this long before the previous export
+# started are exported again, so writes that were stamped but not yet
+# committed at that moment are never missed (consumers upsert by note_id)
+DELTA_EXPORT_OVERLAP_MS = 60000
+DELTA_EXPORT_TARGET = "default"        # Watermark name when none is given
+
+# Maintenance: hot backups and idle-time upkeep of notes.db
+BACKUP_STEP_PAGES = 1024               # Pages copied per backup step (progress and cancel in between)
+MAINTENANCE_IDLE_SECONDS = 120         # No key or mouse input for this long counts as idle
+MAINTENANCE_INTERVAL_HOURS = 24        # Idle maintenance runs at most this often per database
+MAINTENANCE_CHECK_MS = 30000           # How often an open window checks whether it is due
+MAINTENANCE_VACUUM_PAGES = 1000        # Free pages released per incremental_vacuum step (~4 MiB)
+MAINTENANCE_ANALYSIS_LIMIT = 1000      # Rows ANALYZE samples per index (0 = every row)
+MAINTENANCE_LOG_SIZE = 100             # Runs kept in the maintenance_runs table
+
+# Duplicate detection: an exact hash and MinHash/LSH band keys per note (see note_signature)
+DUPLICATE_HASH_BINS = 32               # MinHash values per signature, one byte each
+# LSH bands of 4 values (= BINS / 4); notes sharing a band key are compared
+DUPLICATE_BANDS = 8
+DUPLICATE_SIMILARITY = 0.8             # Estimated similarity from which notes are near-duplicates
+DUPLICATE_CHECK_LIMIT = 3              # Similar notes named when a saved note resembles others
+DUPLICATE_CANDIDATE_LIMIT = 100        # Notes sharing a band key compared per check
+DUPLICATE_INDEX_BATCH = 2000           # Notes signed per transaction when catching up
+DUPLICATE_REBUILD_NOTES = 50000        # Unsigned notes from which catch-up rebuilds band indexes
+DUPLICATE_REPORT_GROUPS = 1000         # Largest groups listed in the Duplicates window
+
+# Read cache (window only; one-shot CLI commands read SQLite directly)
+READ_CACHE_ENABLED = False             # Turned on by main() when the window opens
+READ_CACHE_MAX_NOTES = 2000000         # Larger tables are not cached
+READ_CACHE_RELOAD_DELAY = 0.5          # Quiet seconds after a change before reloading
+
+# Background writer (note saves and deletes from the window)
+WRITE_BATCH_MAX = 500                  # Queued writes coalesced into one group commit
+WRITE_RETRY_ATTEMPTS = 5               # Retries when the database stays locked
+WRITE_RETRY_DELAY = 0.1                # First retry delay in seconds, doubled per retry
+WRITE_POLL_MS = 16                     # Result delivery poll while writes are pending (~60 fps)
+WRITE_DELIVERY_BUDGET = 0.008          # Seconds of result callbacks per poll, keeps frames short
+
+# Instrumentation (opt-in: --instrument or NOTES_INSTRUMENT=1)
+SLOW_STATEMENT_MS = 50                 # Statements slower than this are logged with their plan
+SLOW_LOG_SIZE = 200                    # Most recent slow statements kept
+HISTOGRAM_BUCKETS = 32                 # log2 latency buckets, 1 us up to ~36 minutes
+
+# UI stall watchdog (window only; --stall-ms 0 or NOTES_STALL_MS=0 turns it off)
+STALL_THRESHOLD_MS = 250               # Event loop lateness logged as a stall
+STALL_HEARTBEAT_MS = 100               # How often the Tk thread checks in
+STALL_HANG_SECONDS = 10                # Stalls this long are also logged before they end
+STALL_LOG_FILE = "notes_stalls.log"    # Next to the database unless --stall-log names a file
+STALL_LOG_BYTES = 1000000              # Log size at which it is rotated
+STALL_LOG_BACKUPS = 3                  # Rotated logs kept (notes_stalls.log.1 ... .3)
+
+# Case-insensitive index on the note text: serves the grid's sort by note and
+# its "starts with" filter (LIKE 'prefix%' can use a NOCASE index as a range)
+NOTE_INDEX_SCHEMA = "CREATE INDEX IF NOT EXISTS notes_note_nocase ON notes (note COLLATE NOCASE)"
+
+# LSH band indexes of the duplicate detection table (see sync_duplicate_index)
+SIGNATURE_INDEX_SCHEMA = tuple(f"CREATE INDEX IF NOT EXISTS note_signatures_band{band} "
+                               f"ON note_signatures (band{band})" for band in range(DUPLICATE_BANDS))
+
+# Schema version stored in PRAGMA user_version; init_database applies the
+# upgrades in SCHEMA_UPGRADES[old_version:] in one transaction
+SCHEMA_VERSION = 4
+
+# Milliseconds since the Unix epoch, in SQL (unixepoch('subsec') needs 3.42)
+SQL_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+SCHEMA_UPGRADES = (
+    # 1: created_at/updated_at (ms since epoch, NULL for notes that existed
+    # before the upgrade), tombstones for deleted notes and delta export
+    # watermarks. The app stamps its own writes; the triggers only fill in
+    # for writers that don't (older versions, other tools). Only updated_at
+    # is indexed: the delta export filters on it, nothing filters on
+    # created_at, and a second index would slow bulk imports by about a third.
+    (
+        "ALTER TABLE notes ADD COLUMN created_at INTEGER",
+        "ALTER TABLE notes ADD COLUMN updated_at INTEGER",
+        "CREATE INDEX IF NOT EXISTS notes_updated_at ON notes (updated_at)",
+        f"""CREATE TRIGGER IF NOT EXISTS notes_stamp_insert AFTER INSERT ON notes
+               WHEN new.updated_at IS NULL BEGIN
+               UPDATE notes SET created_at = COALESCE(new.created_at, {SQL_NOW_MS}),
+                                updated_at = {SQL_NOW_MS}
+               WHERE note_id = new.note_id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS notes_stamp_update AFTER UPDATE OF note ON notes
+               WHEN new.updated_at IS old.updated_at BEGIN
+               UPDATE notes SET updated_at = {SQL_NOW_MS} WHERE note_id = new.note_id;
+           END""",
+        """CREATE TABLE IF NOT EXISTS note_tombstones (
+               note_id INTEGER PRIMARY KEY,
+               deleted_at INTEGER NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS note_tombstones_deleted_at ON note_tombstones (deleted_at)",
+        f"""CREATE TRIGGER IF NOT EXISTS notes_tombstone AFTER DELETE ON notes BEGIN
+               INSERT OR REPLACE INTO note_tombstones (note_id, deleted_at)
+               VALUES (old.note_id, {SQL_NOW_MS});
+           END""",
+        """CREATE TABLE IF NOT EXISTS export_watermarks (
+               target TEXT PRIMARY KEY,
+               watermark INTEGER NOT NULL,
+               exported_at INTEGER NOT NULL,
+               rows INTEGER NOT NULL
+           )""",
+    ),
+    # 2: a version counter per note for optimistic concurrency: an update
+    # that names the version it started from fails if another window or
+    # process saved the note in between, instead of silently overwriting it
+    (
+        "ALTER TABLE notes ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        """CREATE TRIGGER IF NOT EXISTS notes_version_update AFTER UPDATE OF note ON notes
+               WHEN new.version IS old.version BEGIN
+               UPDATE notes SET version = old.version + 1 WHERE note_id = new.note_id;
+           END""",
+    ),
+    # 3: a log of maintenance runs, shared by every instance using the file,
+    # so idle maintenance runs once per interval however many windows are open
+    (
+        """CREATE TABLE IF NOT EXISTS maintenance_runs (
+               ran_at INTEGER PRIMARY KEY,
+               seconds REAL NOT NULL,
+               reclaimed_bytes INTEGER NOT NULL,
+               tombstones_pruned INTEGER NOT NULL,
+               vacuum TEXT NOT NULL
+           )""",
+    ),
+    # 4: duplicate detection index, one row per note with the hash of its
+    # normalized text and its MinHash signature as DUPLICATE_BANDS indexed
+    # band keys. The app writes it with every note it saves; version tells
+    # rows that other writers' edits made stale (see sync_duplicate_index),
+    # and the trigger drops a note's row with the note.
+    (
+        f"""CREATE TABLE IF NOT EXISTS note_signatures (
+               note_id INTEGER PRIMARY KEY,
+               version INTEGER NOT NULL,
+               content_hash INTEGER NOT NULL,
+               {", ".join(f"band{band} INTEGER NOT NULL" for band in range(DUPLICATE_BANDS))}
+           )""",
+        *SIGNATURE_INDEX_SCHEMA,
+        """CREATE TRIGGER IF NOT EXISTS notes_signature_delete AFTER DELETE ON notes BEGIN
+               DELETE FROM note_signatures WHERE note_id = old.note_id;
+           END""",
+    ),
+)
+
+# Grid sort orders: ORDER BY columns per sort name. note_id comes last so
+# every order is total and pages can be located by keyset.
+SORT_ORDERS = {
+    "id": ("note_id",),
+    "note": ("note COLLATE NOCASE", "note_id"),
+}
+
+# FTS5 index over notes.note, kept in sync by triggers (see init_database)
+# content='notes' makes it an external-content index: the text is stored
+# only once, in the notes table. prefix='2 3' speeds up short prefix queries.
+# A row in notes_fts_paused turns the insert trigger off; insert_notes_batch
+# adds and removes it inside its own transaction, so other connections never
+# see it (see insert_notes_batch).
+FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+           note, content='notes', content_rowid='note_id', prefix='2 3')""",
+    "CREATE TABLE IF NOT EXISTS notes_fts_paused (paused INTEGER PRIMARY KEY)",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes
+           WHEN NOT EXISTS (SELECT 1 FROM notes_fts_paused) BEGIN
+           INSERT INTO notes_fts(rowid, note) VALUES (new.note_id, new.note);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+           INSERT INTO notes_fts(notes_fts, rowid, note) VALUES ('delete', old.note_id, old.note);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF note ON notes BEGIN
+           INSERT INTO notes_fts(notes_fts, rowid, note) VALUES ('delete', old.note_id, old.note);
+           INSERT INTO notes_fts(rowid, note) VALUES (new.note_id, new.note);
+       END""",
+)
+
+# =============================================================================
+# INSTRUMENTATION
+# Opt-in timing of the hot paths, for diagnosing reports of the app "hanging".
+# Enabled with --instrument or NOTES_INSTRUMENT=1. While disabled the
+# @instrumented wrappers only check one global flag and connections are plain
+# sqlite3 connections, so the cost is a single extra function call.
+# While enabled every wrapped function records its call count, errors, rows
+# touched and a log2 latency histogram, and every SQL statement slower than
+# SLOW_STATEMENT_MS is logged together with its EXPLAIN QUERY PLAN.
+# =============================================================================
+
+INSTRUMENTATION_ENABLED = False
+
+# Shared by all threads (exports and searches run on workers), so updates
+# take _stats_lock
+_stats_lock = threading.Lock()
+_operation_stats = {}
+_slow_statements = collections.deque(maxlen=SLOW_LOG_SIZE)
+
+def set_instrumentation(enabled, slow_ms=None):
+    """
+    Turn instrumentation on or off.
+    
+    The calling thread's pooled connections are closed so they reopen with
+    (or without) statement timing; worker threads open fresh connections
+    for every job anyway.
+    
+    Args:
+        enabled (bool): Whether to record timings
+        slow_ms (float, optional): New slow statement threshold in milliseconds
+    """
+    global INSTRUMENTATION_ENABLED, SLOW_STATEMENT_MS
+    INSTRUMENTATION_ENABLED = bool(enabled)
+    if slow_ms is not None:
+        SLOW_STATEMENT_MS = slow_ms
+    close_connection()
+
+def reset_instrumentation():
+    """Forget all recorded timings and slow statements."""
+    with _stats_lock:
+        _operation_stats.clear()
+        _slow_statements.clear()
+
+def record_operation(name, seconds, rows=0, error=False):
+    """
+    Add one call to the statistics of an operation.
+    
+    Args:
+        name (str): Operation name
+        seconds (float): Wall time of the call
+        rows (int, optional): Rows read or written
+        error (bool, optional): Whether the call failed
+    """
+    # Bucket b holds calls that took less than 2**b microseconds
+    bucket = min(int(seconds * 1000000).bit_length(), HISTOGRAM_BUCKETS - 1)
+    with _stats_lock:
+        stats = _operation_stats.get(name)
+        if stats is None:
+            stats = _operation_stats[name] = {"calls": 0, "errors": 0, "rows": 0, "seconds": 0.0,
+                                              "max_seconds": 0.0, "histogram": [0] * HISTOGRAM_BUCKETS}
+        stats["calls"] += 1
+        stats["errors"] += bool(error)
+        stats["rows"] += rows
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["histogram"][bucket] += 1
+
+def rows_in_result(result, *args):
+    """
+    Best-effort count of the rows touched by a (success, data) result.
+    
+    Lists count their items, integers are row counts (exports, count_notes),
+    import summaries count imported notes and single notes count as one.
+    """
+    if not isinstance(result, tuple) or len(result) != 2 or not result[0]:
+        return 0
+    data = result[1]
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, bool):
+        return 0
+    if isinstance(data, int):
+        return data
+    if isinstance(data, dict):
+        return data.get("imported", len(data.get("changes", ())))
+    return 1
+
+def instrumented(name, rows=rows_in_result):
+    """
+    Decorator that records calls of the wrapped function while enabled.
+    
+    Args:
+        name (str): Operation name shown in the diagnostics
+        rows (callable, optional): rows(result, *args) -> rows touched
+        
+    Returns:
+        callable: The decorator
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION_ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                record_operation(name, time.perf_counter() - start, error=True)
+                raise
+            failed = isinstance(result, tuple) and result[:1] == (False,)
+            record_operation(name, time.perf_counter() - start, rows(result, *args), failed)
+            return result
+        return wrapper
+    return decorate
+
+def log_slow_statement(conn, sql, parameters, seconds):
+    """
+    Log a statement that took longer than SLOW_STATEMENT_MS.
+    
+    The query plan is fetched on the same connection with the same
+    parameters, bypassing the timing wrapper. executemany() batches are
+    logged without a plan.
+    
+    Args:
+        conn (sqlite3.Connection): Connection the statement ran on
+        sql (str): Statement text
+        parameters: Bound parameters, or None for executemany()
+        seconds (float): Time spent executing the statement
+    """
+    plan = []
+    if parameters is not None:
+        try:
+            plan = [row[3] for row in
+                    sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters)]
+        except sqlite3.Error:
+            pass
+    entry = {
+        "time": datetime.now().isoformat(timespec="milliseconds"),
+        "ms": round(seconds * 1000, 3),
+        "sql": " ".join(sql.split()),
+        "parameters": "executemany" if parameters is None else repr(parameters)[:200],
+        "thread": threading.current_thread().name,
+        "plan": plan,
+    }
+    with _stats_lock:
+        _slow_statements.append(entry)
+    try:
+        print(f"slow statement ({entry['ms']:.1f} ms): {entry['sql']}"
+              + "".join(f"\n    plan: {step}" for step in plan), file=sys.stderr)
+    except (OSError, ValueError):
+        # A closed stderr must never fail the statement being diagnosed
+        pass
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that logs statements slower than SLOW_STATEMENT_MS."""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        if elapsed * 1000 >= SLOW_STATEMENT_MS:
+            log_slow_statement(self.connection, sql, parameters, elapsed)
+        return self
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - start
+        if elapsed * 1000 >= SLOW_STATEMENT_MS:
+            log_slow_statement(self.connection, sql, None, elapsed)
+        return self
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are TimedCursors."""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def histogram_percentile(histogram, fraction):
+    """
+    Estimate a latency percentile from a log2 histogram.
+    
+    Returns:
+        float: Upper bound of the bucket holding the percentile, in ms
+    """
+    target = sum(histogram) * fraction
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return 2 ** bucket / 1000
+    return 0.0
+
+def instrumentation_snapshot():
+    """
+    Return a JSON-serializable copy of all recorded statistics.
+    
+    Returns:
+        dict: enabled flag, threshold, per-operation stats and slow statements
+    """
+    with _stats_lock:
+        operations = {name: dict(stats, histogram=list(stats["histogram"]))
+                      for name, stats in _operation_stats.items()}
+        slow = list(_slow_statements)
+    
+    summary = {}
+    for name, stats in sorted(operations.items()):
+        histogram = stats["histogram"]
+        summary[name] = {
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "rows": stats["rows"],
+            "total_ms": stats["seconds"] * 1000,
+            "mean_ms": stats["seconds"] * 1000 / stats["calls"],
+            "p50_ms": histogram_percentile(histogram, 0.50),
+            "p99_ms": histogram_percentile(histogram, 0.99),
+            "max_ms": stats["max_seconds"] * 1000,
+            # Only non-empty buckets, keyed by their upper bound
+            "histogram_us": {f"<{2 ** bucket}": count
+                             for bucket, count in enumerate(histogram) if count},
+        }
+    return {"enabled": INSTRUMENTATION_ENABLED, "slow_statement_ms": SLOW_STATEMENT_MS,
+            "operations": summary, "read_cache": note_cache_stats(),
+            "stalls": stall_watchdog_stats(), "slow_statements": slow}
+
+def dump_instrumentation(filename):
+    """
+    Write the instrumentation snapshot to a JSON file.
+    
+    Args:
+        filename (str): Output path
+        
+    Returns:
+        tuple: (success: bool, filename_or_error: str)
+    """
+    import json
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(instrumentation_snapshot(), f, indent=2)
+        return True, filename
+    except OSError as e:
+        return False, str(e)
+
+# =============================================================================
+# STALL WATCHDOG
+# Database calls, grid rebuilds and dialogs all run on the Tk thread, so a slow
+# one shows up only as a frozen window. An after() heartbeat on the Tk thread
+# records when the event loop last ran; a monitor thread notices when it is
+# late by more than STALL_THRESHOLD_MS, captures the Tk thread's Python stack
+# with sys._current_frames() and, once the loop runs again, writes the stall
+# (duration, the Tk callback that was running, the stack) to a rotating log
+# that users can send in. logging is only imported when the first stall is
+# logged, so the watchdog adds nothing to startup.
+# =============================================================================
+
+# Watchdog state of this window. beat is the perf_counter() of the last
+# heartbeat, written by the Tk thread and read by the monitor thread.
+_watchdog = {"beat": 0.0, "stop": None, "logger": None, "log_path": None,
+             "stalls": 0, "longest_ms": 0.0, "last": None}
+
+def stall_log_path():
+    """Return the stall log file: STALL_LOG_FILE, relative to the database's folder."""
+    return os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), STALL_LOG_FILE)
+
+def stall_logger():
+    """
+    Return the stall logger, creating it and its rotating log file on first use.
+    
+    If the log file cannot be opened (a read-only folder), stalls are
+    logged to stderr instead.
+    """
+    if _watchdog["logger"] is None:
+        import logging
+        import logging.handlers
+        logger = logging.getLogger("notes.stalls")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        path = stall_log_path()
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=STALL_LOG_BYTES, backupCount=STALL_LOG_BACKUPS, encoding="utf-8")
+        except OSError as e:
+            print(f"Could not open stall log {path}: {e}; logging stalls to stderr", file=sys.stderr)
+            handler, path = logging.StreamHandler(sys.stderr), None
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        _watchdog["logger"], _watchdog["log_path"] = logger, path
+    return _watchdog["logger"]
+
+def stall_callback(frame):
+    """
+    Name the Tk callback a captured Tk thread stack is running.
+    
+    That is the frame right inside the innermost Tkinter dispatch (an
+    event binding or widget command through CallWrapper.__call__, an
+    after() timer through callit), skipping lambdas that only forward to
+    the real handler: for the Save button this is "on_save (main.py:3012)"
+    rather than the line deep inside SQLite access that happened to be
+    running. Without a dispatch frame the outermost frame is named.
+    
+    Args:
+        frame (frame): Innermost frame of the Tk thread
+        
+    Returns:
+        str: "function (file:line)"
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    callback = 0
+    for index, outer in enumerate(frames[:-1]):
+        code = outer.f_code
+        if code.co_name in ("__call__", "callit") and os.path.basename(
+                os.path.dirname(code.co_filename)) == "tkinter":
+            callback = index + 1
+    while callback < len(frames) - 1 and frames[callback].f_code.co_name == "<lambda>":
+        callback += 1
+    code = frames[callback].f_code
+    return (f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{frames[callback].f_lineno})")
+
+def capture_stall(thread_id):
+    """
+    Capture the Python stack of the given (Tk) thread.
+    
+    Returns:
+        tuple: (callback: str, stack: str), or None if the thread is gone
+    """
+    import traceback
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+    return stall_callback(frame), "".join(traceback.format_stack(frame))
+
+def record_stall(seconds, sample, ended=True):
+    """
+    Log one stall and count it for the diagnostics window.
+    
+    Args:
+        seconds (float): How long the event loop was stalled (so far)
+        sample (tuple): (callback, stack) from capture_stall
+        ended (bool, optional): False for a hang logged while it goes on
+    """
+    callback, stack = sample
+    ms = seconds * 1000
+    if ended:
+        _watchdog["stalls"] += 1
+        _watchdog["longest_ms"] = max(_watchdog["longest_ms"], ms)
+        _watchdog["last"] = {"time": datetime.now().isoformat(timespec="milliseconds"),
+                             "ms": round(ms, 1), "callback": callback}
+        if INSTRUMENTATION_ENABLED:
+            record_operation("ui_stall", seconds)
+        stall_logger().warning("UI stalled for %.0f ms in %s\n%s", ms, callback, stack.rstrip())
+    else:
+        stall_logger().error("UI not responding for %.0f ms so far, in %s\n%s",
+                             ms, callback, stack.rstrip())
+
+def start_stall_watchdog(root, threshold_ms=None):
+    """
+    Start watching the Tk event loop for stalls.
+    
+    The heartbeat is an after() loop every STALL_HEARTBEAT_MS that stores
+    the time; the monitor (a daemon thread) checks twice per heartbeat how
+    late the next beat is. The Tk thread's stack is captured once when a
+    stall crosses threshold_ms (that is where the time goes: the stack of a
+    stall rarely changes while it lasts), and the stall is logged with its
+    full duration when the heartbeat resumes. A stall still going on after
+    STALL_HANG_SECONDS is logged right away with a fresh stack, in case the
+    user kills the frozen window.
+    
+    Timers run late while the loop is busy, not while it waits in a modal
+    dialog, so open dialogs don't count as stalls.
+    
+    Args:
+        root (tk.Tk): Main window
+        threshold_ms (float, optional): Lateness that counts as a stall
+            (default STALL_THRESHOLD_MS; 0 turns the watchdog off)
+    """
+    threshold = (STALL_THRESHOLD_MS if threshold_ms is None else threshold_ms) / 1000
+    if threshold <= 0 or _watchdog["stop"] is not None:
+        return
+    interval = STALL_HEARTBEAT_MS / 1000
+    stop = _watchdog["stop"] = threading.Event()
+    tk_thread = threading.get_ident()
+    
+    def beat():
+        _watchdog["beat"] = time.perf_counter()
+        if not stop.is_set():
+            root.after(STALL_HEARTBEAT_MS, beat)
+    
+    def monitor():
+        sample = hang = None
+        stalled_beat = 0.0
+        while not stop.wait(interval / 2):
+            last_beat = _watchdog["beat"]
+            if sample is not None and last_beat != stalled_beat:
+                # The loop is back: the stall lasted from the missed beat to this one
+                record_stall(last_beat - stalled_beat - interval, sample)
+                sample = hang = None
+            late = time.perf_counter() - last_beat - interval
+            if late < threshold:
+                continue
+            if sample is None:
+                sample, stalled_beat = capture_stall(tk_thread), last_beat
+                if sample is None:
+                    return
+            elif hang is None and late >= STALL_HANG_SECONDS:
+                hang = capture_stall(tk_thread) or sample
+                record_stall(late, hang, ended=False)
+    
+    beat()
+    threading.Thread(target=monitor, name="stall-watchdog", daemon=True).start()
+
+def stop_stall_watchdog():
+    """Stop the stall watchdog's heartbeat and monitor thread (on exit)."""
+    if _watchdog["stop"] is not None:
+        _watchdog["stop"].set()
+        _watchdog["stop"] = None
+
+def stall_watchdog_stats():
+    """
+    Return the stall counts of this window, for the diagnostics.
+    
+    Returns:
+        dict: enabled, threshold_ms, stalls, longest_ms, last (time, ms and
+              callback of the latest stall, or None) and log (file, or None
+              until the first stall)
+    """
+    return {"enabled": _watchdog["stop"] is not None, "threshold_ms": STALL_THRESHOLD_MS,
+            "stalls": _watchdog["stalls"], "longest_ms": _watchdog["longest_ms"],
+            "last": _watchdog["last"], "log": _watchdog["log_path"]}
+
+# =============================================================================
+# DATABASE CONNECTION MANAGEMENT
+# Each thread keeps one long-lived connection per database file. Opening the
+# file is often slower than the query itself (especially on network-mounted
+# home directories), so connections are reused instead of opened per call.
+# sqlite3 keeps a per-connection cache of prepared statements, so reusing the
+# same SQL text on a long-lived connection also reuses the compiled statement.
+# =============================================================================
+
+# Thread-local storage: each thread gets its own {db_path: connection} dict
+# because sqlite3 connections must not be shared between threads
+_thread_local = threading.local()
+
+def open_connection(db_file=None, check_same_thread=True):
+    """
+    Open a new tuned SQLite connection.
+    
+    Applies the busy timeout, auto-vacuum mode (new files only), journal
+    mode, synchronous level and page cache size from the DB_* constants.
+    With instrumentation enabled the connection times every statement (see
+    TimedConnection). Callers that need a private connection (for example
+    a worker thread that must not share state) can use this directly;
+    everything else should go through get_connection().
+    
+    Args:
+        db_file (str, optional): Database path (defaults to DB_FILE)
+        check_same_thread (bool, optional): False for a connection the caller
+            shares between threads behind its own lock (the read cache)
+        
+    Returns:
+        sqlite3.Connection: The configured connection
+    """
+    factory = TimedConnection if INSTRUMENTATION_ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(db_file or DB_FILE, factory=factory,
+                           timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=check_same_thread,
+                           cached_statements=DB_STATEMENT_CACHE_SIZE)
+    # Only takes effect while the file is still empty, so it must come
+    # before the journal mode, which writes the database header
+    conn.execute(f"PRAGMA auto_vacuum = {DB_AUTO_VACUUM}")
+    conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {int(DB_CACHE_SIZE)}")
+    return conn
+
+def get_connection():
+    """
+    Return this thread's long-lived connection to DB_FILE.
+    
+    The connection is created on first use and then reused for every later
+    call from the same thread. Connections are keyed by path, so changing
+    DB_FILE at runtime transparently opens a new connection.
+    
+    Returns:
+        sqlite3.Connection: The pooled connection for the current thread
+    """
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    
+    conn = connections.get(DB_FILE)
+    if conn is None:
+        conn = connections[DB_FILE] = open_connection(DB_FILE)
+    return conn
+
+def close_connection():
+    """
+    Close every pooled connection owned by the current thread.
+    
+    Called on application exit, and by worker threads before they finish,
+    so the WAL file is checkpointed and file handles are released.
+    """
+    connections = getattr(_thread_local, "connections", None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+def _discard_connection(conn):
+    """
+    Roll back and drop a pooled connection after a failed operation.
+    
+    A failed statement can leave an open transaction behind; rolling back
+    keeps the next call on this connection clean. If even that fails the
+    connection is closed and removed so the next call reconnects.
+    
+    Args:
+        conn (sqlite3.Connection): The connection that raised an error
+    """
+    try:
+        conn.rollback()
+        return
+    except sqlite3.Error:
+        pass
+    connections = getattr(_thread_local, "connections", None) or {}
+    for path, pooled in list(connections.items()):
+        if pooled is conn:
+            del connections[path]
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
 # =============================================================================
 # DATABASE FUNCTIONS
 # These functions handle all SQLite database operations using the pattern:
-# 1. Open connection to database file
+# 1. Borrow this thread's pooled connection (get_connection)
 # 2. Execute SQL operation
 # 3. Commit changes (for write operations)
-# 4. Close connection
+# 4. Roll back on failure so the connection stays usable
 # 5. Return (success_boolean, data_or_error_message)
 # =============================================================================
 
@@ -76,9 +895,10 @@ def init_database():
         tuple: (success: bool, error_message: str)
                success=True if database created successfully, error_message if failed
     """
+    conn = None
     try:
-        # Open connection to SQLite database file (creates file if doesn't exist)
-        conn = sqlite3.connect(DB_FILE)
+        # Borrow the pooled connection (creates the file if it doesn't exist)
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Create notes table with auto-incrementing ID and text field
@@ -90,15 +910,75 @@ def init_database():
             )
         ''')
         
+        # Index for sorting and filtering by note text (built once for an
+        # existing database, which can take a few seconds at a million notes)
+        cursor.execute(NOTE_INDEX_SCHEMA)
+        
+        # Create the full-text index and its sync triggers. An index created
+        # for an existing database is filled once from the notes table.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'")
+        fts_existed = cursor.fetchone() is not None
+        # Databases created before notes_fts_paused have an insert trigger
+        # without the WHEN clause; it is replaced once, here
+        cursor.execute("SELECT sql FROM sqlite_master "
+                       "WHERE type = 'trigger' AND name = 'notes_fts_insert'")
+        trigger = cursor.fetchone()
+        if trigger and "notes_fts_paused" not in trigger[0]:
+            cursor.execute("DROP TRIGGER notes_fts_insert")
+        try:
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+            if not fts_existed:
+                cursor.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search_notes falls back to LIKE
+            if "fts5" not in str(e):
+                raise
+        
         # Commit the transaction to save changes
         conn.commit()
-        # Always close connection to free resources
-        conn.close()
+        upgrade_schema(conn)
         return True, ""
     except Exception as e:
         # Return error details if database operation fails
+        if conn is not None:
+            _discard_connection(conn)
         return False, str(e)
 
+def upgrade_schema(conn):
+    """
+    Bring the database up to SCHEMA_VERSION.
+    
+    The pending upgrades run in one BEGIN IMMEDIATE transaction together
+    with the new user_version, so a crash leaves the old schema intact and
+    two processes starting at once cannot both apply them.
+    
+    Args:
+        conn (sqlite3.Connection): Connection to upgrade through
+        
+    Raises:
+        sqlite3.Error: If an upgrade fails (nothing is changed)
+    """
+    cursor = conn.cursor()
+    if cursor.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for statements in SCHEMA_UPGRADES[version:]:
+            for statement in statements:
+                cursor.execute(statement)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def now_ms():
+    """Return the current time in milliseconds since the Unix epoch."""
+    return time.time_ns() // 1000000
+
+@instrumented("get_notes")
 def get_notes():
     """
     Retrieve all notes from the database ordered by note_id.
@@ -111,9 +991,13 @@ def get_notes():
                If successful: (True, [(note_id, note_text), ...])
                If failed: (False, error_message)
     """
+    cached = note_cache_snapshot()
+    if cached is not None:
+        return True, cached_rows(cached, 0, len(cached[0]))
+    
+    conn = None
     try:
-        # Open database connection
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Select all notes ordered by ID (oldest first)
@@ -121,419 +1005,4124 @@ def get_notes():
         
         # Fetch all results as list of tuples: [(id, text), (id, text), ...]
         notes = cursor.fetchall()
-        
-        # Close connection (no commit needed for read operations)
-        conn.close()
         return True, notes
     except Exception as e:
         # Return error message if database operation fails
+        if conn is not None:
+            _discard_connection(conn)
         return False, str(e)
 
-def add_note(note_text):
+def iter_note_chunks(chunk_size=EXPORT_CHUNK_SIZE):
     """
-    Add a new note to the database.
+    Stream all notes in note_id order, chunk_size rows at a time.
     
-    Inserts a new record with auto-generated note_id and provided text.
-    Uses parameterized query to prevent SQL injection attacks.
+    Unlike get_notes() this never holds the whole table in memory, so it is
+    used by the exporters. When the read cache is current the chunks are
+    sliced from it instead. Being a generator it cannot use the
+    (success, data) return pattern: database errors are raised to the caller.
     
     Args:
-        note_text (str): The text content of the note to add
+        chunk_size (int, optional): Rows per chunk
+        
+    Yields:
+        list: [(note_id, note_text), ...] with at most chunk_size rows
         
+    Raises:
+        sqlite3.Error: If the query fails
+    """
+    cached = note_cache_snapshot()
+    if cached is not None:
+        for start in range(0, len(cached[0]), chunk_size):
+            yield cached_rows(cached, start, start + chunk_size)
+        return
+    
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute("SELECT note_id, note FROM notes ORDER BY note_id")
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        cursor.close()
+
+@instrumented("count_notes")
+def count_notes(prefix=""):
+    """
+    Count the notes in the database.
+
+    Used by the virtual grid to size its scrollbar without loading any rows.
+
+    Args:
+        prefix (str, optional): Only count notes starting with this text
+            (case-insensitive, answered from the notes_note_nocase index)
+
     Returns:
-        tuple: (success: bool, error_message: str)
-               success=True if note added successfully, error_message if failed
+        tuple: (success: bool, count_or_error: int|str)
     """
+    if not prefix:
+        cached = note_cache_snapshot()
+        if cached is not None:
+            return True, len(cached[0])
+    
+    conn = None
     try:
-        # Open database connection
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
-        
-        # Insert new note using parameterized query (? placeholder prevents SQL injection)
-        # note_id will be auto-generated by AUTOINCREMENT
-        cursor.execute("INSERT INTO notes (note) VALUES (?)", (note_text,))
-        
-        # Commit the transaction to save the new record
-        conn.commit()
-        conn.close()
-        return True, ""
+        if prefix:
+            cursor.execute("SELECT COUNT(*) FROM notes WHERE note LIKE ? ESCAPE '\\'",
+                           (escape_like(prefix) + "%",))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM notes")
+        return True, cursor.fetchone()[0]
     except Exception as e:
-        # Return error details if insert operation fails
+        if conn is not None:
+            _discard_connection(conn)
         return False, str(e)
 
-def update_note(note_id, note_text):
+def escape_like(text):
+    """Escape LIKE wildcards so text matches literally (with ESCAPE '\\')."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def order_by_sql(sort, descending=False):
+    """Return the ORDER BY column list for a sort name from SORT_ORDERS."""
+    direction = " DESC" if descending else ""
+    return ", ".join(column + direction for column in SORT_ORDERS[sort])
+
+@instrumented("get_notes_page")
+def get_notes_page(limit, after_id=None, before_id=None, offset=0, view=None, from_id=None):
     """
-    Update an existing note in the database.
-    
-    Modifies the text content of a note with the specified ID.
-    Uses parameterized query for security.
-    
+    Retrieve one page of notes in the order of a grid view.
+
+    Pages are located by keyset (the rows after or before a given note in
+    the view's order) so the cost of a page does not depend on how far into
+    the table it is. OFFSET is only used when jumping to an arbitrary
+    position, for example when the scrollbar thumb is dragged.
+
+    A view is a dict with "sort" ("id", "note" or None for note_id order),
+    "descending" (bool) and "prefix" (only notes starting with this text,
+    case-insensitive). Sorting and filtering happen in SQL, on the primary
+    key or the notes_note_nocase index.
+
     Args:
-        note_id (int): The ID of the note to update
-        note_text (str): The new text content for the note
-        
+        limit (int): Maximum number of rows to return (-1 for no limit)
+        after_id (int, optional): Return the notes following this note_id
+        before_id (int, optional): Return the notes immediately before this note_id
+        offset (int, optional): Row offset, used only when no keyset is given
+        view (dict, optional): Sort order and filter (default: all notes by note_id)
+        from_id (int, optional): Like after_id, but including the note itself
+
     Returns:
-        tuple: (success: bool, error_message: str)
-               success=True if note updated successfully, error_message if failed
+        tuple: (success: bool, notes_list_or_error: list|str)
+               If successful: (True, [(note_id, note_text), ...]) in view order
+               If failed: (False, error_message)
     """
+    view = view or {}
+    sort = view.get("sort") or "id"
+    descending = bool(view.get("descending"))
+    prefix = view.get("prefix", "")
+    if sort == "id" and not descending and not prefix:
+        cached = note_cache_snapshot()
+        if cached is not None:
+            return True, cached_notes_page(cached, limit, after_id, before_id, offset, from_id)
+    
+    conn = None
     try:
-        # Open database connection
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
         
-        # Update existing note using parameterized query
-        # Parameters are ordered: new_text, note_id_to_match
-        cursor.execute("UPDATE notes SET note = ? WHERE note_id = ?", (note_text, note_id))
+        conditions, params = [], []
+        if prefix:
+            conditions.append("note LIKE ? ESCAPE '\\'")
+            params.append(escape_like(prefix) + "%")
         
-        # Commit the transaction to save changes
-        conn.commit()
-        conn.close()
-        return True, ""
+        backwards = before_id is not None
+        anchor_id = next((i for i in (before_id, after_id, from_id) if i is not None), None)
+        if anchor_id is not None:
+            if sort == "id":
+                key, anchor, anchor_params = "note_id", "?", [anchor_id]
+            else:
+                # Row-value comparison on (text, id); the explicit COLLATE on
+                # the right-hand side lets SQLite seek the NOCASE index
+                cursor.execute("SELECT note FROM notes WHERE note_id = ?", (anchor_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    return True, []
+                key, anchor = "(note, note_id)", "(? COLLATE NOCASE, ?)"
+                anchor_params = [row[0], anchor_id]
+            # Down the grid is towards smaller keys in a descending view
+            operator = "<" if backwards != descending else ">"
+            if from_id is not None and not backwards:
+                operator += "="
+            conditions.append(f"{key} {operator} {anchor}")
+            params.extend(anchor_params)
+        
+        # Walking backwards reads in reverse order, then restores view order
+        order = order_by_sql(sort, descending != backwards)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        limit_sql = " LIMIT ?" if anchor_id is not None else " LIMIT ? OFFSET ?"
+        params.extend([limit] if anchor_id is not None else [limit, offset])
+        if prefix:
+            # A prefix filter always reads the notes_note_nocase range (without
+            # statistics SQLite may walk the whole table in note_id order
+            # looking for the few notes matching a rare prefix). Only the
+            # covering index is sorted and skipped; the page's rows are then
+            # fetched by primary key.
+            sql = (f"SELECT note_id, note FROM notes WHERE note_id IN ("
+                   f"SELECT note_id FROM notes INDEXED BY notes_note_nocase{where} "
+                   f"ORDER BY {order}{limit_sql}) ORDER BY {order}")
+        else:
+            sql = f"SELECT note_id, note FROM notes{where} ORDER BY {order}{limit_sql}"
+        
+        cursor.execute(sql, params)
+        notes = cursor.fetchall()
+        if backwards:
+            notes.reverse()
+        return True, notes
     except Exception as e:
-        # Return error details if update operation fails
+        if conn is not None:
+            _discard_connection(conn)
         return False, str(e)
 
-def delete_note(note_id):
+@instrumented("get_note")
+def get_note(note_id):
     """
-    Delete a note from the database.
-    
-    Permanently removes a note record with the specified ID.
-    This operation cannot be undone.
-    
+    Retrieve a single note by its ID.
+
+    The version is what an editor passes back to update_note as
+    expected_version to detect saves made by someone else meanwhile.
+
     Args:
-        note_id (int): The ID of the note to delete
-        
+        note_id (int): The ID of the note to fetch
+
     Returns:
-        tuple: (success: bool, error_message: str)
-               success=True if note deleted successfully, error_message if failed
+        tuple: (success: bool, note_or_error: tuple|str)
+               If successful: (True, (note_id, note_text, version))
+               If failed or missing: (False, error_message)
     """
+    conn = None
     try:
-        # Open database connection
-        conn = sqlite3.connect(DB_FILE)
+        conn = get_connection()
         cursor = conn.cursor()
-        
-        # Delete note using parameterized query
-        cursor.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
-        
-        # Commit the transaction to save changes
-        conn.commit()
-        conn.close()
-        return True, ""
+        cursor.execute("SELECT note_id, note, version FROM notes WHERE note_id = ?", (note_id,))
+        note = cursor.fetchone()
+        if note is None:
+            return False, f"Note {note_id} not found"
+        return True, note
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+def check_note_text(note_text):
+    """
+    Apply the note rules shared by the editor and the importer.
+    
+    Args:
+        note_text (str): Note text, already stripped of surrounding whitespace
+        
+    Returns:
+        str: "" if the text is valid, otherwise the reason it is rejected
+    """
+    if not note_text:
+        return "Note cannot be empty"
+    if len(note_text) >= NOTE_MAX_LENGTH:
+        return f"Note text exceeds {NOTE_MAX_LENGTH} characters"
+    return ""
+
+def build_search_query(text):
+    """
+    Turn free text typed by the user into an FTS5 MATCH expression.
+    
+    Every word becomes a quoted prefix term, so "meet tom" matches notes
+    containing words starting with "meet" and "tom". Quoting keeps FTS5
+    operators and punctuation in user input from causing syntax errors.
+    
+    Args:
+        text (str): Raw search box contents
+        
+    Returns:
+        str: MATCH expression, or "" if the text has no searchable words
+    """
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+@instrumented("search_notes")
+def search_notes(text, limit=SEARCH_RESULT_LIMIT, view=None):
+    """
+    Full-text search over notes, best matches first.
+    
+    Uses the notes_fts index with bm25 ranking and returns a snippet of each
+    note with the matched words wrapped in [brackets]. If SQLite was built
+    without FTS5 a plain LIKE scan is used instead.
+    
+    With a view (see get_notes_page) only notes starting with its prefix
+    match, and if it has a sort the best `limit` matches are returned in
+    that order instead of by rank.
+    
+    Args:
+        text (str): Words to search for (prefix matching)
+        limit (int, optional): Maximum number of results
+        view (dict, optional): Grid sort order and filter
+        
+    Returns:
+        tuple: (success: bool, results_or_error: list|str)
+               If successful: (True, [(note_id, snippet), ...])
+               If failed: (False, error_message)
+    """
+    match = build_search_query(text)
+    if not match:
+        return True, []
+    
+    view = view or {}
+    sort = view.get("sort")
+    descending = bool(view.get("descending"))
+    prefix = view.get("prefix", "")
+    
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            sql = ("SELECT notes_fts.rowid AS note_id, "
+                   "snippet(notes_fts, 0, '[', ']', '...', 16) AS snippet")
+            params = [match]
+            if prefix or sort == "note":
+                # The note text is needed for the filter or the sort
+                sql += (", notes.note AS note FROM notes_fts "
+                        "JOIN notes ON notes.note_id = notes_fts.rowid WHERE notes_fts MATCH ?")
+                if prefix:
+                    sql += " AND notes.note LIKE ? ESCAPE '\\'"
+                    params.append(escape_like(prefix) + "%")
+            else:
+                sql += " FROM notes_fts WHERE notes_fts MATCH ?"
+            sql += " ORDER BY rank LIMIT ?"
+            params.append(limit)
+            if sort:
+                sql = f"SELECT note_id, snippet FROM ({sql}) ORDER BY {order_by_sql(sort, descending)}"
+            cursor.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if "notes_fts" not in str(e):
+                raise
+            # No FTS5 index available: unranked substring scan
+            sql = "SELECT note_id, note FROM notes WHERE note LIKE ? ESCAPE '\\'"
+            params = ["%" + escape_like(text.strip()) + "%"]
+            if prefix:
+                sql += " AND note LIKE ? ESCAPE '\\'"
+                params.append(escape_like(prefix) + "%")
+            sql += f" ORDER BY {order_by_sql(sort or 'id', descending)} LIMIT ?"
+            cursor.execute(sql, params + [limit])
+        return True, cursor.fetchall()
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+# Single-statement write steps shared by add_note/update_note/delete_note and
+# the background writer's group commits. They never commit themselves.
+
+def insert_note_row(cursor, note_text):
+    """Insert a note and return the change tuple (new_note_id, note_text)."""
+    # Parameterized query (? placeholder prevents SQL injection);
+    # note_id will be auto-generated by AUTOINCREMENT
+    stamp = now_ms()
+    cursor.execute("INSERT INTO notes (note, created_at, updated_at) VALUES (?, ?, ?)",
+                   (note_text, stamp, stamp))
+    # Report the generated ID so the grid can insert just this row
+    change = cursor.lastrowid, note_text
+    index_note_signatures(cursor, [change])
+    return change
+
+def update_note_row(cursor, note_id, note_text, expected_version=None):
+    """
+    Replace a note's text and return the change tuple (note_id, note_text).
+    
+    With expected_version the update only applies if the note is still at
+    that version; otherwise a ValueError starting with NOTE_CONFLICT_ERROR
+    is raised (see is_conflict_error). Without it, a missing note raises
+    ValueError("Note N not found").
+    """
+    # Parameters are ordered: new_text, timestamp, note_id_to_match[, version]
+    if expected_version is None:
+        cursor.execute("UPDATE notes SET note = ?, updated_at = ?, version = version + 1 "
+                       "WHERE note_id = ?", (note_text, now_ms(), note_id))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Note {note_id} not found")
+        index_note_signatures(cursor, [(note_id, note_text)])
+        return note_id, note_text
+    
+    cursor.execute("UPDATE notes SET note = ?, updated_at = ?, version = version + 1 "
+                   "WHERE note_id = ? AND version = ?",
+                   (note_text, now_ms(), note_id, expected_version))
+    if cursor.rowcount == 0:
+        cursor.execute("SELECT 1 FROM notes WHERE note_id = ?", (note_id,))
+        what = "changed" if cursor.fetchone() else "deleted"
+        raise ValueError(f"{NOTE_CONFLICT_ERROR}: note {note_id} was {what} by someone else "
+                         "since it was opened")
+    index_note_signatures(cursor, [(note_id, note_text)])
+    return note_id, note_text
+
+def delete_note_row(cursor, note_id):
+    """Delete a note and return the change tuple (note_id, None)."""
+    cursor.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
+    return note_id, None
+
+def delete_note_rows(cursor, note_ids):
+    """Delete several notes with one executemany and return their change tuples."""
+    cursor.executemany("DELETE FROM notes WHERE note_id = ?", [(note_id,) for note_id in note_ids])
+    return [(note_id, None) for note_id in note_ids]
+
+def replace_in_note_rows(cursor, find, replacement, note_ids=None):
+    """
+    Replace every occurrence of find (case-sensitive) in the given notes.
+    
+    Notes whose text would become empty or too long (see check_note_text)
+    are left unchanged and reported as skipped. The changed notes are
+    written with one executemany.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's write transaction
+        find (str): Text to look for (non-empty)
+        replacement (str): Text to put in its place
+        note_ids (list, optional): Notes to edit; None edits every note containing find
+        
+    Returns:
+        dict: {"changes": [(note_id, new_text), ...], "skipped": [note_id, ...]}
+    """
+    if not find:
+        raise ValueError("Find text cannot be empty")
+    if note_ids is None:
+        cursor.execute("SELECT note_id, note FROM notes WHERE instr(note, ?) > 0", (find,))
+        rows = cursor.fetchall()
+    else:
+        rows = []
+        for start in range(0, len(note_ids), BATCH_ID_CHUNK):
+            chunk = note_ids[start:start + BATCH_ID_CHUNK]
+            cursor.execute("SELECT note_id, note FROM notes WHERE note_id IN "
+                           f"({','.join('?' * len(chunk))}) AND instr(note, ?) > 0",
+                           (*chunk, find))
+            rows.extend(cursor.fetchall())
+    
+    changes, skipped = [], []
+    for note_id, note_text in rows:
+        new_text = note_text.replace(find, replacement).strip()
+        if check_note_text(new_text):
+            skipped.append(note_id)
+        elif new_text != note_text:
+            changes.append((note_id, new_text))
+    stamp = now_ms()
+    cursor.executemany("UPDATE notes SET note = ?, updated_at = ?, version = version + 1 "
+                       "WHERE note_id = ?",
+                       [(new_text, stamp, note_id) for note_id, new_text in changes])
+    index_note_signatures(cursor, changes)
+    return {"changes": changes, "skipped": skipped}
+
+@instrumented("add_note")
+def add_note(note_text):
+    """
+    Add a new note to the database.
+    
+    Inserts a new record with auto-generated note_id and provided text.
+    Uses parameterized query to prevent SQL injection attacks.
+    
+    Args:
+        note_text (str): The text content of the note to add
+        
+    Returns:
+        tuple: (success: bool, change_or_error: tuple|str)
+               If successful: (True, (new_note_id, note_text))
+               If failed: (False, error_message)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        change = insert_note_row(conn.cursor(), note_text)
+        
+        # Commit the transaction to save the new record
+        conn.commit()
+        return True, change
+    except Exception as e:
+        # Return error details if insert operation fails
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("update_note")
+def update_note(note_id, note_text, expected_version=None):
+    """
+    Update an existing note in the database.
+    
+    Modifies the text content of a note with the specified ID.
+    Uses parameterized query for security.
+    
+    Passing the version the note had when it was read (see get_note) makes
+    the update optimistic: if another window or process saved the note in
+    the meantime nothing is written and the error starts with
+    NOTE_CONFLICT_ERROR, so a concurrent edit is never silently lost.
+    
+    Args:
+        note_id (int): The ID of the note to update
+        note_text (str): The new text content for the note
+        expected_version (int, optional): Version the edit started from
+        
+    Returns:
+        tuple: (success: bool, change_or_error: tuple|str)
+               If successful: (True, (note_id, note_text))
+               If failed: (False, error_message)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        change = update_note_row(conn.cursor(), note_id, note_text, expected_version)
+        
+        # Commit the transaction to save changes
+        conn.commit()
+        return True, change
+    except Exception as e:
+        # Return error details if update operation fails
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("delete_note")
+def delete_note(note_id):
+    """
+    Delete a note from the database.
+    
+    Permanently removes a note record with the specified ID.
+    This operation cannot be undone.
+    
+    Args:
+        note_id (int): The ID of the note to delete
+        
+    Returns:
+        tuple: (success: bool, change_or_error: tuple|str)
+               If successful: (True, (note_id, None)) - None marks the row as removed
+               If failed: (False, error_message)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        change = delete_note_row(conn.cursor(), note_id)
+        
+        # Commit the transaction to save changes
+        conn.commit()
+        return True, change
     except Exception as e:
         # Return error details if delete operation fails
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("delete_notes")
+def delete_notes(note_ids):
+    """
+    Delete several notes in one transaction.
+    
+    Args:
+        note_ids (list): IDs of the notes to delete
+        
+    Returns:
+        tuple: (success: bool, changes_or_error: list|str)
+               If successful: (True, [(note_id, None), ...])
+               If failed: (False, error_message) - no note was deleted
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        changes = delete_note_rows(conn.cursor(), note_ids)
+        conn.commit()
+        return True, changes
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("replace_in_notes")
+def replace_in_notes(find, replacement, note_ids=None):
+    """
+    Find and replace text across notes in one transaction.
+    
+    Args:
+        find (str): Text to look for (case-sensitive, non-empty)
+        replacement (str): Text to put in its place
+        note_ids (list, optional): Notes to edit; None edits every note containing find
+        
+    Returns:
+        tuple: (success: bool, summary_or_error: dict|str)
+               If successful: (True, {"changes": [(note_id, new_text), ...], "skipped": [note_id, ...]})
+               If failed: (False, error_message)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        # Take the write lock before reading so no note changes in between
+        cursor.execute("BEGIN IMMEDIATE")
+        summary = replace_in_note_rows(cursor, find, replacement, note_ids)
+        conn.commit()
+        return True, summary
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+# =============================================================================
+# DUPLICATE DETECTION
+# Every note has a row in note_signatures: a hash of its normalized text for
+# exact duplicates and a MinHash signature of its words for near-duplicates,
+# stored as DUPLICATE_BANDS indexed LSH band keys. Notes that share a band
+# key are candidates, and the share of equal signature values estimates how
+# similar they are, so checking a note takes a few index probes and the
+# duplicate report only visits colliding keys instead of comparing every
+# pair of notes.
+# =============================================================================
+
+# Case, spacing and ASCII punctuation are ignored: "Call the plumber!" is an
+# exact duplicate of "call the  plumber"
+PUNCTUATION_TO_SPACE = bytes.maketrans(string.punctuation.encode(), b" " * len(string.punctuation))
+
+# Upper end of each MinHash bin's share of the 32-bit hash range
+_BIN_LIMITS = [(b + 1) * (2**32 // DUPLICATE_HASH_BINS) for b in range(DUPLICATE_HASH_BINS)]
+
+# Fixed pseudo-random tables for note_signature, the same in every process:
+# the order in which an empty bin looks for a bin to borrow from, and one
+# odd multiplier per bin that turns a bin's minimum hash into its byte
+_SIGNATURE_TABLES = hashlib.shake_128(b"note signatures").digest(
+    DUPLICATE_HASH_BINS * (DUPLICATE_HASH_BINS + 4))
+_PROBE_ORDERS = [sorted(range(DUPLICATE_HASH_BINS),
+                        key=lambda c, b=b: (_SIGNATURE_TABLES[b * DUPLICATE_HASH_BINS + c], c))
+                 for b in range(DUPLICATE_HASH_BINS)]
+_BIN_MULTIPLIERS = [int.from_bytes(_SIGNATURE_TABLES[-4 * (b + 1):][:4], "big") | 1
+                    for b in range(DUPLICATE_HASH_BINS)]
+
+# A signature is DUPLICATE_BANDS big-endian signed 32-bit band keys (4 bins
+# each), which SQLite stores in 4 bytes
+_BAND_KEYS = struct.Struct(f">{DUPLICATE_BANDS}i")
+
+SIGNATURE_COLUMNS = ", ".join(f"band{band}" for band in range(DUPLICATE_BANDS))
+
+# Stores a note's signature with the version it was computed from. Parameters:
+# content_hash, the band keys, note_id.
+SIGNATURE_UPSERT = (f"INSERT OR REPLACE INTO note_signatures (note_id, version, content_hash, "
+                    f"{SIGNATURE_COLUMNS}) SELECT note_id, version, ?, "
+                    f"{', '.join('?' * DUPLICATE_BANDS)} FROM notes WHERE note_id = ?")
+
+# Notes without a signature, or with one computed from an older version
+UNSIGNED_NOTES = ("FROM notes n LEFT JOIN note_signatures s ON s.note_id = n.note_id "
+                  "WHERE s.version IS NOT n.version")
+
+def note_signature(note_text):
+    """
+    Compute the duplicate detection signature of a note.
+    
+    The text is case-folded and split into words, ignoring ASCII
+    punctuation. Its shingles are the words and the pairs of adjacent
+    words, hashed with CRC-32 (pairs by chaining) so the hashing runs in C.
+    One-permutation MinHash splits the hash range into DUPLICATE_HASH_BINS
+    bins and takes the smallest hash in each. A bin left empty (notes with
+    few words) borrows the minimum of the first non-empty bin in its own
+    probe order, which keeps the estimate unbiased without the large
+    errors of borrowing from the neighbouring bin. Each bin's minimum is
+    then reduced to one byte by multiply-shift hashing with that bin's
+    multiplier, so bins borrowing the same minimum still get independent
+    bytes. Two notes agree on a byte with a probability close to the
+    Jaccard similarity of their shingle sets (plus 1/256 by chance).
+    30-50 us per note.
+    
+    Args:
+        note_text (str): Note text
+    
+    Returns:
+        tuple: (content_hash: int, signature: bytes) - a signed 64-bit hash of
+               the normalized text and DUPLICATE_HASH_BINS signature bytes
+    """
+    words = note_text.casefold().encode("utf-8").translate(PUNCTUATION_TO_SPACE).split()
+    digest = hashlib.blake2b(b" ".join(words), digest_size=8).digest()
+    word_hashes = list(map(zlib.crc32, words))
+    hashes = sorted(word_hashes + list(map(zlib.crc32, words[1:], word_hashes))) or [0]
+    
+    # Sorted hashes fall into the bins in order: each bin's minimum is its first hash
+    ends = list(map(bisect.bisect_left, itertools.repeat(hashes), _BIN_LIMITS))
+    minimums = [hashes[start] if start < end else -1 for start, end in zip([0] + ends, ends)]
+    if -1 in minimums:
+        filled = minimums[:]
+        for b, minimum in enumerate(filled):
+            if minimum < 0:
+                for c in _PROBE_ORDERS[b]:
+                    if filled[c] >= 0:
+                        minimums[b] = filled[c]
+                        break
+    signature = bytes([(minimum * multiplier >> 24) & 0xFF
+                       for minimum, multiplier in zip(minimums, _BIN_MULTIPLIERS)])
+    return int.from_bytes(digest, "big", signed=True), signature
+
+def signature_similarity(first, second):
+    """Estimate the similarity of two notes (0.0-1.0) as the share of equal signature bytes."""
+    different = int.from_bytes(first, "big") ^ int.from_bytes(second, "big")
+    return different.to_bytes(DUPLICATE_HASH_BINS, "big").count(0) / DUPLICATE_HASH_BINS
+
+def index_note_signatures(cursor, changes):
+    """
+    Store the signatures of written notes in the caller's write transaction.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's write transaction
+        changes (list): (note_id, note_text) change tuples of inserted or updated notes
+    """
+    parameters = []
+    for note_id, note_text in changes:
+        content_hash, signature = note_signature(note_text)
+        parameters.append((content_hash, *_BAND_KEYS.unpack(signature), note_id))
+    cursor.executemany(SIGNATURE_UPSERT, parameters)
+
+@instrumented("find_similar_notes")
+def find_similar_notes(note_text, exclude_id=None, limit=DUPLICATE_CHECK_LIMIT,
+                       threshold=DUPLICATE_SIMILARITY):
+    """
+    Find existing notes that duplicate or nearly duplicate a text.
+    
+    Used to warn before a note is saved. The notes sharing any band key
+    with the text are found through the band indexes (one probe per band,
+    at most DUPLICATE_CANDIDATE_LIMIT candidates) and kept if their
+    estimated similarity reaches threshold; signatures older than their
+    note (edited by another program since) are skipped. Well under a
+    millisecond at a million notes.
+    
+    Args:
+        note_text (str): Text about to be saved
+        exclude_id (int, optional): The note being edited, never reported
+        limit (int, optional): Most similar notes returned
+        threshold (float, optional): Lowest estimated similarity reported
+    
+    Returns:
+        tuple: (success: bool, matches_or_error: list|str)
+               If successful: (True, [(note_id, similarity, note_text), ...]),
+               most similar first; similarity is 1.0 for exact duplicates
+    """
+    conn = None
+    try:
+        content_hash, signature = note_signature(note_text)
+        conn = get_connection()
+        cursor = conn.cursor()
+        bands = " OR ".join(f"s.band{band} = ?" for band in range(DUPLICATE_BANDS))
+        cursor.execute(f"SELECT s.note_id, s.content_hash, "
+                       f"{SIGNATURE_COLUMNS.replace('band', 's.band')}, "
+                       f"n.note FROM note_signatures s "
+                       f"JOIN notes n ON n.note_id = s.note_id AND n.version = s.version "
+                       f"WHERE ({bands}) AND s.note_id IS NOT ? LIMIT ?",
+                       (*_BAND_KEYS.unpack(signature), exclude_id, DUPLICATE_CANDIDATE_LIMIT))
+        matches = []
+        for note_id, other_hash, *keys, other_text in cursor.fetchall():
+            if other_hash == content_hash:
+                similarity = 1.0
+            else:
+                similarity = signature_similarity(signature, _BAND_KEYS.pack(*keys))
+            if similarity >= threshold:
+                matches.append((note_id, similarity, other_text))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return True, matches[:limit]
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+def describe_similar_notes(matches, width=60):
+    """Describe find_similar_notes matches in a few lines for a dialog or stderr."""
+    lines = []
+    for note_id, similarity, note_text in matches:
+        kind = "exact duplicate" if similarity == 1.0 else f"{similarity:.0%} similar"
+        text = note_text if len(note_text) <= width else note_text[:width - 3] + "..."
+        lines.append(f"  note {note_id} ({kind}): {text}")
+    return "Similar notes already exist:\n" + "\n".join(lines)
+
+@instrumented("sync_duplicate_index")
+def sync_duplicate_index(progress=None, cancel=None, batch_size=DUPLICATE_INDEX_BATCH):
+    """
+    Sign the notes the duplicate index is missing.
+    
+    The app signs the notes it saves, so this finds notes from before the
+    index existed, bulk imports and notes other programs added or edited.
+    Each batch is read and signed inside its own BEGIN IMMEDIATE
+    transaction, so no note can change between reading and signing it,
+    and batches are small enough that the background writer and other
+    processes only wait a few milliseconds.
+    
+    Inserting into eight indexes of random keys costs more than signing,
+    so from DUPLICATE_REBUILD_NOTES unsigned notes the band indexes are
+    dropped first and recreated (sorted, in bulk) at the end, even when
+    cancelled: about 4x faster for a first build. Similar-note checks
+    scan the table meanwhile. Every run recreates missing band indexes,
+    so one interrupted by a crash is repaired by the next.
+    
+    Safe to call from a worker thread: it writes through that thread's own
+    pooled connection.
+    
+    Args:
+        progress (callable, optional): Called with a short status text per batch
+        cancel (threading.Event, optional): Stops after the current batch when set
+        batch_size (int, optional): Notes signed per transaction
+    
+    Returns:
+        tuple: (success: bool, signed_or_error: int|str) - notes signed
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        total = cursor.execute(f"SELECT COUNT(*) {UNSIGNED_NOTES}").fetchone()[0]
+        if total >= DUPLICATE_REBUILD_NOTES:
+            cursor.execute("BEGIN IMMEDIATE")
+            for band in range(DUPLICATE_BANDS):
+                cursor.execute(f"DROP INDEX IF EXISTS note_signatures_band{band}")
+            conn.commit()
+        signed = after_id = 0
+        while signed < total and not (cancel is not None and cancel.is_set()):
+            if progress:
+                progress(f"Indexing notes for duplicate detection: {signed:,} of {total:,}...")
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(f"SELECT n.note_id, n.note {UNSIGNED_NOTES} AND n.note_id > ? "
+                           "ORDER BY n.note_id LIMIT ?", (after_id, batch_size))
+            rows = cursor.fetchall()
+            index_note_signatures(cursor, rows)
+            conn.commit()
+            if not rows:
+                break
+            signed += len(rows)
+            after_id = rows[-1][0]
+        
+        if progress and total >= DUPLICATE_REBUILD_NOTES:
+            progress("Indexing notes for duplicate detection: building the band indexes...")
+        cursor.execute("BEGIN IMMEDIATE")
+        for statement in SIGNATURE_INDEX_SCHEMA:
+            cursor.execute(statement)
+        conn.commit()
+        return True, signed
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("find_duplicate_groups", rows=lambda result, *args:
+              result[1]["duplicates"] if result[0] else 0)
+def find_duplicate_groups(threshold=DUPLICATE_SIMILARITY, progress=None, cancel=None):
+    """
+    Group the notes that duplicate each other.
+    
+    Brings the index up to date first (sync_duplicate_index). Then, per
+    band, SQLite lists only the notes whose band key occurs more than once,
+    straight from the band's index, in key order; each note in such a
+    bucket is compared with the bucket's first note and joined to its group
+    (union-find) if the estimated similarity reaches threshold. The work is
+    a scan of each band index plus the colliding notes, so it grows about
+    linearly with the number of notes, where comparing every pair would be
+    quadratic.
+    
+    Groups are connected: A is grouped with C when both resemble B, even if
+    A and C differ more than threshold.
+    
+    Args:
+        threshold (float, optional): Lowest estimated similarity that counts as a duplicate
+        progress (callable, optional): Called with a short status text per step
+        cancel (threading.Event, optional): Stops the search when set
+    
+    Returns:
+        tuple: (success: bool, report_or_error: dict|str)
+               report has groups (largest first, each {"exact": bool, "notes":
+               [(note_id, similarity to the group's first note, note_text), ...]}
+               in ID order), duplicates (notes beyond the first of each group),
+               indexed (notes signed first) and seconds
+    """
+    start = time.perf_counter()
+    cancelled = lambda: cancel is not None and cancel.is_set()
+    report = progress or (lambda text: None)
+    success, indexed = sync_duplicate_index(progress, cancel)
+    if not success:
+        return False, indexed
+    
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        parent = {}
+        signatures = {}
+        
+        def find(note_id):
+            root = note_id
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while note_id != root:
+                parent[note_id], note_id = root, parent[note_id]
+            return root
+        
+        for band in range(DUPLICATE_BANDS):
+            if cancelled():
+                return False, "Duplicate search cancelled"
+            report(f"Comparing notes with equal keys in band {band + 1} of {DUPLICATE_BANDS}...")
+            column = f"band{band}"
+            cursor.execute(f"SELECT {column}, note_id, content_hash, {SIGNATURE_COLUMNS} "
+                           f"FROM note_signatures WHERE {column} IN "
+                           f"(SELECT {column} FROM note_signatures "
+                           f"GROUP BY {column} HAVING COUNT(*) > 1) "
+                           f"ORDER BY {column}, note_id")
+            bucket = first = None
+            for key, note_id, content_hash, *keys in cursor:
+                if note_id not in signatures:
+                    signatures[note_id] = (content_hash, _BAND_KEYS.pack(*keys))
+                if key != bucket:
+                    bucket, first = key, note_id
+                    continue
+                first_root, root = find(first), find(note_id)
+                if first_root == root:
+                    continue
+                first_hash, first_signature = signatures[first]
+                if (content_hash == first_hash or
+                        signature_similarity(first_signature, signatures[note_id][1]) >= threshold):
+                    # The smallest ID stays the root, so it is each group's first note
+                    parent[max(first_root, root)] = min(first_root, root)
+        
+        members = collections.defaultdict(list)
+        for note_id in list(parent):
+            members[find(note_id)].append(note_id)
+        
+        report("Reading the duplicate notes...")
+        texts = {}
+        note_ids = [note_id for root, group in members.items() for note_id in (root, *group)]
+        for chunk_start in range(0, len(note_ids), BATCH_ID_CHUNK):
+            chunk = note_ids[chunk_start:chunk_start + BATCH_ID_CHUNK]
+            cursor.execute(f"SELECT note_id, note FROM notes "
+                           f"WHERE note_id IN ({','.join('?' * len(chunk))})", chunk)
+            texts.update(cursor.fetchall())
+        
+        groups = []
+        for root, group in members.items():
+            first_hash, first_signature = signatures[root]
+            notes = [(root, 1.0, texts.get(root, ""))]
+            for note_id in sorted(group):
+                content_hash, signature = signatures[note_id]
+                similarity = (1.0 if content_hash == first_hash
+                              else signature_similarity(first_signature, signature))
+                notes.append((note_id, similarity, texts.get(note_id, "")))
+            groups.append({"exact": all(signatures[note_id][0] == first_hash for note_id in group),
+                           "notes": notes})
+        groups.sort(key=lambda group: (-len(group["notes"]), group["notes"][0][0]))
+        return True, {"groups": groups,
+                      "duplicates": sum(len(group["notes"]) - 1 for group in groups),
+                      "indexed": indexed,
+                      "seconds": time.perf_counter() - start}
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
         return False, str(e)
 
+def format_duplicate_summary(report):
+    """Describe a find_duplicate_groups report in one line for the UI and the CLI."""
+    exact = sum(group["exact"] for group in report["groups"])
+    text = (f"{len(report['groups']):,} groups of duplicates ({exact:,} exact), "
+            f"{report['duplicates']:,} notes could be removed; {report['seconds']:.2f}s")
+    if report["indexed"]:
+        text += f", {report['indexed']:,} notes indexed first"
+    return text
+
+# =============================================================================
+# READ CACHE
+# While the window is open the whole note set is kept in memory in a compact
+# columnar form: note IDs in an array('q') (8 bytes each instead of an int
+# object) and all texts in one UTF-8 buffer with an array('q') of offsets,
+# so there is no Python object per note. Texts are decoded only for the rows
+# a caller asks for. count_notes, get_notes, get_notes_page and
+# iter_note_chunks answer from it while it is current.
+#
+# Freshness is checked with PRAGMA data_version on the cache's own connection:
+# the value changes whenever any other connection commits, including writers
+# in other processes sharing notes.db, and reading it costs microseconds.
+# A stale cache is a miss (the caller reads SQLite as before) and schedules a
+# reload on a background thread, so the Tk thread never waits for a load.
+# =============================================================================
+
+# The cache connection is shared by the Tk thread and the loader thread, so
+# every use of it holds _cache_lock. Misses counted while that lock is busy
+# go to busy_misses under _cache_stats_lock instead.
+_cache_lock = threading.Lock()
+_cache_stats_lock = threading.Lock()
+_note_cache = {
+    "conn": None, "db_file": None, "version": None,
+    "ids": array("q"),                 # note_id per row, ascending
+    "offsets": array("q", [0]),        # Row i's text is data[offsets[i]:offsets[i + 1]]
+    "data": bytearray(),               # Every note text, UTF-8 encoded, back to back
+    "loading": False,
+    "too_large": None,                 # data_version at which the table was too large
+    "hits": 0, "misses": 0, "busy_misses": 0, "loads": 0, "load_seconds": 0.0,
+}
+
+def empty_note_store():
+    """Return the columns of an empty read cache (see _note_cache)."""
+    return {"ids": array("q"), "offsets": array("q", [0]), "data": bytearray()}
+
+def _cache_connection():
+    """Return the cache's connection to DB_FILE (caller holds _cache_lock)."""
+    if _note_cache["db_file"] != DB_FILE:
+        if _note_cache["conn"] is not None:
+            _note_cache["conn"].close()
+        _note_cache.update(conn=open_connection(DB_FILE, check_same_thread=False),
+                           db_file=DB_FILE, version=None, too_large=None, **empty_note_store())
+    return _note_cache["conn"]
+
+def note_cache_snapshot():
+    """
+    Return the cached note set if it is still current.
+    
+    Never blocks: while a reload holds the cache this is a miss. A miss
+    caused by a change schedules a background reload.
+    
+    Returns:
+        tuple|None: (ids, offsets, data) on a hit (see cached_rows), None on a miss
+    """
+    if not READ_CACHE_ENABLED:
+        return None
+    if not _cache_lock.acquire(blocking=False):
+        with _cache_stats_lock:
+            _note_cache["busy_misses"] += 1
+        return None
+    try:
+        version = _cache_connection().execute("PRAGMA data_version").fetchone()[0]
+        if version == _note_cache["version"]:
+            _note_cache["hits"] += 1
+            return _note_cache["ids"], _note_cache["offsets"], _note_cache["data"]
+        _note_cache["misses"] += 1
+        if version == _note_cache["too_large"]:
+            # Unchanged since the table was found too large to cache
+            return None
+    except sqlite3.Error:
+        _note_cache["misses"] += 1
+        return None
+    finally:
+        _cache_lock.release()
+    start_cache_reload()
+    return None
+
+def start_cache_reload(delay=READ_CACHE_RELOAD_DELAY):
+    """
+    Reload the cache on a background thread unless a reload is already pending.
+    
+    The loader waits `delay` seconds first, so a burst of edits causes one
+    reload rather than one per edit.
+    """
+    with _cache_lock:
+        if _note_cache["loading"]:
+            return
+        _note_cache["loading"] = True
+    
+    def loader():
+        try:
+            time.sleep(delay)
+            load_note_cache()
+        finally:
+            with _cache_lock:
+                _note_cache["loading"] = False
+    
+    threading.Thread(target=loader, name="note-cache", daemon=True).start()
+
+def load_note_cache():
+    """
+    Read every note into the cache in one read transaction.
+    
+    data_version is read inside the same transaction as the rows, so a
+    commit that lands during the load makes the result stale at once
+    instead of being missed. Tables above READ_CACHE_MAX_NOTES are not cached.
+    
+    Returns:
+        tuple: (success: bool, rows_or_error: int|str)
+    """
+    with _cache_lock:
+        conn = _cache_connection()
+        try:
+            start = time.perf_counter()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            version = cursor.execute("PRAGMA data_version").fetchone()[0]
+            total = cursor.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+            if total > READ_CACHE_MAX_NOTES:
+                conn.rollback()
+                _note_cache.update(version=None, too_large=version, **empty_note_store())
+                return False, f"{total} notes exceed the read cache limit"
+            
+            # New containers every time: snapshots handed out earlier stay intact
+            store = empty_note_store()
+            ids, offsets, data = store["ids"], store["offsets"], store["data"]
+            # SQLite hands the texts over as UTF-8 bytes, so nothing is decoded
+            # and re-encoded on the way into the buffer
+            conn.text_factory = bytes
+            cursor.execute("SELECT note_id, note FROM notes ORDER BY note_id")
+            while True:
+                chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                ids.extend([row[0] for row in chunk])
+                texts = [row[1] for row in chunk]
+                offsets.extend(itertools.islice(
+                    itertools.accumulate(map(len, texts), initial=len(data)), 1, None))
+                data += b"".join(texts)
+            conn.rollback()
+            
+            _note_cache.update(version=version, too_large=None, **store)
+            _note_cache["loads"] += 1
+            _note_cache["load_seconds"] += time.perf_counter() - start
+            return True, len(ids)
+        except Exception as e:
+            _note_cache["version"] = None
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            return False, str(e)
+        finally:
+            conn.text_factory = str
+
+def cached_rows(cached, start, end):
+    """
+    Return rows start..end-1 of a cache snapshot, decoding only their texts.
+    
+    Args:
+        cached (tuple): (ids, offsets, data) from note_cache_snapshot()
+        start (int): First row index
+        end (int): Row index after the last row (clamped to the row count)
+        
+    Returns:
+        list: [(note_id, note_text), ...]
+    """
+    ids, offsets, data = cached
+    end = min(end, len(ids))
+    view = memoryview(data)
+    return [(ids[i], str(view[offsets[i]:offsets[i + 1]], "utf-8")) for i in range(start, end)]
+
+def cached_notes_page(cached, limit, after_id=None, before_id=None, offset=0, from_id=None):
+    """
+    Slice one page out of a cache snapshot, with get_notes_page semantics.
+    
+    Args:
+        cached (tuple): (ids, offsets, data) from note_cache_snapshot()
+        limit (int): Maximum number of rows
+        after_id (int, optional): Rows with note_id greater than this
+        before_id (int, optional): The rows immediately before this note_id
+        offset (int, optional): Row offset when no keyset is given
+        from_id (int, optional): Rows from this note_id on, inclusive
+        
+    Returns:
+        list: [(note_id, note_text), ...] ascending by note_id
+    """
+    ids = cached[0]
+    limit = len(ids) if limit < 0 else limit
+    if before_id is not None:
+        end = bisect.bisect_left(ids, before_id)
+        start = max(0, end - limit)
+    elif after_id is not None:
+        start = bisect.bisect_right(ids, after_id)
+    elif from_id is not None:
+        start = bisect.bisect_left(ids, from_id)
+    else:
+        start = offset
+    if before_id is None:
+        end = start + limit
+    return cached_rows(cached, start, end)
+
+def note_cache_stats():
+    """
+    Return the read cache's counters.
+    
+    Returns:
+        dict: enabled, rows, id_bytes, text_bytes, hits, misses, hit_rate,
+              loads, load_ms and too_large
+    """
+    hits, misses = _note_cache["hits"], _note_cache["misses"] + _note_cache["busy_misses"]
+    ids, offsets = _note_cache["ids"], _note_cache["offsets"]
+    return {
+        "enabled": READ_CACHE_ENABLED,
+        "rows": len(ids),
+        "id_bytes": ids.itemsize * len(ids),
+        "text_bytes": offsets.itemsize * len(offsets) + len(_note_cache["data"]),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "loads": _note_cache["loads"],
+        "load_ms": _note_cache["load_seconds"] * 1000,
+        "too_large": _note_cache["too_large"] is not None,
+    }
+
+def close_note_cache():
+    """Drop the cached notes and close the cache connection (on exit)."""
+    with _cache_lock:
+        if _note_cache["conn"] is not None:
+            _note_cache["conn"].close()
+        _note_cache.update(conn=None, db_file=None, version=None, **empty_note_store())
+
+# =============================================================================
+# USER INTERFACE FUNCTIONS
+# These functions handle GUI operations, user interactions, and data display
+# =============================================================================
+
+def grid_text(note_text):
+    """
+    Return the text shown for a note in the grid.
+    
+    Rows only carry the first GRID_TEXT_CHARS characters (about what the
+    Note column can show), so Tk and the grid state never hold a second
+    full copy of every visible note; editors read the full text with
+    get_note when they open.
+    """
+    if len(note_text) > GRID_TEXT_CHARS:
+        return note_text[:GRID_TEXT_CHARS - 1] + "\u2026"
+    return note_text
+
+@instrumented("refresh_notes_grid", rows=lambda result, tree, *args: len(tree.get_children()))
+def refresh_notes_grid(tree, error_label):
+    """
+    Refresh the notes grid with current data from database.
+    
+    This function is called whenever the data changes (add, edit, delete operations)
+    to ensure the UI displays the most current information.
+    
+    Grids set up with enable_virtual_grid only re-read the rows currently
+    materialized in the window, so the cost stays flat as the table grows.
+    Other grids are cleared and fully repopulated.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget to refresh
+        error_label (tk.Label): Label widget for displaying error messages
+    """
+    if str(tree) in _virtual_grids:
+        reload_virtual_grid(tree)
+        return
+    
+    # Clear all existing items from the tree view
+    # tree.get_children() returns all top-level items
+    tree.delete(*tree.get_children())
+    
+    # Fetch current notes from database
+    success, notes = get_notes()
+    if not success:
+        # If database error, display error message and exit
+        show_error(error_label, f"Database error: {notes}")
+        return
+    
+    # Insert each note as a row in the tree view
+    # notes is a list of tuples: [(note_id, note_text), ...]
+    for note_id, note_text in notes:
+        # Item IDs are the note IDs so rows can be found without scanning
+        tree.insert("", "end", iid=str(note_id), values=(note_id, grid_text(note_text)))
+
+# Change watch of this window: the Tk connection's data_version last seen,
+# and how many of the window's own background jobs are writing
+_database_watch = {"version": None, "jobs": 0}
+
+def read_data_version():
+    """Return PRAGMA data_version of the Tk thread's connection, or None on error."""
+    try:
+        return get_connection().execute("PRAGMA data_version").fetchone()[0]
+    except sqlite3.Error:
+        return None
+
+def absorb_own_commits():
+    """
+    Mark everything committed so far as seen by the change watch.
+    
+    Called on the Tk thread once the window has applied its own changes
+    (write results delivered, grid reloaded after an import), so they
+    don't cause a second, full reload. A commit by another process in the
+    few milliseconds between the window's commit and this call is picked
+    up with the next one.
+    """
+    if _database_watch["version"] is not None:
+        _database_watch["version"] = read_data_version()
+
+def watch_database(tree, error_label, interval=DB_WATCH_MS):
+    """
+    Refresh the grid whenever another connection commits to the database.
+    
+    Polls PRAGMA data_version on the Tk thread's connection with after();
+    the value changes when any other connection commits, including other
+    processes sharing the file, and reading it costs microseconds. The
+    refresh is the usual window reload (a count and one page).
+    
+    The window's own commits change the value too, since they are made on
+    the writer's and workers' connections. Polling pauses while its writes
+    are in flight or a background job that writes is running (see
+    run_in_background), and delivering write results absorbs the new value
+    (absorb_own_commits), so saves only update their rows. A writing job
+    causes at most one reload when it ends, which also covers commits other
+    processes made meanwhile.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget
+        error_label (tk.Label): Label widget for displaying error messages
+        interval (int, optional): Milliseconds between polls
+    """
+    def poll():
+        if not _writer["pending"] and not _database_watch["jobs"]:
+            seen = _database_watch["version"]
+            version = read_data_version()
+            if version is None:
+                version = seen
+            if seen is not None and version != seen:
+                refresh_notes_grid(tree, error_label)
+            _database_watch["version"] = version
+        tree.after(interval, poll)
+    
+    _database_watch["version"] = read_data_version()
+    tree.after(interval, poll)
+
+def apply_note_change(tree, error_label, note_id, note_text, inserted=False):
+    """
+    Apply a single-row change to the notes grid without rebuilding it.
+    
+    Called with the (note_id, note_text) change returned by add_note,
+    update_note or delete_note. Only the affected Treeview item is inserted,
+    updated or removed; use refresh_notes_grid for an explicit full reload.
+    An edit of a note the grid doesn't show changes nothing: only add_note
+    results (inserted=True) add rows.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget
+        error_label (tk.Label): Label widget for displaying error messages
+        note_id (int): ID of the note that changed
+        note_text (str|None): New text, or None if the note was deleted
+        inserted (bool, optional): Whether the change is a new note
+    """
+    if str(tree) in _virtual_grids:
+        apply_virtual_note_change(tree, note_id, note_text, inserted)
+        return
+    
+    iid = str(note_id)
+    if note_text is None:
+        if tree.exists(iid):
+            tree.delete(iid)
+    elif tree.exists(iid):
+        tree.item(iid, values=(note_id, grid_text(note_text)))
+    elif inserted:
+        # New notes get the highest ID, so they belong at the end
+        tree.insert("", "end", iid=iid, values=(note_id, grid_text(note_text)))
+
+def apply_note_changes(tree, error_label, changes):
+    """
+    Apply the changes of a batch delete or edit to the notes grid at once.
+    
+    Virtual grids drop the changed notes from the selection and search
+    results and then re-read the window once, instead of once per note.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget
+        error_label (tk.Label): Label widget for displaying error messages
+        changes (list): (note_id, note_text|None) tuples as returned by
+            delete_notes and replace_in_notes
+    """
+    if len(changes) == 1 or str(tree) not in _virtual_grids:
+        for note_id, note_text in changes:
+            apply_note_change(tree, error_label, note_id, note_text)
+        return
+    if not changes:
+        return
+    
+    state = _virtual_grids[str(tree)]
+    texts = dict(changes)
+    deleted = {note_id for note_id, note_text in changes if note_text is None}
+    state["selected"] -= deleted
+    # Removing the items also drops them from the Treeview selection
+    tree.delete(*[str(note_id) for note_id in deleted if tree.exists(str(note_id))])
+    if state["search"] is not None:
+        state["search"] = [(note_id, texts.get(note_id, note_text))
+                           for note_id, note_text in state["search"] if note_id not in deleted]
+        state["total"] = len(state["search"])
+        scroll_virtual_grid(tree, state["offset"], reload=True)
+    else:
+        reload_virtual_grid(tree)
+
+# =============================================================================
+# BACKGROUND WORKERS
+# Slow work runs on a worker thread with its own pooled connection. Results
+# come back through a queue that the Tk thread polls with after(), because
+# Tk widgets must only be touched from the thread running mainloop.
+# =============================================================================
+
+def run_in_background(widget, work, on_done, on_progress=None, writes=False):
+    """
+    Run work() on a daemon thread and pass its result to on_done on the Tk thread.
+    
+    When on_progress is given, work is called as work(report): every
+    report(value) made by the worker is delivered to on_progress(value) on
+    the Tk thread. Only the latest value per poll is delivered.
+    
+    Args:
+        widget (tk.Widget): Any widget, used to schedule polling with after()
+        work (callable): Function returning a (success, data_or_error) tuple
+        on_done (callable): Called with that tuple once work() has finished
+        on_progress (callable, optional): Called with progress values
+        writes (bool, optional): work() commits to the database; the change
+            watch (watch_database) pauses until it has finished
+    """
+    results = queue.Queue()
+    if writes:
+        _database_watch["jobs"] += 1
+    
+    def report(value):
+        results.put(("progress", value))
+    
+    def runner():
+        try:
+            outcome = work(report) if on_progress else work()
+        except Exception as e:
+            outcome = (False, str(e))
+        finally:
+            # Worker threads own their connections; release them on exit
+            close_connection()
+        results.put(("done", outcome))
+    
+    def poll():
+        latest = None
+        while True:
+            try:
+                kind, value = results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "done":
+                if writes:
+                    _database_watch["jobs"] -= 1
+                if latest is not None:
+                    on_progress(latest)
+                on_done(value)
+                return
+            latest = value
+        if latest is not None:
+            on_progress(latest)
+        widget.after(BACKGROUND_POLL_MS, poll)
+    
+    threading.Thread(target=runner, daemon=True).start()
+    widget.after(BACKGROUND_POLL_MS, poll)
+
+# =============================================================================
+# BACKGROUND WRITER
+# Note saves and deletes from the window go through one writer thread, so a
+# slow disk or a lock held by another process never freezes the Tk thread.
+# Writes that queue up while a commit is in progress are applied together in
+# one transaction (group commit), each inside its own SAVEPOINT so one failed
+# write does not undo the others. A locked database is retried with backoff.
+# Results come back through a queue that the Tk thread drains with after().
+# =============================================================================
+
+# Write steps the writer understands: operation name -> row function
+WRITE_OPERATIONS = {
+    "add": insert_note_row,
+    "update": update_note_row,
+    "delete": delete_note_row,
+    "delete_many": delete_note_rows,
+    "replace": replace_in_note_rows,
+}
+
+_write_requests = queue.Queue()        # (operation, args, on_done) or None to stop
+_write_results = queue.Queue()         # (on_done, result) for the Tk thread
+_writer = {"thread": None, "pending": 0, "polling": False}
+
+def is_locked_error(error):
+    """Return True if an sqlite3 error means another connection holds the lock."""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def is_conflict_error(error):
+    """Return True if an update failed because the note changed since it was read."""
+    return str(error).startswith(NOTE_CONFLICT_ERROR)
+
+def describe_write_error(error):
+    """Turn a failed write's error into a message for the user."""
+    if is_locked_error(error):
+        return (f"The notes database is busy: another program has been writing to it for "
+                f"more than {DB_BUSY_TIMEOUT_MS / 1000:g}s. Please try again.")
+    return str(error)
+
+@instrumented("commit_write_batch", rows=lambda result, batch: len(batch))
+def commit_write_batch(batch):
+    """
+    Apply a batch of queued writes in one transaction.
+    
+    Each write runs inside its own SAVEPOINT: a write that fails (for
+    example a constraint violation) is rolled back alone and reported,
+    while the rest of the batch is still committed. If the database stays
+    locked past the busy timeout the whole batch is retried with
+    exponential backoff, up to WRITE_RETRY_ATTEMPTS times. A failed
+    attempt discards the thread's connection, so each attempt borrows the
+    connection afresh from get_connection.
+    
+    Args:
+        batch (list): (operation, args) pairs, see WRITE_OPERATIONS
+        
+    Returns:
+        list: One (success, change_or_error) tuple per write, in order
+    """
+    delay = WRITE_RETRY_DELAY
+    for attempt in range(WRITE_RETRY_ATTEMPTS + 1):
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            results = []
+            for operation, args in batch:
+                cursor.execute("SAVEPOINT write_request")
+                try:
+                    change = WRITE_OPERATIONS[operation](cursor, *args)
+                except sqlite3.OperationalError as e:
+                    if is_locked_error(e):
+                        raise
+                    cursor.execute("ROLLBACK TO write_request")
+                    results.append((False, str(e)))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_request")
+                    results.append((False, str(e)))
+                else:
+                    results.append((True, change))
+                cursor.execute("RELEASE write_request")
+            conn.commit()
+            return results
+        except sqlite3.OperationalError as e:
+            if conn is not None:
+                _discard_connection(conn)
+            if not is_locked_error(e) or attempt == WRITE_RETRY_ATTEMPTS:
+                return [(False, str(e))] * len(batch)
+            time.sleep(delay)
+            delay *= 2
+        except Exception as e:
+            if conn is not None:
+                _discard_connection(conn)
+            return [(False, str(e))] * len(batch)
+
+def writer_loop():
+    """
+    Body of the writer thread: take queued writes and group-commit them.
+    
+    Blocks for the first request, then drains whatever else is already
+    queued (up to WRITE_BATCH_MAX) so a burst becomes one commit. A None
+    request stops the thread after the current batch.
+    """
+    running = True
+    while running:
+        request = _write_requests.get()
+        if request is None:
+            break
+        batch = [request]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                request = _write_requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                running = False
+                break
+            batch.append(request)
+        
+        try:
+            results = commit_write_batch([(op, args) for op, args, _ in batch])
+        except Exception as e:
+            results = [(False, str(e))] * len(batch)
+        for (_, _, on_done), result in zip(batch, results):
+            _write_results.put((on_done, result))
+    close_connection()
+
+def submit_write(widget, operation, args, on_done):
+    """
+    Queue a note write for the background writer.
+    
+    Returns immediately; on_done(result) is called on the Tk thread with the
+    same (success, change_or_error) tuple add_note/update_note/delete_note
+    would have returned.
+    
+    Args:
+        widget (tk.Widget): A long-lived widget (main window or grid) used to
+            schedule result delivery; it must outlive short-lived dialogs
+        operation (str): A WRITE_OPERATIONS name, e.g. "add", "update" or "delete"
+        args (tuple): Arguments for the row function, e.g. (note_id, note_text)
+        on_done (callable): Called with the result on the Tk thread
+    """
+    thread = _writer["thread"]
+    if thread is None or not thread.is_alive():
+        thread = _writer["thread"] = threading.Thread(target=writer_loop, name="note-writer",
+                                                      daemon=True)
+        thread.start()
+    _writer["pending"] += 1
+    _write_requests.put((operation, args, on_done))
+    if not _writer["polling"]:
+        _writer["polling"] = True
+        widget.after(WRITE_POLL_MS, lambda: deliver_write_results(widget))
+
+def deliver_write_results(widget):
+    """
+    Run finished writes' callbacks on the Tk thread, then poll again if needed.
+    
+    Callbacks stop after WRITE_DELIVERY_BUDGET seconds and resume on the next
+    poll, so a storm of completed writes cannot stall redrawing.
+    """
+    deadline = time.perf_counter() + WRITE_DELIVERY_BUDGET
+    while time.perf_counter() < deadline:
+        try:
+            on_done, result = _write_results.get_nowait()
+        except queue.Empty:
+            break
+        _writer["pending"] -= 1
+        try:
+            on_done(result)
+        except Exception as e:
+            print(f"Write callback failed: {e}", file=sys.stderr)
+    
+    if _writer["pending"] > 0:
+        widget.after(WRITE_POLL_MS, lambda: deliver_write_results(widget))
+    else:
+        _writer["polling"] = False
+        # The grid already shows these writes; don't reload for them
+        absorb_own_commits()
+
+def stop_writer(timeout=10):
+    """
+    Let the writer finish queued writes and stop it (called on exit).
+    
+    Args:
+        timeout (float, optional): Seconds to wait for queued writes to commit
+    """
+    thread = _writer["thread"]
+    if thread is not None and thread.is_alive():
+        _write_requests.put(None)
+        thread.join(timeout)
+    _writer["thread"] = None
+
+# =============================================================================
+# VIRTUAL GRID
+# Only the rows that fit in the Treeview plus a small overscan buffer are
+# materialized as Tk items. The scrollbar is driven by the row count, and
+# pages are read by keyset as the user scrolls, so neither refresh time nor
+# Tk memory grows with the size of the notes table. Clicking a column heading
+# sorts and the "Starts with" box filters; both are applied by the SQL of
+# each page (see get_notes_page), never by sorting Treeview items.
+# =============================================================================
+
+# Virtual grid state dicts, keyed by Treeview widget path
+_virtual_grids = {}
+
+# Sortable columns: sort name -> (Treeview column, heading text)
+GRID_HEADINGS = {
+    "id": ("ID", "Note ID"),
+    "note": ("Note", "Note"),
+}
+
+def enable_virtual_grid(tree, scrollbar, error_label):
+    """
+    Switch a Treeview to windowed (virtual) display mode.
+    
+    The Treeview stops scrolling itself: the scrollbar, mouse wheel and
+    navigation keys all move a window of rows that is fetched on demand.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget
+        scrollbar (ttk.Scrollbar): Vertical scrollbar next to the grid
+        error_label (tk.Label): Label widget for displaying error messages
+    """
+    _virtual_grids[str(tree)] = {
+        "scrollbar": scrollbar,
+        "error_label": error_label,
+        "offset": 0,                           # Row index of the first visible row
+        "total": 0,                            # Rows in the table
+        "visible": int(tree.cget("height")),   # Rows that fit in the widget
+        "rows": [],                            # Materialized (note_id, note) rows
+        "selected": set(),                     # Selected note IDs, including scrolled-out ones
+        "search": None,                        # Search results shown instead of all notes
+        "search_job": None,                    # Pending debounced search (after ID)
+        "search_generation": 0,                # Discards results of superseded searches
+        "view": {"sort": None, "descending": False, "prefix": ""},  # See get_notes_page
+        "filter_job": None,                    # Pending debounced filter (after ID)
+    }
+    
+    scrollbar.configure(command=lambda *args: on_virtual_scrollbar(tree, *args))
+    tree.configure(yscrollcommand="")
+    
+    def on_wheel(event):
+        if event.num == 4 or event.delta > 0:
+            scroll_virtual_grid_by(tree, -GRID_WHEEL_ROWS)
+        else:
+            scroll_virtual_grid_by(tree, GRID_WHEEL_ROWS)
+        return "break"
+    
+    def on_plain_click(event):
+        # A plain click replaces the selection, so forget scrolled-out rows
+        _virtual_grids[str(tree)]["selected"].clear()
+    
+    tree.bind("<MouseWheel>", on_wheel)
+    tree.bind("<Button-4>", on_wheel)
+    tree.bind("<Button-5>", on_wheel)
+    tree.bind("<Button-1>", on_plain_click)
+    tree.bind("<Control-Button-1>", lambda event: None)
+    tree.bind("<Shift-Button-1>", lambda event: None)
+    tree.bind("<Up>", lambda event: move_virtual_focus(tree, -1))
+    tree.bind("<Down>", lambda event: move_virtual_focus(tree, 1))
+    tree.bind("<Prior>",
+              lambda event: scroll_virtual_grid_by(tree, -_virtual_page_rows(tree)) or "break")
+    tree.bind("<Next>",
+              lambda event: scroll_virtual_grid_by(tree, _virtual_page_rows(tree)) or "break")
+    tree.bind("<Home>", lambda event: scroll_virtual_grid(tree, 0) or "break")
+    tree.bind("<End>",
+              lambda event: scroll_virtual_grid(tree, _virtual_grids[str(tree)]["total"]) or "break")
+    tree.bind("<Configure>", lambda event: on_virtual_resize(tree, event.height))
+
+def _virtual_page_rows(tree):
+    """Return how many rows one page-up/page-down should move."""
+    return max(1, _virtual_grids[str(tree)]["visible"] - 1)
+
+def reload_virtual_grid(tree):
+    """
+    Re-read the row count and the current window from the database.
+    
+    The window is re-anchored on its first note_id, so the view stays put
+    even when rows are added or removed elsewhere in the table.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+    """
+    state = _virtual_grids[str(tree)]
+    if state["search"] is not None:
+        run_grid_search(tree, state["query"])
+        return
+    
+    success, total = count_notes(state["view"]["prefix"])
+    if not success:
+        show_error(state["error_label"], f"Database error: {total}")
+        return
+    state["total"] = total
+    scroll_virtual_grid(tree, state["offset"], reload=True)
+
+def scroll_virtual_grid_by(tree, delta):
+    """Scroll the virtual grid by delta rows (negative scrolls up)."""
+    state = _virtual_grids[str(tree)]
+    scroll_virtual_grid(tree, state["offset"] + delta)
+
+def scroll_virtual_grid(tree, offset, reload=False):
+    """
+    Move the virtual grid window so row `offset` is the first visible row.
+    
+    Small moves reuse the rows already loaded and fetch only the missing
+    edge by keyset. Large jumps fall back to a single OFFSET query.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        offset (int): Index of the row to show at the top
+        reload (bool, optional): Re-read the current window from the database
+    """
+    state = _virtual_grids[str(tree)]
+    rows = state["rows"]
+    window = state["visible"] + GRID_OVERSCAN
+    offset = max(0, min(offset, state["total"] - state["visible"]))
+    delta = offset - state["offset"]
+    
+    if state["search"] is not None:
+        # Search results are already in memory; just slice the window
+        state["offset"] = offset
+        _paint_virtual_grid(tree, state, state["search"][offset:offset + window])
+        return
+    
+    view = state["view"]
+    if rows and reload and delta == 0 and view["sort"] in (None, "id"):
+        # Same position: re-read from the first materialized note onwards
+        success, page = get_notes_page(window, from_id=rows[0][0], view=view)
+    elif rows and not reload and 0 < delta < len(rows):
+        # Scrolling down: keep the overlap, fetch only the new tail
+        kept = rows[delta:]
+        success, page = get_notes_page(window - len(kept), after_id=kept[-1][0], view=view)
+        page = kept + page if success else page
+    elif rows and not reload and -window < delta < 0:
+        # Scrolling up: fetch only the new head, keep the overlap
+        success, page = get_notes_page(-delta, before_id=rows[0][0], view=view)
+        page = page + rows[:window - len(page)] if success else page
+    elif rows and not reload and delta == 0:
+        return
+    else:
+        # Jump (scrollbar drag, Home/End, first load) or a reload in text
+        # order, where edits may have moved the first row: locate by offset
+        success, page = get_notes_page(window, offset=offset, view=view)
+    
+    if not success:
+        show_error(state["error_label"], f"Database error: {page}")
+        return
+    
+    state["offset"] = offset
+    _paint_virtual_grid(tree, state, page)
+
+def _paint_virtual_grid(tree, state, rows):
+    """
+    Replace the materialized Treeview items with rows and sync the scrollbar.
+    
+    Selection is tracked by note_id so that selected rows stay selected
+    after they scroll out of the window and back in again.
+    """
+    old_ids = {note_id for note_id, _ in state["rows"]}
+    selected = {note_id for note_id in state["selected"] if note_id not in old_ids}
+    selected.update(int(iid) for iid in tree.selection())
+    focus = tree.focus()
+    
+    rows = [(note_id, grid_text(note_text)) for note_id, note_text in rows]
+    tree.delete(*tree.get_children())
+    for row in rows:
+        tree.insert("", "end", iid=str(row[0]), values=row)
+    
+    state["rows"] = rows
+    state["selected"] = selected
+    visible_selection = [str(note_id) for note_id, _ in rows if note_id in selected]
+    if visible_selection:
+        tree.selection_set(visible_selection)
+    if focus and tree.exists(focus):
+        tree.focus(focus)
+    tree.yview_moveto(0)
+    _update_virtual_scrollbar(state)
+
+def _update_virtual_scrollbar(state):
+    """Size the scrollbar thumb from the window offset and the row count."""
+    total = state["total"]
+    if total:
+        state["scrollbar"].set(state["offset"] / total,
+                               min(1.0, (state["offset"] + state["visible"]) / total))
+    else:
+        state["scrollbar"].set(0.0, 1.0)
+
+def on_virtual_scrollbar(tree, command, *args):
+    """
+    Translate scrollbar commands into virtual grid moves.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        command (str): "moveto" (thumb drag) or "scroll" (arrows, trough clicks)
+        args: Fraction for "moveto"; count and "units"/"pages" for "scroll"
+    """
+    state = _virtual_grids[str(tree)]
+    if command == "moveto":
+        scroll_virtual_grid(tree, int(float(args[0]) * state["total"]))
+    elif command == "scroll":
+        count, what = int(args[0]), args[1]
+        rows = _virtual_page_rows(tree) if what == "pages" else 1
+        scroll_virtual_grid_by(tree, count * rows)
+
+def on_virtual_resize(tree, height):
+    """Recompute how many rows fit after the grid is resized."""
+    state = _virtual_grids[str(tree)]
+    # One row's worth of height is taken by the column headings
+    visible = max(1, height // GRID_ROW_HEIGHT - 1)
+    if visible != state["visible"]:
+        state["visible"] = visible
+        scroll_virtual_grid(tree, state["offset"], reload=True)
+
+def move_virtual_focus(tree, step):
+    """
+    Move the focused/selected row up or down, scrolling the window as needed.
+    
+    Replaces the Treeview's own arrow-key handling, which would otherwise
+    scroll the Treeview inside the materialized window.
+    """
+    state = _virtual_grids[str(tree)]
+    ids = [note_id for note_id, _ in state["rows"]]
+    if not ids:
+        return "break"
+    
+    focus = tree.focus()
+    if focus and int(focus) in ids:
+        index = ids.index(int(focus)) + step
+    else:
+        index = 0
+    
+    # Stepping past either edge of the visible rows scrolls the window by one
+    if index < 0:
+        scroll_virtual_grid_by(tree, -1)
+        index = 0
+    elif index >= state["visible"]:
+        scroll_virtual_grid_by(tree, 1)
+        index = state["visible"] - 1
+    ids = [note_id for note_id, _ in state["rows"]]
+    if not ids:
+        return "break"
+    index = min(index, len(ids) - 1)
+    
+    state["selected"].clear()
+    iid = str(ids[index])
+    tree.selection_set(iid)
+    tree.focus(iid)
+    return "break"
+
+def apply_virtual_note_change(tree, note_id, note_text, inserted=False):
+    """
+    Apply a single-row change to a virtual grid.
+    
+    Edits touch one item, deletions remove one item and pull in at most one
+    replacement row by keyset, and additions are only materialized when the
+    window already shows the end of the table. Edits of notes outside the
+    window change nothing.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        note_id (int): ID of the note that changed
+        note_text (str|None): New text, or None if the note was deleted
+        inserted (bool, optional): Whether the change is a new note
+    """
+    state = _virtual_grids[str(tree)]
+    rows = state["rows"]
+    window = state["visible"] + GRID_OVERSCAN
+    iid = str(note_id)
+    
+    if state["search"] is not None:
+        # Edits and deletions show up in the results; new notes appear
+        # once the search is run again
+        if note_text is None:
+            state["search"] = [row for row in state["search"] if row[0] != note_id]
+            state["total"] = len(state["search"])
+            state["selected"].discard(note_id)
+        else:
+            state["search"] = [(row[0], note_text) if row[0] == note_id else row
+                               for row in state["search"]]
+        scroll_virtual_grid(tree, state["offset"], reload=True)
+        return
+    
+    view = state["view"]
+    if view["sort"] not in (None, "id") or view["descending"] or view["prefix"]:
+        # The change can move, hide or reveal rows anywhere in this order,
+        # so re-read the count and the window (two indexed queries)
+        if note_text is None:
+            state["selected"].discard(note_id)
+        reload_virtual_grid(tree)
+        return
+    
+    if note_text is None:
+        state["total"] = max(0, state["total"] - 1)
+        state["selected"].discard(note_id)
+        if tree.exists(iid):
+            state["rows"] = rows = [row for row in rows if row[0] != note_id]
+            tree.delete(iid)
+            if len(rows) == window - 1:
+                # Pull in the next row so the window stays full
+                success, page = get_notes_page(1, after_id=rows[-1][0] if rows else note_id)
+                if success and page:
+                    row = (page[0][0], grid_text(page[0][1]))
+                    rows.append(row)
+                    tree.insert("", "end", iid=str(row[0]), values=row)
+        elif rows and note_id < rows[0][0]:
+            # A row above the window disappeared, so the window moves up one
+            state["offset"] = max(0, state["offset"] - 1)
+    elif tree.exists(iid):
+        index = next(i for i, row in enumerate(rows) if row[0] == note_id)
+        rows[index] = (note_id, grid_text(note_text))
+        tree.item(iid, values=rows[index])
+    elif inserted:
+        state["total"] += 1
+        reaches_end = state["offset"] + len(rows) == state["total"] - 1
+        if reaches_end and len(rows) < window and (not rows or note_id > rows[-1][0]):
+            rows.append((note_id, grid_text(note_text)))
+            tree.insert("", "end", iid=iid, values=rows[-1])
+    
+    _update_virtual_scrollbar(state)
+
+def on_search_changed(tree, text):
+    """
+    Debounce search box edits.
+    
+    Each keystroke cancels the pending search and schedules a new one, so
+    the query only runs once the user pauses typing.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        text (str): Current search box contents
+    """
+    state = _virtual_grids[str(tree)]
+    if state["search_job"] is not None:
+        tree.after_cancel(state["search_job"])
+    state["search_job"] = tree.after(SEARCH_DEBOUNCE_MS, lambda: run_grid_search(tree, text))
+
+def run_grid_search(tree, text):
+    """
+    Show full-text search results in the grid, or all notes for empty text.
+    
+    The query runs on a worker thread; results from a search that has been
+    superseded by newer typing are dropped.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        text (str): Words to search for
+    """
+    state = _virtual_grids[str(tree)]
+    state["search_job"] = None
+    state["query"] = text
+    state["search_generation"] += 1
+    generation = state["search_generation"]
+    
+    if not build_search_query(text):
+        # Empty search: go back to browsing every note from the top
+        state["search"] = None
+        state["rows"] = []
+        state["offset"] = 0
+        reload_virtual_grid(tree)
+        return
+    
+    def on_done(outcome):
+        if generation != state["search_generation"]:
+            return
+        success, results = outcome
+        if not success:
+            show_error(state["error_label"], f"Search failed: {results}")
+            return
+        if not results:
+            show_error(state["error_label"], f"No notes match \"{text.strip()}\"")
+        state["search"] = results
+        state["total"] = len(results)
+        state["offset"] = 0
+        scroll_virtual_grid(tree, 0, reload=True)
+    
+    view = dict(state["view"])
+    run_in_background(tree, lambda: search_notes(text, view=view), on_done)
+
+def on_sort_column(tree, sort):
+    """
+    Sort the grid by a column heading; clicking it again reverses the order.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        sort (str): Sort name from GRID_HEADINGS
+    """
+    state = _virtual_grids[str(tree)]
+    view = state["view"]
+    if view["sort"] == sort:
+        view["descending"] = not view["descending"]
+    else:
+        view["sort"], view["descending"] = sort, False
+    
+    for name, (column, text) in GRID_HEADINGS.items():
+        if name == sort:
+            text += " \u25bc" if view["descending"] else " \u25b2"
+        tree.heading(column, text=text)
+    show_grid_from_top(tree)
+
+def on_filter_changed(tree, text):
+    """
+    Debounce edits of the "Starts with" box, then filter the grid.
+    
+    Args:
+        tree (ttk.Treeview): A grid set up with enable_virtual_grid
+        text (str): Current filter box contents
+    """
+    state = _virtual_grids[str(tree)]
+    if state["filter_job"] is not None:
+        tree.after_cancel(state["filter_job"])
+    
+    def apply_filter():
+        state["filter_job"] = None
+        state["view"]["prefix"] = text.lstrip()
+        show_grid_from_top(tree)
+    
+    state["filter_job"] = tree.after(SEARCH_DEBOUNCE_MS, apply_filter)
+
+def show_grid_from_top(tree):
+    """Re-run the current search, or reload all notes from the first row."""
+    state = _virtual_grids[str(tree)]
+    state["rows"] = []
+    state["offset"] = 0
+    if state["search"] is not None:
+        run_grid_search(tree, state["query"])
+    else:
+        reload_virtual_grid(tree)
+
+def get_selected_note_ids(tree):
+    """
+    Return the IDs of all selected notes, in ascending order.
+    
+    For virtual grids this includes selected notes that have scrolled out of
+    the materialized window.
+    
+    Args:
+        tree (ttk.Treeview): The data grid widget
+        
+    Returns:
+        list: Selected note IDs
+    """
+    selected = {int(iid) for iid in tree.selection()}
+    state = _virtual_grids.get(str(tree))
+    if state is not None:
+        window_ids = {note_id for note_id, _ in state["rows"]}
+        selected.update(note_id for note_id in state["selected"] if note_id not in window_ids)
+    return sorted(selected)
+
+def text_length(text_widget):
+    """
+    Return the number of characters in a Text widget.
+    
+    Tk counts them itself, so unlike get("1.0", "end-1c") no copy of the
+    text is made in Python, which matters after pasting a large text.
+    """
+    # "1.0" = line 1, character 0 (start)
+    # "end-1c" = end minus 1 character (excludes automatic newline)
+    counted = text_widget.count("1.0", "end-1c", "chars")
+    if isinstance(counted, tuple):
+        counted = counted[0]
+    return counted or 0
+
+def note_length_status(length):
+    """
+    Return the editor's validation state for a note of length characters.
+    
+    - Black text: Normal (under 200 characters)
+    - Orange text: Warning (200-254 characters)
+    - Red text: Error (255+ characters, prevents saving)
+    
+    Returns:
+        tuple: (message: str, colour: str, valid: bool)
+    """
+    if length >= NOTE_MAX_LENGTH:
+        # Error state: prevent saving
+        return (f"Error: {length:,}/{NOTE_MAX_LENGTH} characters - "
+                f"remove {length - NOTE_MAX_LENGTH + 1:,} to save", "red", False)
+    elif length >= NOTE_WARN_LENGTH:
+        # Warning state: allow saving but warn user
+        return f"Warning: {length}/{NOTE_MAX_LENGTH} characters", "orange", True
+    else:
+        # Normal state: display character count
+        return f"{length}/{NOTE_MAX_LENGTH} characters", "black", True
+
+def watch_note_length(text_widget, validation_label, save_button=None):
+    """
+    Validate the editor's length live, at most once per frame.
+    
+    Driven by the Text widget's <<Modified>> event, so typing, pasting,
+    cutting, undo and drag-and-drop are all covered without key or mouse
+    bindings. A burst of changes (a held-down key, a large paste) schedules
+    a single check EDITOR_VALIDATE_MS later. The check counts characters in
+    Tk (see text_length) and only reconfigures the label and the Save
+    button when what they show actually changes. Over the limit, Save is
+    disabled right away rather than the note being rejected on save.
+    
+    Args:
+        text_widget (tk.Text): The note editor
+        validation_label (tk.Label): Label showing the count and warnings
+        save_button (tk.Button, optional): Enabled only while the text is valid
+        
+    Returns:
+        callable: Re-validates immediately and redraws the label and button
+            (for example after the dialog changed them while saving)
+    """
+    state = {"job": None, "shown": None, "valid": None}
+    
+    def validate():
+        state["job"] = None
+        message, colour, valid = note_length_status(text_length(text_widget))
+        if (message, colour) != state["shown"]:
+            state["shown"] = (message, colour)
+            validation_label.config(text=message, fg=colour)
+        if valid != state["valid"]:
+            state["valid"] = valid
+            if save_button is not None:
+                save_button.config(state=tk.NORMAL if valid else tk.DISABLED)
+        return valid
+    
+    def on_modified(event):
+        # Clearing the flag re-arms the event and fires it once more, with
+        # the flag already false
+        if not text_widget.edit_modified():
+            return
+        text_widget.edit_modified(False)
+        if state["job"] is None:
+            state["job"] = text_widget.after(EDITOR_VALIDATE_MS, validate)
+    
+    def on_destroy(event):
+        # A check still pending when the dialog closes would run against
+        # destroyed widgets
+        if state["job"] is not None:
+            text_widget.after_cancel(state["job"])
+            state["job"] = None
+    
+    def refresh():
+        state["shown"] = state["valid"] = None
+        return validate()
+    
+    text_widget.edit_modified(False)
+    text_widget.bind("<<Modified>>", on_modified)
+    text_widget.bind("<Destroy>", on_destroy, add="+")
+    refresh()
+    return refresh
+
+def note_edit_dialog(parent, note_id=None, note_text="", tree=None, error_label=None,
+                     note_version=None):
+    """
+    Create modal dialog for adding/editing notes.
+    
+    This function creates a popup window with a text editor for note content.
+    It handles both new note creation (note_id=None) and editing existing notes.
+    The dialog includes real-time character validation and keyboard shortcuts.
+    
+    Dialog Features:
+    - Modal (blocks interaction with main window)
+    - Resizable text area with scrollbar
+    - Live character counting and validation, once per frame (see watch_note_length)
+    - Save/Cancel buttons with confirmation, which names existing notes the
+      text duplicates (find_similar_notes)
+    - Ctrl+S keyboard shortcut for saving
+    
+    Args:
+        parent (tk.Tk): Parent window for modal dialog
+        note_id (int, optional): ID of note to edit (None for new note)
+        note_text (str, optional): Existing text content (empty for new note)
+        tree (ttk.Treeview, optional): Main data grid to refresh after save
+        error_label (tk.Label, optional): Label for displaying errors
+        note_version (int, optional): Version of the note when it was read; saves
+            fail with an edit conflict if someone else saved it meanwhile
+    """
+    dialog = tk.Toplevel(parent)
+    dialog.title("New Note" if note_id is None else f"Edit Note {note_id}")
+    dialog.geometry("500x400")
+    dialog.resizable(True, True)
+    dialog.transient(parent)
+    
+    # Wait for dialog to be created before grabbing
+    dialog.update_idletasks()
+    dialog.grab_set()
+    
+    # Center the dialog
+    dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
+    
+    # Note label
+    tk.Label(dialog, text="Note:", font=("Arial", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 5))
+    
+    # Text widget with scrollbar
+    text_frame = tk.Frame(dialog)
+    text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    
+    text_widget = tk.Text(text_frame, wrap=tk.WORD, height=15)
+    text_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
+    text_widget.configure(yscrollcommand=text_scrollbar.set)
+    
+    text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    text_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    
+    # Insert existing text if editing
+    if note_text:
+        text_widget.insert("1.0", note_text)
+    
+    # Validation label
+    validation_label = tk.Label(dialog, text="0/255 characters", fg="black")
+    validation_label.pack(anchor="w", padx=10, pady=(0, 5))
+    
+    # Button frame
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=10)
+    
+    def on_save():
+        """Handle save button click."""
+        if str(btn_save["state"]) == tk.DISABLED:
+            # Ctrl+S while saving or while the text is too long
+            return
+        content = text_widget.get("1.0", "end-1c").strip()
+        
+        problem = check_note_text(content)
+        if problem:
+            messagebox.showerror("Error", problem)
+            return
+        
+        # Confirm save, naming the notes this one would duplicate (an index lookup)
+        question = "Are you sure you want to save this note?"
+        success, matches = find_similar_notes(content, exclude_id=note_id)
+        if success and matches:
+            question = f"{describe_similar_notes(matches)}\n\nSave this note anyway?"
+        if messagebox.askyesno("Confirm Save", question):
+            # Updates only apply if nobody else saved the note since it was opened
+            save(content, note_version, as_new=note_id is None)
+    
+    def save(content, version=None, as_new=False):
+        """Queue the write; the writer thread commits while the dialog stays responsive."""
+        # Read-only until the writer answers, so the saved text is what is shown
+        text_widget.config(state=tk.DISABLED)
+        btn_save.config(state=tk.DISABLED)
+        validation_label.config(text="Saving...", fg="black")
+        if as_new:
+            # Add new note
+            submit_write(parent, "add", (content,), lambda outcome: on_saved(outcome, content, True))
+        else:
+            # Update existing note
+            submit_write(parent, "update", (note_id, content, version),
+                         lambda outcome: on_saved(outcome, content))
+    
+    def on_saved(outcome, content, inserted=False):
+        """Apply the writer's result once the note is committed."""
+        success, result = outcome
+        if success and tree and error_label:
+            # Only the saved row changes in the grid
+            apply_note_change(tree, error_label, *result, inserted=inserted)
+        if not dialog.winfo_exists():
+            return
+        if success:
+            dialog.destroy()
+            return
+        text_widget.config(state=tk.NORMAL)
+        revalidate()
+        if is_conflict_error(result):
+            # Another window or process saved (or deleted) this note meanwhile
+            if "deleted" in result:
+                if messagebox.askyesno("Edit Conflict", f"{result}.\n\nSave your text as a new note?",
+                                       parent=dialog):
+                    save(content, as_new=True)
+            elif messagebox.askyesno("Edit Conflict", f"{result}.\n\nSave your text anyway, "
+                                     "replacing their changes?", parent=dialog):
+                save(content)
+            return
+        if result == f"Note {note_id} not found":
+            # Deleted between the conflict question and "save anyway"
+            if messagebox.askyesno("Edit Conflict", f"Note {note_id} was deleted by someone else."
+                                   "\n\nSave your text as a new note?", parent=dialog):
+                save(content, as_new=True)
+            return
+        messagebox.showerror("Database Error", f"Failed to save note: {describe_write_error(result)}",
+                             parent=dialog)
+    
+    def on_cancel():
+        """Handle cancel button click."""
+        dialog.destroy()
+    
+    # Save button
+    btn_save = tk.Button(button_frame, text="Save", command=on_save)
+    btn_save.pack(side=tk.LEFT, padx=5)
+    
+    # Cancel button
+    btn_cancel = tk.Button(button_frame, text="Cancel", command=on_cancel)
+    btn_cancel.pack(side=tk.LEFT, padx=5)
+    
+    # Live validation of the length; also enables/disables Save
+    revalidate = watch_note_length(text_widget, validation_label, btn_save)
+    
+    # Focus on text widget
+    text_widget.focus_set()
+    
+    # Handle Ctrl+S shortcut
+    def handle_ctrl_s(event):
+        on_save()
+    
+    dialog.bind("<Control-s>", handle_ctrl_s)
+    dialog.bind("<Control-S>", handle_ctrl_s)
+
+def on_new_record(tree, error_label):
+    """Handle new record button click."""
+    root = tree.winfo_toplevel()
+    note_edit_dialog(root, tree=tree, error_label=error_label)
+
+def find_replace_dialog(parent, tree, error_label, note_ids=None):
+    """
+    Create a dialog that finds and replaces text in many notes at once.
+    
+    The replacement runs as one batch on the background writer (one
+    transaction, one executemany) after a single confirmation, and the grid
+    is updated once for the whole batch.
+    
+    Args:
+        parent (tk.Tk): Parent window for modal dialog
+        tree (ttk.Treeview): Main data grid to update after the replacement
+        error_label (tk.Label): Label for displaying errors
+        note_ids (list, optional): Notes to edit; None means all notes
+    """
+    scope = "all notes" if note_ids is None else f"{len(note_ids):,} selected notes"
+    dialog = tk.Toplevel(parent)
+    dialog.title("Find and Replace")
+    dialog.resizable(False, False)
+    dialog.transient(parent)
+    dialog.update_idletasks()
+    dialog.grab_set()
+    dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
+    
+    tk.Label(dialog, text=f"Replace in {scope} (case-sensitive)",
+             font=("Arial", 10, "bold")).grid(row=0, column=0, columnspan=2, sticky="w",
+                                              padx=10, pady=(10, 5))
+    tk.Label(dialog, text="Find:").grid(row=1, column=0, sticky="w", padx=10)
+    find_entry = tk.Entry(dialog, width=40)
+    find_entry.grid(row=1, column=1, padx=10, pady=2)
+    tk.Label(dialog, text="Replace with:").grid(row=2, column=0, sticky="w", padx=10)
+    replace_entry = tk.Entry(dialog, width=40)
+    replace_entry.grid(row=2, column=1, padx=10, pady=2)
+    status_label = tk.Label(dialog, text="", fg="red")
+    status_label.grid(row=3, column=0, columnspan=2, sticky="w", padx=10)
+    
+    button_frame = tk.Frame(dialog)
+    button_frame.grid(row=4, column=0, columnspan=2, pady=10)
+    
+    def on_replace(event=None):
+        """Confirm once, then queue the whole replacement as one write."""
+        find = find_entry.get()
+        replacement = replace_entry.get()
+        if not find:
+            status_label.config(text="Enter the text to find")
+            return
+        if not messagebox.askyesno("Confirm Replace",
+                                   f"Replace \"{find}\" with \"{replacement}\" in {scope}?",
+                                   parent=dialog):
+            return
+        btn_replace.config(state=tk.DISABLED)
+        status_label.config(text="Replacing...", fg="black")
+        submit_write(parent, "replace", (find, replacement, note_ids), on_replaced)
+    
+    def on_replaced(outcome):
+        """Update the grid once with every changed note."""
+        success, result = outcome
+        if success:
+            apply_note_changes(tree, error_label, result["changes"])
+            if result["skipped"]:
+                show_error(error_label, f"{len(result['skipped']):,} notes left unchanged: "
+                                        "the result would be empty or too long")
+        if not dialog.winfo_exists():
+            return
+        if success:
+            dialog.destroy()
+        else:
+            btn_replace.config(state=tk.NORMAL)
+            status_label.config(text=f"Replace failed: {describe_write_error(result)}", fg="red")
+    
+    btn_replace = tk.Button(button_frame, text="Replace All", command=on_replace)
+    btn_replace.pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    
+    find_entry.focus_set()
+    dialog.bind("<Return>", on_replace)
+    dialog.bind("<Escape>", lambda event: dialog.destroy())
+
+def on_replace_records(tree, error_label):
+    """Open find and replace for the selected notes, or all notes if none are selected."""
+    note_ids = get_selected_note_ids(tree)
+    find_replace_dialog(tree.winfo_toplevel(), tree, error_label, note_ids or None)
+
+def on_edit_record(tree, error_label):
+    """Handle edit record action (find and replace when several notes are selected)."""
+    note_ids = get_selected_note_ids(tree)
+    if not note_ids:
+        show_error(error_label, "Please select a record to edit")
+        return
+    if len(note_ids) > 1:
+        find_replace_dialog(tree.winfo_toplevel(), tree, error_label, note_ids)
+        return
+    
+    # Read the note from the database rather than the grid so the text is exact
+    success, note = get_note(note_ids[0])
+    if not success:
+        show_error(error_label, f"Database error: {note}")
+        return
+    
+    note_id, note_text, version = note
+    root = tree.winfo_toplevel()
+    note_edit_dialog(root, note_id=note_id, note_text=note_text, tree=tree, error_label=error_label,
+                     note_version=version)
+
+def on_delete_record(tree, error_label):
+    """Handle delete record action for every selected note."""
+    note_ids = get_selected_note_ids(tree)
+    if not note_ids:
+        show_error(error_label, "Please select a record to delete")
+        return
+    
+    if len(note_ids) == 1:
+        question = f"Are you sure you want to delete note {note_ids[0]}?"
+    else:
+        question = f"Are you sure you want to delete {len(note_ids):,} notes?"
+    
+    # One confirmation dialog, one transaction and one grid update for the whole selection
+    if messagebox.askyesno("Confirm Delete", question):
+        def on_deleted(outcome):
+            success, result = outcome
+            if success:
+                apply_note_changes(tree, error_label, result)
+            else:
+                show_error(error_label, f"Delete failed: {describe_write_error(result)}")
+        
+        submit_write(tree, "delete_many", (note_ids,), on_deleted)
+
+def on_find_duplicates(tree, error_label):
+    """Search for duplicate notes on a worker thread, then list them in a window."""
+    root = tree.winfo_toplevel()
+    cancel = threading.Event()
+    dialog, status_label, progress_bar = progress_window(
+        root, "Finding Duplicates", "Finding duplicate notes...", cancel, mode="indeterminate")
+    progress_bar.start()
+    
+    def on_progress(text):
+        status_label.config(text=text)
+    
+    def on_done(outcome):
+        dialog.destroy()
+        success, result = outcome
+        if not success:
+            show_error(error_label, f"Duplicate search failed: {result}")
+        elif not result["groups"]:
+            show_error(error_label, f"No duplicate notes found ({result['seconds']:.2f}s)")
+        else:
+            duplicates_window(root, tree, error_label, result)
+    
+    run_in_background(root, lambda report: find_duplicate_groups(progress=report, cancel=cancel),
+                      on_done, on_progress, writes=True)
+
+def duplicates_window(root, tree, error_label, report):
+    """
+    List the groups of a duplicate report and delete the unwanted notes.
+    
+    Each group is a parent row with its notes below it, the first (oldest)
+    note first. "Select Extras" selects every note but the first of each
+    group; the selected notes are deleted in one batch on the background
+    writer. Only the DUPLICATE_REPORT_GROUPS largest groups are listed.
+    
+    Args:
+        root (tk.Tk): Main window
+        tree (ttk.Treeview): Main data grid to update after a delete
+        error_label (tk.Label): Label for displaying errors
+        report (dict): find_duplicate_groups report
+    """
+    dialog = tk.Toplevel(root)
+    dialog.title("Duplicate Notes")
+    dialog.geometry("820x520")
+    dialog.transient(root)
+    
+    summary = format_duplicate_summary(report)
+    if len(report["groups"]) > DUPLICATE_REPORT_GROUPS:
+        summary += f"\nShowing the {DUPLICATE_REPORT_GROUPS:,} largest groups"
+    status_label = tk.Label(dialog, text=summary, anchor="w", justify=tk.LEFT)
+    status_label.pack(fill=tk.X, padx=10, pady=(10, 0))
+    
+    group_frame = tk.Frame(dialog)
+    group_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    group_tree = ttk.Treeview(group_frame, columns=("Similarity", "Note"), show="tree headings")
+    group_tree.heading("#0", text="ID")
+    group_tree.heading("Similarity", text="Similarity")
+    group_tree.heading("Note", text="Note")
+    group_tree.column("#0", width=140)
+    group_tree.column("Similarity", width=90, anchor="e")
+    group_tree.column("Note", width=540)
+    scrollbar = ttk.Scrollbar(group_frame, orient=tk.VERTICAL, command=group_tree.yview)
+    group_tree.configure(yscrollcommand=scrollbar.set)
+    group_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    
+    # Notes belong to one group each, so their IDs double as item IDs
+    for number, group in enumerate(report["groups"][:DUPLICATE_REPORT_GROUPS], 1):
+        kind = "exact duplicates" if group["exact"] else "near-duplicates"
+        parent = group_tree.insert("", "end", iid=f"group{number}", open=True,
+                                   text=f"Group {number}", values=("", f"{len(group['notes'])} {kind}"))
+        for note_id, similarity, note_text in group["notes"]:
+            group_tree.insert(parent, "end", iid=str(note_id), text=str(note_id),
+                              values=(f"{similarity:.0%}", grid_text(note_text)))
+    
+    def selected_note_ids():
+        return [int(item) for item in group_tree.selection() if not item.startswith("group")]
+    
+    def on_select_extras():
+        extras = [item for parent in group_tree.get_children()
+                  for item in group_tree.get_children(parent)[1:]]
+        group_tree.selection_set(extras)
+    
+    def on_delete():
+        note_ids = selected_note_ids()
+        if not note_ids:
+            status_label.config(text="Select the notes to delete")
+            return
+        if not messagebox.askyesno("Confirm Delete", f"Delete {len(note_ids):,} notes?", parent=dialog):
+            return
+        btn_delete.config(state=tk.DISABLED)
+        status_label.config(text=f"Deleting {len(note_ids):,} notes...")
+        submit_write(root, "delete_many", (note_ids,), on_deleted)
+    
+    def on_deleted(outcome):
+        success, result = outcome
+        if success:
+            apply_note_changes(tree, error_label, result)
+        if not dialog.winfo_exists():
+            return
+        btn_delete.config(state=tk.NORMAL)
+        if not success:
+            status_label.config(text=f"Delete failed: {describe_write_error(result)}")
+            return
+        for note_id, _ in result:
+            if group_tree.exists(str(note_id)):
+                group_tree.delete(str(note_id))
+        # A group with one note left has no duplicates any more
+        for parent in group_tree.get_children():
+            if len(group_tree.get_children(parent)) < 2:
+                group_tree.delete(parent)
+        status_label.config(text=f"Deleted {len(result):,} notes")
+    
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=(0, 10))
+    tk.Button(button_frame, text="Select Extras", command=on_select_extras).pack(side=tk.LEFT, padx=5)
+    btn_delete = tk.Button(button_frame, text="Delete Selected", command=on_delete)
+    btn_delete.pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    dialog.bind("<Escape>", lambda event: dialog.destroy())
+
+def describe_stalls(stalls):
+    """Describe the stall watchdog statistics in one line for the diagnostics window."""
+    if not stalls["enabled"]:
+        return "UI stall watchdog off (--stall-ms)"
+    text = f"UI stalls over {stalls['threshold_ms']:g} ms: {stalls['stalls']:,}"
+    if stalls["last"]:
+        text += (f", longest {stalls['longest_ms']:,.0f} ms; last {stalls['last']['ms']:,.0f} ms "
+                 f"in {stalls['last']['callback']}")
+    if stalls["log"]:
+        text += f"; log: {stalls['log']}"
+    return text
+
+def show_diagnostics(root):
+    """
+    Show the instrumentation statistics in a non-modal window (F12).
+    
+    Lists call counts, rows touched and latency percentiles per operation,
+    followed by the slow statement log with query plans. Instrumentation
+    can be switched on and off here, and the statistics saved as JSON.
+    The database line shows the file size, free space and last maintenance
+    run; maintenance and a backup can be started from here too, and a
+    status line counts the UI stalls the watchdog has logged.
+    
+    Args:
+        root (tk.Tk): Main window
+    """
+    dialog = tk.Toplevel(root)
+    dialog.title("Diagnostics")
+    dialog.geometry("820x520")
+    dialog.transient(root)
+    
+    enabled_var = tk.BooleanVar(value=INSTRUMENTATION_ENABLED)
+    status_label = tk.Label(dialog, text="", anchor="w", justify=tk.LEFT)
+    status_label.pack(fill=tk.X, padx=10, pady=(10, 0))
+    database_label = tk.Label(dialog, text="", anchor="w", justify=tk.LEFT)
+    database_label.pack(fill=tk.X, padx=10)
+    
+    columns = ("Operation", "Calls", "Errors", "Rows", "Mean ms", "p50 ms", "p99 ms", "Max ms")
+    stats_tree = ttk.Treeview(dialog, columns=columns, show="headings", height=10)
+    for column in columns:
+        stats_tree.heading(column, text=column)
+        stats_tree.column(column, width=170 if column == "Operation" else 80,
+                          anchor="w" if column == "Operation" else "e")
+    stats_tree.pack(fill=tk.X, padx=10, pady=5)
+    
+    tk.Label(dialog, text="Slow statements (newest first):", anchor="w").pack(fill=tk.X, padx=10)
+    slow_text = tk.Text(dialog, height=10, wrap=tk.NONE, font=("Courier", 9))
+    slow_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    
+    def refresh():
+        snapshot = instrumentation_snapshot()
+        state = "on" if snapshot["enabled"] else "off (start with --instrument or NOTES_INSTRUMENT=1)"
+        cache = snapshot["read_cache"]
+        status_label.config(text=f"Instrumentation {state}; slow statement threshold "
+                                 f"{snapshot['slow_statement_ms']} ms\n"
+                                 f"Read cache: {cache['rows']:,} notes "
+                                 f"({(cache['id_bytes'] + cache['text_bytes']) / 2**20:.1f} MiB), "
+                                 f"{cache['hits']:,} hits, {cache['misses']:,} misses "
+                                 f"({cache['hit_rate']:.0%}), "
+                                 f"{cache['loads']} loads in {cache['load_ms']:.0f} ms\n"
+                                 f"{describe_stalls(snapshot['stalls'])}")
+        success, database = get_database_stats()
+        if success:
+            last_run = database["last_run"]
+            last = ("never" if last_run is None else
+                    f"{format_timestamp(last_run['ran_at'])}, reclaimed "
+                    f"{last_run['reclaimed_bytes'] / 2**20:.1f} MiB in {last_run['seconds']:.2f}s")
+            database_label.config(text=f"Database: {database['file_bytes'] / 2**20:.1f} MiB, "
+                                       f"{database['free_bytes'] / 2**20:.1f} MiB free, "
+                                       f"auto_vacuum {database['auto_vacuum']}; "
+                                       f"last maintenance: {last}")
+        else:
+            database_label.config(text=f"Database: {database}")
+        stats_tree.delete(*stats_tree.get_children())
+        for name, stats in snapshot["operations"].items():
+            stats_tree.insert("", "end", values=(
+                name, stats["calls"], stats["errors"], stats["rows"],
+                f"{stats['mean_ms']:.2f}", f"<{stats['p50_ms']:g}", f"<{stats['p99_ms']:g}",
+                f"{stats['max_ms']:.2f}"))
+        slow_text.delete("1.0", tk.END)
+        for entry in reversed(snapshot["slow_statements"]):
+            slow_text.insert(tk.END, f"{entry['time']}  {entry['ms']:.1f} ms  [{entry['thread']}]\n"
+                                     f"  {entry['sql']}\n  params: {entry['parameters']}\n")
+            for step in entry["plan"]:
+                slow_text.insert(tk.END, f"  plan: {step}\n")
+    
+    def on_toggle():
+        set_instrumentation(enabled_var.get())
+        refresh()
+    
+    def on_reset():
+        reset_instrumentation()
+        refresh()
+    
+    def on_maintain():
+        def on_done(outcome):
+            success, result = outcome
+            message = (f"Maintenance: {format_maintenance_summary(result)}" if success
+                       else f"Maintenance failed: {result}")
+            if dialog.winfo_exists():
+                database_label.config(text=message)
+                dialog.after(5000, refresh)
+        if start_maintenance(root, on_done):
+            database_label.config(text="Maintenance running...")
+    
+    def on_backup():
+        def on_done(message):
+            if dialog.winfo_exists():
+                database_label.config(text=message)
+        backup_to_file(dialog, on_done)
+    
+    def on_save():
+        filename = filedialog.asksaveasfilename(
+            parent=dialog, defaultextension=".json", filetypes=[("JSON files", "*.json")],
+            initialfile=f"notes_diagnostics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        if filename:
+            success, result = dump_instrumentation(filename)
+            if not success:
+                messagebox.showerror("Save Failed", result, parent=dialog)
+    
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=(0, 10))
+    tk.Checkbutton(button_frame, text="Enabled", variable=enabled_var,
+                   command=on_toggle).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Reset", command=on_reset).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Save JSON...", command=on_save).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Maintain Now", command=on_maintain).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Back Up...", command=on_backup).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    refresh()
+
+# =============================================================================
+# EXPORT FUNCTIONS
+# Every export is one scan of the notes fanned out to format writers, so a
+# bundle of several formats reads the table once and shares one export time.
+# The export_to_* functions use file dialogs to let users choose save location
+# =============================================================================
+
+def export_format(filename):
+    """
+    Return the export format a filename asks for.
+    
+    The format follows the extension once any ".gz"/".zst" suffix is
+    removed; unknown extensions get a Markdown table, as before bundles.
+    
+    Args:
+        filename (str): Destination path
+        
+    Returns:
+        str: One of EXPORT_FORMATS
+        
+    Raises:
+        ValueError: If a compressed .xlsx is requested (xlsx is already zipped)
+    """
+    base_name = re.sub(r"\.(gz|zst)$", "", filename.lower())
+    extension = os.path.splitext(base_name)[1].lstrip(".")
+    if extension == "xlsx" and base_name != filename.lower():
+        raise ValueError(f"{os.path.basename(filename)}: .xlsx files cannot be compressed")
+    return extension if extension in EXPORT_FORMATS else "md"
+
+def open_export_file(filename, newline=None):
+    """
+    Open a text export destination with a large write buffer.
+    
+    The file extension picks the compression: ".gz" writes gzip, ".zst"
+    writes Zstandard (needs Python 3.14+ or the zstandard package), anything
+    else is written uncompressed.
+    
+    Args:
+        filename (str): Destination path
+        newline (str, optional): Passed to io.TextIOWrapper ("" for csv.writer)
+        
+    Returns:
+        io.TextIOWrapper: UTF-8 text stream; closing it closes the file
+        
+    Raises:
+        RuntimeError: If .zst is requested but no zstd module is available
+    """
+    if filename.endswith(".gz"):
+        raw = gzip.GzipFile(filename, "wb", compresslevel=EXPORT_GZIP_LEVEL)
+    elif filename.endswith(".zst"):
+        try:
+            from compression import zstd
+            raw = zstd.ZstdFile(filename, "wb", level=EXPORT_ZSTD_LEVEL)
+        except ImportError:
+            try:
+                import zstandard
+            except ImportError:
+                raise RuntimeError("Zstandard export needs Python 3.14+ or the zstandard package")
+            raw = zstandard.ZstdCompressor(level=EXPORT_ZSTD_LEVEL).stream_writer(
+                open(filename, "wb"), closefd=True)
+    else:
+        raw = open(filename, "wb", buffering=0)
+    return io.TextIOWrapper(io.BufferedWriter(raw, EXPORT_BUFFER_SIZE), encoding="utf-8",
+                            newline=newline)
+
+def open_excel_writer(filename, export_time):
+    """
+    Start an .xlsx export with constant memory use.
+    
+    Rows go into a write-only workbook, which writes each row straight to
+    disk instead of keeping cell objects around. When a sheet reaches
+    Excel's row limit the export continues on a new sheet
+    ("Exported Notes 2", "Exported Notes 3", ...).
+    
+    Args:
+        filename (str): Destination .xlsx path
+        export_time (str): Value of the "Export Date" column
+        
+    Returns:
+        tuple: (write_chunk, finish, discard) functions (see open_export_writer)
+    """
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    header = ["Note ID", "Note", "Export Date"]
+    ws = None
+    sheet_rows = EXCEL_MAX_ROWS
+    
+    def write_chunk(chunk):
+        nonlocal ws, sheet_rows
+        for note_id, note_text in chunk:
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                # Start the first sheet, or roll over to the next one
+                sheet_number = len(wb.worksheets) + 1
+                title = EXCEL_SHEET_NAME if sheet_number == 1 else f"{EXCEL_SHEET_NAME} {sheet_number}"
+                ws = wb.create_sheet(title)
+                ws.append(header)
+                sheet_rows = 1
+            ws.append([note_id, note_text, export_time])
+            sheet_rows += 1
+    
+    def finish():
+        if ws is None:
+            # Empty database: still produce a sheet with headers
+            wb.create_sheet(EXCEL_SHEET_NAME).append(header)
+        wb.save(filename)
+    
+    def discard():
+        # Finish the sheets' temporary files without saving, so nothing is
+        # created at the destination
+        for sheet in wb.worksheets:
+            sheet.close()
+    
+    return write_chunk, finish, discard
+
+def format_markdown_rows(chunk):
+    """
+    Format a chunk of notes as Markdown table rows in one batch.
+    
+    The whole chunk is built with a single comprehension and joined into one
+    string, so the writer sees one large write per chunk instead of one
+    small write per row.
+    
+    Args:
+        chunk (list): [(note_id, note_text), ...]
+        
+    Returns:
+        str: The table rows, one line per note
+    """
+    # Escape pipe characters in note text
+    return "".join([f"| {note_id} | {note_text.replace('|', PIPE_ESCAPE)} |\n"
+                    for note_id, note_text in chunk])
+
+def format_text_rows(chunk):
+    """
+    Format a chunk of notes as plain text, one "note_id<TAB>note" line each.
+    
+    Args:
+        chunk (list): [(note_id, note_text), ...]
+        
+    Returns:
+        str: The formatted lines
+    """
+    return "".join([f"{note_id}\t{note_text}\n" for note_id, note_text in chunk])
+
+def format_csv_rows(chunk, export_time):
+    """
+    Format a chunk of notes as CSV rows "note_id,"note",export_date".
+    
+    The note is always quoted, with embedded quotes doubled, which every
+    CSV reader accepts. Built with one f-string per row this is about 2.5
+    times faster than csv.writer, which scans each field to decide whether
+    it needs quoting.
+    
+    Args:
+        chunk (list): [(note_id, note_text), ...]
+        export_time (str): Value of the export_date column
+        
+    Returns:
+        str: The CSV lines, "\\r\\n"-terminated
+    """
+    quote, doubled = '"', '""'
+    return "".join([f'{note_id},"{note_text.replace(quote, doubled)}",{export_time}\r\n'
+                    for note_id, note_text in chunk])
+
+def format_jsonl_rows(chunk, export_time=None):
+    """
+    Format a chunk of notes as JSON Lines, one {"note_id", "note"} object each.
+    
+    Args:
+        chunk (list): [(note_id, note_text), ...]
+        export_time (str, optional): Adds an "export_date" field with this value
+        
+    Returns:
+        str: The JSON lines
+    """
+    import json
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    # The export date is the same on every line, so it is encoded once
+    stamp = "" if export_time is None else f', "export_date": {dumps(export_time)}'
+    return "".join([f'{{"note_id": {note_id}, "note": {dumps(note_text)}{stamp}}}\n'
+                    for note_id, note_text in chunk])
+
+def text_export_format(kind, export_time):
+    """
+    Return the header and chunk formatter of a text export format.
+    
+    Markdown gets an "Export Date" line in its heading; CSV rows and JSON
+    objects carry an export_date column like the workbook. Plain text stays
+    "note_id<TAB>note" so it can be piped and re-imported as is.
+    
+    Args:
+        kind (str): "md", "txt", "csv" or "jsonl"
+        export_time (str): Export timestamp written into the output
+        
+    Returns:
+        tuple: (header: str, format_chunk: callable) - format_chunk(chunk) returns the text of a chunk
+    """
+    if kind == "md":
+        return (f"# Exported Notes\n\n"
+                f"Export Date: {export_time}\n\n"
+                "| Note ID | Note |\n"
+                "|---------|------|\n"), format_markdown_rows
+    if kind == "csv":
+        return "note_id,note,export_date\r\n", lambda chunk: format_csv_rows(chunk, export_time)
+    if kind == "jsonl":
+        return "", lambda chunk: format_jsonl_rows(chunk, export_time)
+    return "", format_text_rows
+
+def open_text_writer(filename, export_time, kind):
+    """
+    Start a Markdown, plain text, CSV or JSON Lines export.
+    
+    Each chunk is formatted in one batch (see text_export_format) and
+    written through a large buffer, optionally compressed (see
+    open_export_file).
+    
+    Args:
+        filename (str): Destination path (.md, .txt, .csv, .jsonl, + .gz/.zst)
+        export_time (str): Export timestamp written into the file
+        kind (str): "md", "txt", "csv" or "jsonl"
+        
+    Returns:
+        tuple: (write_chunk, finish, discard) functions (see open_export_writer)
+    """
+    header, format_chunk = text_export_format(kind, export_time)
+    f = open_export_file(filename, newline="" if kind == "csv" else None)
+    f.write(header)
+    
+    def discard():
+        f.close()
+        os.remove(filename)
+    
+    return lambda chunk: f.write(format_chunk(chunk)), f.close, discard
+
+def open_export_writer(filename, export_time):
+    """
+    Start the writer for one file of an export, chosen by its extension.
+    
+    A writer is three functions: write_chunk(chunk) appends a list of
+    (note_id, note_text) rows, finish() completes the file and discard()
+    abandons it, leaving nothing at the destination.
+    
+    Args:
+        filename (str): Destination path
+        export_time (str): Export timestamp shared by every file of a bundle
+        
+    Returns:
+        tuple: (write_chunk, finish, discard)
+    """
+    kind = export_format(filename)
+    if kind == "xlsx":
+        return open_excel_writer(filename, export_time)
+    return open_text_writer(filename, export_time, kind)
+
+def threaded_chunk_writer(write_chunk):
+    """
+    Run a writer's write_chunk on its own thread, behind a bounded queue.
+    
+    The reader hands each chunk to every writer's queue and moves on to the
+    next chunk while the writers format and compress. The queue holds at
+    most EXPORT_QUEUE_CHUNKS chunks, so a slow writer holds the scan back
+    instead of letting memory grow. After an error the thread keeps
+    draining its queue, so the reader never blocks on it.
+    
+    Args:
+        write_chunk (callable): The writer's write_chunk
+        
+    Returns:
+        tuple: (put, join) - put(chunk) queues a chunk, join() waits for the
+               queue to drain; both re-raise the writer's error
+    """
+    chunks = queue.Queue(EXPORT_QUEUE_CHUNKS)
+    errors = []
+    
+    def work():
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if not errors:
+                try:
+                    write_chunk(chunk)
+                except Exception as e:
+                    errors.append(e)
+    
+    thread = threading.Thread(target=work, name="export-writer", daemon=True)
+    thread.start()
+    
+    def put(chunk):
+        if errors:
+            raise errors[0]
+        chunks.put(chunk)
+    
+    def join():
+        chunks.put(None)
+        thread.join()
+        if errors:
+            raise errors[0]
+    
+    return put, join
+
+@instrumented("write_export_bundle")
+def write_export_bundle(filenames, progress=None, cancel=None, parallel=False):
+    """
+    Write all notes to several files in one scan of the table.
+    
+    Each file's format follows its extension (see export_format): .xlsx,
+    .md, .txt, .csv or .jsonl, the text formats optionally .gz/.zst
+    compressed. Notes are read once, chunk by chunk, by a single SELECT,
+    which SQLite runs in one read transaction, so every file holds the same
+    consistent snapshot even while other windows or processes keep writing
+    (or the chunks are sliced from the read cache, which is one snapshot
+    too). Every chunk is handed to all the writers, and all files carry the
+    same export time.
+    
+    With parallel, each writer runs on its own thread (threaded_chunk_writer).
+    Only compression and file writes release the GIL while formatting does
+    not, so threads have measured no faster than one thread (see
+    `benchmark.py bundle`) and are off by default; they may help when the
+    destination is a slow network share.
+    
+    Safe to call from a worker thread: it reads through that thread's own
+    pooled connection.
+    
+    Args:
+        filenames (list): Destination paths, one per format
+        progress (callable, optional): Called with the rows written so far after each chunk
+        cancel (threading.Event, optional): Stops the export and removes every file when set
+        parallel (bool, optional): Run each writer on its own thread
+        
+    Returns:
+        tuple: (success: bool, rows_written_or_error: int|str)
+    """
+    export_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    writers = []
+    joins = []
+    rows_written = 0
+    try:
+        for filename in filenames:
+            writers.append(open_export_writer(filename, export_time))
+        sinks = [write_chunk for write_chunk, finish, discard in writers]
+        if parallel:
+            sinks, joins = zip(*[threaded_chunk_writer(write_chunk) for write_chunk in sinks])
+        
+        for chunk in iter_note_chunks():
+            for sink in sinks:
+                sink(chunk)
+            rows_written += len(chunk)
+            if progress:
+                progress(rows_written)
+            if cancel is not None and cancel.is_set():
+                break
+        
+        for join in joins:
+            join()
+        joins = []
+        if cancel is not None and cancel.is_set():
+            raise InterruptedError("Export cancelled")
+        for write_chunk, finish, discard in writers:
+            finish()
+        return True, rows_written
+    except Exception as e:
+        for join in joins:
+            try:
+                join()
+            except Exception:
+                pass
+        for write_chunk, finish, discard in writers:
+            try:
+                discard()
+            except Exception:
+                pass
+        return False, str(e)
+
+def write_excel_export(filename, progress=None, cancel=None):
+    """
+    Write all notes to an .xlsx file with constant memory use.
+    
+    A one-file bundle (see write_export_bundle and open_excel_writer).
+    
+    Args:
+        filename (str): Destination .xlsx path
+        progress (callable, optional): Called with the rows written so far after each chunk
+        cancel (threading.Event, optional): Stops the export (no file is written) when set
+        
+    Returns:
+        tuple: (success: bool, rows_written_or_error: int|str)
+    """
+    return write_export_bundle([filename], progress, cancel)
+
+def export_to_excel(tree, error_label):
+    """Export notes to Excel file."""
+    filename = filedialog.asksaveasfilename(
+        defaultextension=".xlsx",
+        filetypes=[("Excel files", "*.xlsx")],
+        initialfile="notes_export.xlsx"
+    )
+    
+    if not filename:
+        return
+    
+    start_export_job(tree, error_label, filename, write_excel_export)
+
+def write_markdown_export(filename, progress=None, cancel=None):
+    """
+    Write all notes to a Markdown table, or plain text for .txt files.
+    
+    A one-file bundle (see write_export_bundle and open_text_writer). Output
+    format follows the extension once any ".gz"/".zst" suffix is removed:
+    ".txt" gives plain text, ".csv" and ".jsonl" those formats, anything
+    else a GitHub-formatted Markdown table.
+    
+    Args:
+        filename (str): Destination path (.md, .md.gz, .md.zst, .txt, ...)
+        progress (callable, optional): Called with the rows written so far after each chunk
+        cancel (threading.Event, optional): Stops the export and removes the file when set
+        
+    Returns:
+        tuple: (success: bool, rows_written_or_error: int|str)
+    """
+    return write_export_bundle([filename], progress, cancel)
+
+def export_to_markdown(tree, error_label):
+    """Export notes to Markdown file."""
+    filename = filedialog.asksaveasfilename(
+        defaultextension=".md",
+        filetypes=[("Markdown files", "*.md"),
+                   ("Gzip-compressed Markdown", "*.md.gz"),
+                   ("Zstandard-compressed Markdown", "*.md.zst"),
+                   ("Plain text", "*.txt")],
+        initialfile="notes_export.md"
+    )
+    
+    if not filename:
+        return
+    
+    start_export_job(tree, error_label, filename, write_markdown_export)
+
+def export_bundle(tree, error_label):
+    """
+    Export notes to several formats at once, from one scan of the table.
+    
+    A small dialog picks the formats and whether the text formats are
+    gzip-compressed; the files are then written side by side into a chosen
+    folder as notes_export_<timestamp>.<format>.
+    
+    Args:
+        tree (ttk.Treeview): The data grid
+        error_label (tk.Label): Label widget for the result message
+    """
+    root = tree.winfo_toplevel()
+    dialog = tk.Toplevel(root)
+    dialog.title("Export Bundle")
+    dialog.resizable(False, False)
+    dialog.transient(root)
+    
+    tk.Label(dialog, text="Formats (all written from one scan of the notes):",
+             anchor="w").pack(fill=tk.X, padx=10, pady=(10, 5))
+    format_vars = {}
+    for kind, label in (("xlsx", "Excel (.xlsx)"), ("md", "Markdown (.md)"),
+                        ("csv", "CSV (.csv)"), ("jsonl", "JSON Lines (.jsonl)")):
+        format_vars[kind] = tk.BooleanVar(value=True)
+        tk.Checkbutton(dialog, text=label, variable=format_vars[kind],
+                       anchor="w").pack(fill=tk.X, padx=20)
+    compress_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(dialog, text="Gzip-compress text formats (.gz)", variable=compress_var,
+                   anchor="w").pack(fill=tk.X, padx=10, pady=(5, 0))
+    
+    def on_export():
+        kinds = [kind for kind, var in format_vars.items() if var.get()]
+        if not kinds:
+            messagebox.showwarning("Export Bundle", "Select at least one format.", parent=dialog)
+            return
+        directory = filedialog.askdirectory(parent=dialog, title="Export bundle to folder")
+        if not directory:
+            return
+        dialog.destroy()
+        base_name = os.path.join(directory, f"notes_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        suffix = ".gz" if compress_var.get() else ""
+        filenames = [f"{base_name}.{kind}" + (suffix if kind != "xlsx" else "") for kind in kinds]
+        start_export_job(tree, error_label, filenames, write_export_bundle)
+    
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=10)
+    tk.Button(button_frame, text="Export...", command=on_export).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+
+def format_timestamp(stamp):
+    """Format milliseconds since the epoch as ISO 8601 UTC, or "" if unknown."""
+    if stamp is None:
+        return ""
+    return datetime.fromtimestamp(stamp / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+def sql_timestamp(column):
+    """SQL expression formatting a milliseconds column like format_timestamp (NULL stays NULL)."""
+    return f"strftime('%Y-%m-%dT%H:%M:%fZ', {column} / 1000.0, 'unixepoch')"
+
+def get_export_watermark(target=DELTA_EXPORT_TARGET):
+    """
+    Return the watermark of the last delta export to a target.
+    
+    Args:
+        target (str, optional): Watermark name
+        
+    Returns:
+        tuple: (success: bool, watermark_or_error: int|None|str)
+               None means the target has never been exported (full export)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT watermark FROM export_watermarks WHERE target = ?", (target,))
+        row = cursor.fetchone()
+        return True, row[0] if row else None
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+def count_delta_changes(target=DELTA_EXPORT_TARGET, full=False):
+    """
+    Count the rows a delta export to target would write (for progress bars).
+    
+    Returns:
+        tuple: (success: bool, rows_or_error: int|str)
+    """
+    success, since = get_export_watermark(target)
+    if not success or full or since is None:
+        return count_notes() if success else (False, since)
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT (SELECT COUNT(*) FROM notes WHERE updated_at >= ?) + "
+                       "(SELECT COUNT(*) FROM note_tombstones WHERE deleted_at >= ?)",
+                       (since, since))
+        return True, cursor.fetchone()[0]
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("write_delta_export")
+def write_delta_export(filename, target=DELTA_EXPORT_TARGET, full=False, progress=None, cancel=None):
+    """
+    Write the notes changed since the last export to target as CSV.
+    
+    Each row is an idempotent operation keyed by note_id:
+    "upsert,note_id,note,created_at,updated_at" for added or edited notes and
+    "delete,note_id,,,deleted_at" for deleted ones (from note_tombstones).
+    The first export to a target, or one with full=True, writes every note
+    as an upsert. Changed rows are found through the updated_at and
+    deleted_at indexes, so a nightly sync costs time proportional to the
+    day's edits rather than the table size.
+    
+    Notes and tombstones are read in one read transaction. The new watermark
+    is the export's start time minus DELTA_EXPORT_OVERLAP_MS and is only
+    stored once the file is complete; rows in the overlap are exported twice,
+    which consumers absorb because every row is an upsert or delete.
+    
+    Args:
+        filename (str): Destination path (.csv, optionally .gz/.zst)
+        target (str, optional): Watermark name, one per sync destination
+        full (bool, optional): Ignore the watermark and export every note
+        progress (callable, optional): Called with the rows written so far after each chunk
+        cancel (threading.Event, optional): Stops the export and removes the file when set
+        
+    Returns:
+        tuple: (success: bool, rows_written_or_error: int|str)
+    """
+    conn = None
+    rows_written = 0
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        started = now_ms()
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT watermark FROM export_watermarks WHERE target = ?", (target,))
+        row = cursor.fetchone()
+        since = None if full or row is None else row[0]
+        
+        with open_export_file(filename, newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["op", "note_id", "note", "created_at", "updated_at"])
+            # Timestamps are formatted by SQLite; strftime() in C is far
+            # cheaper than a datetime per row on a full export
+            columns = (f"SELECT 'upsert', note_id, note, {sql_timestamp('created_at')}, "
+                       f"{sql_timestamp('updated_at')} FROM notes")
+            if since is None:
+                cursor.execute(f"{columns} ORDER BY note_id")
+            else:
+                cursor.execute(f"{columns} WHERE updated_at >= ? ORDER BY updated_at, note_id",
+                               (since,))
+            while not (cancel is not None and cancel.is_set()):
+                chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                rows_written += len(chunk)
+                if progress:
+                    progress(rows_written)
+            
+            if since is not None and not (cancel is not None and cancel.is_set()):
+                cursor.execute(f"SELECT 'delete', note_id, '', '', {sql_timestamp('deleted_at')} "
+                               "FROM note_tombstones WHERE deleted_at >= ? "
+                               "ORDER BY deleted_at, note_id", (since,))
+                tombstones = cursor.fetchall()
+                writer.writerows(tombstones)
+                rows_written += len(tombstones)
+                if progress:
+                    progress(rows_written)
+        conn.rollback()
+        
+        if cancel is not None and cancel.is_set():
+            os.remove(filename)
+            return False, "Export cancelled"
+        
+        # The file is complete: move the watermark forward
+        cursor.execute("INSERT OR REPLACE INTO export_watermarks (target, watermark, exported_at, rows) "
+                       "VALUES (?, ?, ?, ?)",
+                       (target, started - DELTA_EXPORT_OVERLAP_MS, started, rows_written))
+        conn.commit()
+        return True, rows_written
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+def export_delta(tree, error_label):
+    """Export the notes changed since the last delta export to a CSV file."""
+    filename = filedialog.asksaveasfilename(
+        defaultextension=".csv",
+        filetypes=[("CSV files", "*.csv"),
+                   ("Gzip-compressed CSV", "*.csv.gz")],
+        initialfile=f"notes_delta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    )
+    
+    if not filename:
+        return
+    
+    start_export_job(tree, error_label, filename, write_delta_export, count=count_delta_changes,
+                     writes=True)
+
+def progress_window(root, title, text, cancel, mode="determinate"):
+    """
+    Create a non-modal progress window with a Cancel button.
+    
+    The window does not grab input, so the main window stays usable while
+    the background job runs. Cancel (or closing the window) sets the cancel
+    event; the job is expected to notice it and stop.
+    
+    Args:
+        root (tk.Tk): Main window
+        title (str): Window title
+        text (str): Initial status text
+        cancel (threading.Event): Event set when the user cancels
+        mode (str, optional): "determinate" or "indeterminate" progress bar
+        
+    Returns:
+        tuple: (dialog: tk.Toplevel, status_label: tk.Label, progress_bar: ttk.Progressbar)
+    """
+    dialog = tk.Toplevel(root)
+    dialog.title(title)
+    dialog.resizable(False, False)
+    dialog.transient(root)
+    dialog.geometry("+%d+%d" % (root.winfo_rootx() + 80, root.winfo_rooty() + 80))
+    
+    status_label = tk.Label(dialog, text=text)
+    status_label.pack(anchor="w", padx=10, pady=(10, 5))
+    progress_bar = ttk.Progressbar(dialog, length=320, mode=mode)
+    progress_bar.pack(padx=10, pady=5)
+    
+    def on_cancel():
+        cancel.set()
+        btn_cancel.config(text="Cancelling...", state=tk.DISABLED)
+    
+    btn_cancel = tk.Button(dialog, text="Cancel", command=on_cancel)
+    btn_cancel.pack(pady=10)
+    dialog.protocol("WM_DELETE_WINDOW", on_cancel)
+    return dialog, status_label, progress_bar
+
+def start_export_job(tree, error_label, filename, write_export, count=count_notes, writes=False):
+    """
+    Run an export on a worker thread with a progress window.
+    
+    The window is not modal, so the user can keep browsing and editing
+    notes while the export runs. Cancel stops the export after the current
+    chunk. When the export finishes its throughput is reported in the
+    main window's message label.
+    
+    Args:
+        tree (ttk.Treeview): The data grid (its window owns the progress window)
+        error_label (tk.Label): Label widget for the result message
+        filename (str|list): Destination path chosen by the user, or a list of
+            paths for write_export_bundle
+        write_export (callable): write_*_export(filename, progress, cancel) function
+        count (callable, optional): Returns (success, rows the export will write)
+        writes (bool, optional): The export commits to the database (the
+            delta export's watermark)
+    """
+    root = tree.winfo_toplevel()
+    cancel = threading.Event()
+    paths = [filename] if isinstance(filename, str) else filename
+    names = ", ".join(os.path.basename(path) for path in paths)
+    dialog, status_label, progress_bar = progress_window(
+        root, "Exporting", f"Exporting to {names}...", cancel)
+    start = time.perf_counter()
+    
+    def work(report):
+        success, total = count()
+        if not success:
+            return False, total
+        report((0, total))
+        return write_export(filename, progress=lambda done: report((done, total)), cancel=cancel)
+    
+    def on_progress(value):
+        done, total = value
+        progress_bar.config(maximum=max(total, 1), value=done)
+        status_label.config(text=f"Exporting to {names}: {done:,} of {total:,} rows")
+    
+    def on_done(outcome):
+        dialog.destroy()
+        success, result = outcome
+        if success:
+            elapsed = time.perf_counter() - start
+            rate = result / elapsed if elapsed else 0
+            show_error(error_label,
+                       f"Exported {result:,} notes to {', '.join(paths)} ({rate:,.0f} rows/sec)")
+        else:
+            show_error(error_label, f"Export failed: {result}")
+    
+    run_in_background(root, work, on_done, on_progress, writes=writes)
+
 # =============================================================================
-# USER INTERFACE FUNCTIONS
-# These functions handle GUI operations, user interactions, and data display
+# IMPORT FUNCTIONS
+# Bulk import reads the formats the exporters write (Markdown table, plain
+# text, "Exported Notes" workbook) plus CSV. Files are parsed as a stream
+# and inserted with executemany in large transactions.
 # =============================================================================
 
-def refresh_notes_grid(tree, error_label):
+def open_import_file(filename):
     """
-    Refresh the notes grid with current data from database.
-    
-    This function is called whenever the data changes (add, edit, delete operations)
-    to ensure the UI displays the most current information.
+    Open a text file for import, decompressing .gz and .zst transparently.
     
     Args:
-        tree (ttk.Treeview): The data grid widget to refresh
-        error_label (tk.Label): Label widget for displaying error messages
+        filename (str): Source path
+        
+    Returns:
+        io.TextIOBase: UTF-8 text stream (a leading BOM is skipped)
     """
-    # Clear all existing items from the tree view
-    # tree.get_children() returns all top-level items
-    for item in tree.get_children():
-        tree.delete(item)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8-sig", newline="")
+    if filename.endswith(".zst"):
+        try:
+            from compression import zstd
+            return zstd.open(filename, "rt", encoding="utf-8-sig", newline="")
+        except ImportError:
+            try:
+                import zstandard
+            except ImportError:
+                raise RuntimeError("Zstandard import needs Python 3.14+ or the zstandard package")
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"),
+                                                                                closefd=True),
+                                    encoding="utf-8-sig", newline="")
+    return open(filename, "r", encoding="utf-8-sig", newline="")
+
+def iter_csv_notes(f):
+    """
+    Yield note texts from CSV.
     
-    # Fetch current notes from database
-    success, notes = get_notes()
-    if not success:
-        # If database error, display error message and exit
-        show_error(error_label, f"Database error: {notes}")
+    A header row containing a "Note" column selects that column. Without a
+    header, the second column is used when the first one holds numeric IDs
+    (as in "note_id,note" dumps) and the first column otherwise.
+    """
+    reader = csv.reader(f)
+    first = next(reader, None)
+    if first is None:
         return
     
-    # Insert each note as a row in the tree view
-    # notes is a list of tuples: [(note_id, note_text), ...]
-    for note_id, note_text in notes:
-        # Insert at end ("") with values for both columns
-        tree.insert("", "end", values=(note_id, note_text))
+    header = [cell.strip().lower() for cell in first]
+    if "note" in header:
+        column = header.index("note")
+    else:
+        column = 1 if len(first) > 1 and first[0].strip().isdigit() else 0
+        if len(first) > column:
+            yield first[column]
+    
+    for row in reader:
+        if len(row) > column:
+            yield row[column]
+
+# One table row of the Markdown export: | 12 | note text with \| escapes |
+MARKDOWN_ROW = re.compile(r"^\|\s*\d+\s*\|\s?(.*?)\s?\|\s*$")
+
+def iter_markdown_notes(f):
+    """Yield note texts from the table in a Markdown export."""
+    for line in f:
+        match = MARKDOWN_ROW.match(line.rstrip("\r\n"))
+        if match:
+            yield match.group(1).replace(PIPE_ESCAPE, "|")
 
-def validate_note_length(text_widget, validation_label):
+def iter_text_notes(f):
+    """Yield note texts from a plain-text export ("note_id<TAB>note" lines)."""
+    for line in f:
+        line = line.rstrip("\r\n")
+        note_id, tab, note_text = line.partition("\t")
+        yield note_text if tab and note_id.isdigit() else line
+
+def iter_xlsx_notes(filename):
     """
-    Validate note text length and show warnings/errors in real-time.
+    Yield note texts from an Excel export.
     
-    This function provides immediate feedback to users about character limits:
-    - Black text: Normal (under 200 characters)
-    - Orange text: Warning (200-254 characters) 
-    - Red text: Error (255+ characters, prevents saving)
+    Reads every "Exported Notes" sheet (including rollover sheets) in
+    read-only mode, so rows are streamed rather than loaded all at once.
+    Workbooks without such sheets are read from their first sheet.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    try:
+        sheets = [ws for ws in wb.worksheets if ws.title.startswith(EXCEL_SHEET_NAME)]
+        for ws in sheets or wb.worksheets[:1]:
+            rows = ws.iter_rows(values_only=True)
+            header = [str(cell or "").strip().lower() for cell in next(rows, ())]
+            column = header.index("note") if "note" in header else 0
+            for row in rows:
+                if len(row) > column and row[column] is not None:
+                    yield str(row[column])
+    finally:
+        wb.close()
+
+def insert_notes_batch(conn, rows):
+    """
+    Insert many notes in one transaction and index them for search in bulk.
+    
+    Firing the full-text trigger once per row is several times slower than
+    indexing the whole batch with a single INSERT ... SELECT, so the batch
+    pauses the insert trigger with a row in notes_fts_paused (its WHEN clause
+    skips the trigger while the table is not empty) and removes the row
+    before COMMIT. That is an ordinary write inside the batch's own
+    transaction: no other connection ever sees the trigger paused, and unlike
+    dropping and recreating the trigger it leaves the schema alone, so other
+    connections keep their prepared statements.
+    Signing the notes for duplicate detection would make an import several
+    times slower, so that is left to sync_duplicate_index (idle maintenance,
+    the duplicate report).
     
     Args:
-        text_widget (tk.Text): The text input widget to validate
-        validation_label (tk.Label): Label to display validation message
+        conn (sqlite3.Connection): Connection to write through
+        rows (list): [(note_text,), ...]
         
-    Returns:
-        bool: True if text length is valid (under 255), False if over limit
+    Raises:
+        sqlite3.Error: If the batch fails (the caller rolls back)
     """
-    # Get text content from Text widget
-    # "1.0" = line 1, character 0 (start)
-    # "end-1c" = end minus 1 character (excludes automatic newline)
-    content = text_widget.get("1.0", "end-1c")
-    length = len(content)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT sql FROM sqlite_master "
+                   "WHERE type = 'trigger' AND name = 'notes_fts_insert'")
+    trigger = cursor.fetchone()
+    # Without FTS5 (no trigger) there is nothing to index
+    pause = trigger is not None and "notes_fts_paused" in trigger[0]
+    if pause:
+        cursor.execute("SELECT COALESCE(MAX(note_id), 0) FROM notes")
+        last_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO notes_fts_paused (paused) VALUES (1)")
     
-    # Check length and update validation label with appropriate color
-    if length >= 255:
-        # Error state: prevent saving
-        validation_label.config(text="Error: Note exceeds 255 characters", fg="red")
-        return False
-    elif length >= 200:
-        # Warning state: allow saving but warn user
-        validation_label.config(text=f"Warning: {length}/255 characters", fg="orange")
-        return True
-    else:
-        # Normal state: display character count
-        validation_label.config(text=f"{length}/255 characters", fg="black")
-        return True
+    stamp = now_ms()
+    cursor.executemany("INSERT INTO notes (note, created_at, updated_at) VALUES (?, ?, ?)",
+                       [(row[0], stamp, stamp) for row in rows])
+    
+    if pause:
+        cursor.execute("INSERT INTO notes_fts(rowid, note) "
+                       "SELECT note_id, note FROM notes WHERE note_id > ?", (last_id,))
+        cursor.execute("DELETE FROM notes_fts_paused")
+    conn.commit()
 
-def note_edit_dialog(parent, note_id=None, note_text="", tree=None, error_label=None):
+@instrumented("import_notes")
+def import_notes(filename, progress=None, cancel=None, batch_size=IMPORT_BATCH_SIZE):
     """
-    Create modal dialog for adding/editing notes.
-    
-    This function creates a popup window with a text editor for note content.
-    It handles both new note creation (note_id=None) and editing existing notes.
-    The dialog includes real-time character validation and keyboard shortcuts.
+    Bulk import notes from a CSV, Markdown, plain-text or Excel file.
     
-    Dialog Features:
-    - Modal (blocks interaction with main window)
-    - Resizable text area with scrollbar
-    - Real-time character counting and validation
-    - Save/Cancel buttons with confirmation
-    - Ctrl+S keyboard shortcut for saving
+    Notes are validated with check_note_text (empty or too-long notes are
+    rejected and counted) and inserted with executemany, batch_size rows
+    per transaction. Imported notes get new IDs; IDs in the file are ignored.
+    Batches already committed stay in the database if the import fails or
+    is cancelled.
     
     Args:
-        parent (tk.Tk): Parent window for modal dialog
-        note_id (int, optional): ID of note to edit (None for new note)
-        note_text (str, optional): Existing text content (empty for new note)
-        tree (ttk.Treeview, optional): Main data grid to refresh after save
-        error_label (tk.Label, optional): Label for displaying errors
+        filename (str): Source path (.csv, .md, .txt, .xlsx; text formats may end in .gz/.zst)
+        progress (callable, optional): Called with the rows imported so far after each batch
+        cancel (threading.Event, optional): Stops the import after the current batch
+        batch_size (int, optional): Rows per transaction
+        
+    Returns:
+        tuple: (success: bool, summary_or_error: dict|str)
+               If successful: (True, {"imported": int, "rejected": int, "seconds": float})
     """
-    dialog = tk.Toplevel(parent)
-    dialog.title("New Note" if note_id is None else f"Edit Note {note_id}")
-    dialog.geometry("500x400")
-    dialog.resizable(True, True)
-    dialog.transient(parent)
+    base_name = re.sub(r"\.(gz|zst)$", "", filename.lower())
+    start = time.perf_counter()
+    conn = None
+    f = None
+    try:
+        if base_name.endswith(".xlsx"):
+            texts = iter_xlsx_notes(filename)
+        else:
+            f = open_import_file(filename)
+            if base_name.endswith(".csv"):
+                texts = iter_csv_notes(f)
+            elif base_name.endswith(".txt"):
+                texts = iter_text_notes(f)
+            else:
+                texts = iter_markdown_notes(f)
+        
+        conn = get_connection()
+        imported = rejected = 0
+        batch = []
+        for note_text in texts:
+            note_text = note_text.strip()
+            if check_note_text(note_text):
+                rejected += 1
+                continue
+            batch.append((note_text,))
+            if len(batch) >= batch_size:
+                insert_notes_batch(conn, batch)
+                imported += len(batch)
+                batch = []
+                if progress:
+                    progress(imported)
+                if cancel is not None and cancel.is_set():
+                    return False, f"Import cancelled after {imported:,} notes"
+        if batch:
+            insert_notes_batch(conn, batch)
+            imported += len(batch)
+        
+        return True, {"imported": imported, "rejected": rejected,
+                      "seconds": time.perf_counter() - start}
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+    finally:
+        if f is not None:
+            f.close()
+
+def import_from_file(tree, error_label):
+    """Ask for a file and bulk import it on a worker thread."""
+    filename = filedialog.askopenfilename(
+        filetypes=[("Note files", "*.md *.txt *.csv *.xlsx *.gz *.zst"),
+                   ("Markdown files", "*.md"),
+                   ("CSV files", "*.csv"),
+                   ("Excel files", "*.xlsx"),
+                   ("All files", "*.*")]
+    )
     
-    # Wait for dialog to be created before grabbing
-    dialog.update_idletasks()
-    dialog.grab_set()
+    if not filename:
+        return
     
-    # Center the dialog
-    dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
+    root = tree.winfo_toplevel()
+    cancel = threading.Event()
+    dialog, status_label, progress_bar = progress_window(
+        root, "Importing", f"Importing {os.path.basename(filename)}...", cancel, mode="indeterminate")
+    progress_bar.start()
     
-    # Note label
-    tk.Label(dialog, text="Note:", font=("Arial", 10, "bold")).pack(anchor="w", padx=10, pady=(10, 5))
+    def on_progress(imported):
+        status_label.config(text=f"Importing {os.path.basename(filename)}: {imported:,} notes")
     
-    # Text widget with scrollbar
-    text_frame = tk.Frame(dialog)
-    text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    def on_done(outcome):
+        dialog.destroy()
+        # New rows can land anywhere in the window, so this is a full reload,
+        # which also shows whatever other processes committed meanwhile
+        refresh_notes_grid(tree, error_label)
+        absorb_own_commits()
+        success, result = outcome
+        if success:
+            rate = result["imported"] / result["seconds"] if result["seconds"] else 0
+            show_error(error_label, f"Imported {result['imported']:,} notes, rejected "
+                                    f"{result['rejected']:,} ({rate:,.0f} rows/sec)")
+        else:
+            show_error(error_label, f"Import failed: {result}")
     
-    text_widget = tk.Text(text_frame, wrap=tk.WORD, height=15)
-    text_scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
-    text_widget.configure(yscrollcommand=text_scrollbar.set)
+    run_in_background(root,
+                      lambda report: import_notes(filename, progress=report, cancel=cancel),
+                      on_done, on_progress, writes=True)
+
+# =============================================================================
+# MAINTENANCE
+# Hot backups through the SQLite backup API and the upkeep that delete and
+# update churn calls for: pruning tombstones no delta export still needs,
+# refreshing planner statistics and releasing free pages. Open windows run
+# the upkeep on a worker thread once the user has been idle for a while.
+# =============================================================================
+
+AUTO_VACUUM_MODES = ("none", "full", "incremental")   # PRAGMA auto_vacuum values 0, 1, 2
+
+# Idle maintenance state of this window (see schedule_maintenance)
+_maintenance = {"last_input": 0.0, "cancel": None, "last_result": None}
+
+def database_file_bytes(db_file=None):
+    """Return the size of a database on disk: the main file plus its WAL, if any."""
+    db_file = db_file or DB_FILE
+    return sum(os.path.getsize(path) for path in (db_file, db_file + "-wal")
+               if os.path.exists(path))
+
+def get_database_stats():
+    """
+    Describe the database file: size, free pages and the last maintenance run.
     
-    text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    text_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    Returns:
+        tuple: (success: bool, stats_or_error: dict|str)
+               stats has file_bytes, page_size, page_count, free_pages,
+               free_bytes, auto_vacuum ("none", "full" or "incremental"),
+               journal_mode and last_run (a maintenance_runs row as a dict,
+               or None)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        pragma = lambda name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+        page_size = pragma("page_size")
+        free_pages = pragma("freelist_count")
+        stats = {"file_bytes": database_file_bytes(),
+                 "page_size": page_size,
+                 "page_count": pragma("page_count"),
+                 "free_pages": free_pages,
+                 "free_bytes": free_pages * page_size,
+                 "auto_vacuum": AUTO_VACUUM_MODES[pragma("auto_vacuum")],
+                 "journal_mode": pragma("journal_mode"),
+                 "last_run": None}
+        cursor.execute("SELECT ran_at, seconds, reclaimed_bytes, tombstones_pruned, vacuum "
+                       "FROM maintenance_runs ORDER BY ran_at DESC LIMIT 1")
+        row = cursor.fetchone()
+        if row:
+            stats["last_run"] = dict(zip(("ran_at", "seconds", "reclaimed_bytes",
+                                          "tombstones_pruned", "vacuum"), row))
+        return True, stats
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+@instrumented("backup_database")
+def backup_database(filename, progress=None, cancel=None, pages=BACKUP_STEP_PAGES):
+    """
+    Copy the live database to filename with the SQLite online backup API.
     
-    # Insert existing text if editing
-    if note_text:
-        text_widget.insert("1.0", note_text)
+    Pages are copied BACKUP_STEP_PAGES at a time, with progress reports and
+    a cancel check between steps. In WAL mode the copy reads from one read
+    transaction held for the whole backup: writers carry on meanwhile (WAL
+    readers never block them) and the copy is the database as it was when
+    the backup started. Without it SQLite restarts a stepped backup from the
+    first page whenever another connection commits, so a busy database
+    might never finish backing up. Other journal modes release the read
+    lock between steps so writers are only held up for one step.
     
-    # Validation label
-    validation_label = tk.Label(dialog, text="0/255 characters", fg="black")
-    validation_label.pack(anchor="w", padx=10, pady=(0, 5))
+    The copy is written to filename + ".partial" and renamed into place once
+    complete, so filename never holds a half-written backup.
     
-    # Update validation on text change
-    def on_text_change(event=None):
-        validate_note_length(text_widget, validation_label)
+    Safe to call from a worker thread: it reads through that thread's own
+    pooled connection.
     
-    text_widget.bind("<KeyRelease>", on_text_change)
-    text_widget.bind("<Button-1>", on_text_change)
-    text_widget.bind("<ButtonRelease-1>", on_text_change)
+    Args:
+        filename (str): Destination database path
+        progress (callable, optional): Called with (pages_copied, total_pages) after each step
+        cancel (threading.Event, optional): Stops the backup (nothing is written) when set
+        pages (int, optional): Pages copied per step
+        
+    Returns:
+        tuple: (success: bool, summary_or_error: dict|str)
+               summary has bytes and seconds
+    """
+    conn = None
+    target = None
+    partial = filename + ".partial"
+    start = time.perf_counter()
     
-    # Initial validation
-    on_text_change()
+    def on_step(status, remaining, total):
+        if progress:
+            progress((total - remaining, total))
+        if cancel is not None and cancel.is_set():
+            # Raising from the progress callback aborts the backup
+            raise InterruptedError("Backup cancelled")
     
-    # Button frame
-    button_frame = tk.Frame(dialog)
-    button_frame.pack(pady=10)
+    try:
+        conn = get_connection()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            conn.execute("BEGIN")
+            conn.execute("SELECT 1 FROM notes LIMIT 1").fetchall()
+        target = sqlite3.connect(partial)
+        conn.backup(target, pages=pages, progress=on_step)
+        target.close()
+        target = None
+        conn.rollback()
+        os.replace(partial, filename)
+        return True, {"bytes": os.path.getsize(filename), "seconds": time.perf_counter() - start}
+    except Exception as e:
+        if target is not None:
+            target.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
+
+def prune_tombstones(cursor):
+    """
+    Delete the tombstones every delta export target has already exported.
     
-    def on_save():
-        """Handle save button click."""
-        content = text_widget.get("1.0", "end-1c").strip()
-        
-        if len(content) >= 255:
-            messagebox.showerror("Error", "Note text exceeds 255 characters")
-            return
-        
-        if not content:
-            messagebox.showerror("Error", "Note cannot be empty")
-            return
-        
-        # Confirm save
-        if messagebox.askyesno("Confirm Save", "Are you sure you want to save this note?"):
-            if note_id is None:
-                # Add new note
-                success, error = add_note(content)
-                action = "added"
-            else:
-                # Update existing note
-                success, error = update_note(note_id, content)
-                action = "updated"
-            
-            if success:
-                if tree and error_label:
-                    refresh_notes_grid(tree, error_label)
-                dialog.destroy()
-            else:
-                messagebox.showerror("Database Error", f"Failed to save note: {error}")
+    A tombstone is only read by delta exports whose watermark is at or
+    before its deleted_at, so anything older than the oldest watermark is
+    dead weight. Without any watermark all tombstones go: a target's first
+    export is a full one.
     
-    def on_cancel():
-        """Handle cancel button click."""
-        dialog.destroy()
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's write transaction
+        
+    Returns:
+        int: Tombstones deleted
+    """
+    cursor.execute("DELETE FROM note_tombstones "
+                   "WHERE deleted_at < COALESCE((SELECT MIN(watermark) FROM export_watermarks), "
+                   "                            9223372036854775807)")
+    return cursor.rowcount
+
+@instrumented("run_maintenance")
+def run_maintenance(analyze=True, vacuum=None, prune=True, progress=None, cancel=None):
+    """
+    Compact the database and refresh its planner statistics.
     
-    # Save button
-    btn_save = tk.Button(button_frame, text="Save", command=on_save)
-    btn_save.pack(side=tk.LEFT, padx=5)
+    The steps, each in its own short transaction so the background writer
+    and other processes are only held up briefly:
     
-    # Cancel button
-    btn_cancel = tk.Button(button_frame, text="Cancel", command=on_cancel)
-    btn_cancel.pack(side=tk.LEFT, padx=5)
+    1. Prune tombstones no delta export target needs (prune_tombstones)
+    2. Sign the notes the duplicate index is missing (sync_duplicate_index),
+       in small batches
+    3. ANALYZE, sampling MAINTENANCE_ANALYSIS_LIMIT rows per index, then
+       PRAGMA optimize
+    4. Release free pages: with auto_vacuum=incremental (new databases),
+       MAINTENANCE_VACUUM_PAGES pages per PRAGMA incremental_vacuum step
+       until none are left. vacuum="full" instead rebuilds the whole file
+       with VACUUM, which also defragments it and switches a database
+       created before auto_vacuum to incremental; it locks out writers
+       for its whole duration, so it is only run on request.
+    5. Checkpoint and truncate the WAL, so the file actually shrinks
     
-    # Focus on text widget
-    text_widget.focus_set()
+    Cancel (set when the user comes back, for idle runs) stops between
+    steps, signing batches and vacuum steps. Completed runs are recorded in maintenance_runs;
+    a cancelled one is not, so the next idle period runs again.
     
-    # Handle Ctrl+S shortcut
-    def handle_ctrl_s(event):
-        on_save()
+    Safe to call from a worker thread: it writes through that thread's own
+    pooled connection.
     
-    dialog.bind("<Control-s>", handle_ctrl_s)
-    dialog.bind("<Control-S>", handle_ctrl_s)
+    Args:
+        analyze (bool, optional): Run ANALYZE (PRAGMA optimize always runs)
+        vacuum (str, optional): "full" for a full VACUUM, None for incremental
+        prune (bool, optional): Prune exported tombstones
+        progress (callable, optional): Called with a short status text per step
+        cancel (threading.Event, optional): Stops the run early when set
+        
+    Returns:
+        tuple: (success: bool, summary_or_error: dict|str)
+               summary has seconds, reclaimed_bytes (database plus WAL
+               file), freed_pages (released by the vacuum), tombstones_pruned,
+               notes_signed, vacuum ("full", "incremental" or "none"),
+               cancelled, and the get_database_stats dicts before and after
+    """
+    conn = None
+    start = time.perf_counter()
+    cancelled = lambda: cancel is not None and cancel.is_set()
+    report = progress or (lambda text: None)
+    try:
+        success, before = get_database_stats()
+        if not success:
+            return False, before
+        conn = get_connection()
+        cursor = conn.cursor()
+        pruned = 0
+        
+        if prune and not cancelled():
+            report("Pruning exported tombstones...")
+            cursor.execute("BEGIN IMMEDIATE")
+            pruned = prune_tombstones(cursor)
+            conn.commit()
+        
+        signed = 0
+        if not cancelled():
+            report("Indexing notes for duplicate detection...")
+            success, signed = sync_duplicate_index(report, cancel)
+            if not success:
+                return False, signed
+        
+        if not cancelled():
+            report("Updating planner statistics...")
+            cursor.execute(f"PRAGMA analysis_limit = {int(MAINTENANCE_ANALYSIS_LIMIT)}")
+            if analyze:
+                cursor.execute("ANALYZE")
+            cursor.execute("PRAGMA optimize")
+            conn.commit()
+        
+        vacuum_kind = "none"
+        released = 0
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        if vacuum == "full" and not cancelled():
+            report("Rebuilding the database file (VACUUM)...")
+            cursor.execute(f"PRAGMA auto_vacuum = {DB_AUTO_VACUUM}")
+            cursor.execute("VACUUM")
+            vacuum_kind = "full"
+            released = free_pages
+        elif before["auto_vacuum"] == "incremental":
+            vacuum_kind = "incremental"
+            while free_pages and not cancelled():
+                report(f"Releasing free pages: {free_pages:,} left...")
+                # executescript steps the pragma to completion; execute()
+                # would step it once and release a single page
+                conn.executescript(f"PRAGMA incremental_vacuum({int(MAINTENANCE_VACUUM_PAGES)})")
+                remaining = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+                released += free_pages - remaining
+                free_pages = remaining
+        
+        if not cancelled():
+            report("Checkpointing...")
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        
+        success, after = get_database_stats()
+        if not success:
+            return False, after
+        summary = {"seconds": time.perf_counter() - start,
+                   "reclaimed_bytes": before["file_bytes"] - after["file_bytes"],
+                   "freed_pages": released,
+                   "tombstones_pruned": pruned,
+                   "notes_signed": signed,
+                   "vacuum": vacuum_kind,
+                   "cancelled": cancelled(),
+                   "before": before,
+                   "after": after}
+        if summary["cancelled"]:
+            # Not recorded: the next idle period carries on where this one stopped
+            return True, summary
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("INSERT OR REPLACE INTO maintenance_runs "
+                       "(ran_at, seconds, reclaimed_bytes, tombstones_pruned, vacuum) "
+                       "VALUES (?, ?, ?, ?, ?)",
+                       (now_ms(), summary["seconds"], summary["reclaimed_bytes"], pruned, vacuum_kind))
+        cursor.execute("DELETE FROM maintenance_runs WHERE ran_at NOT IN "
+                       "(SELECT ran_at FROM maintenance_runs ORDER BY ran_at DESC LIMIT ?)",
+                       (MAINTENANCE_LOG_SIZE,))
+        conn.commit()
+        return True, summary
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
 
-def on_new_record(tree, error_label):
-    """Handle new record button click."""
-    root = tree.winfo_toplevel()
-    note_edit_dialog(root, tree=tree, error_label=error_label)
+def format_maintenance_summary(summary):
+    """Describe a run_maintenance summary in one line for the UI and the CLI."""
+    vacuum = {"full": "full VACUUM",
+              "incremental": "incremental vacuum"}.get(summary["vacuum"], "no vacuum")
+    text = (f"reclaimed {max(summary['reclaimed_bytes'], 0) / 2**20:.1f} MiB on disk "
+            f"({summary['freed_pages']:,} free pages released, {vacuum}), "
+            f"pruned {summary['tombstones_pruned']:,} tombstones in {summary['seconds']:.2f}s; "
+            f"database now {summary['after']['file_bytes'] / 2**20:.1f} MiB")
+    if summary["notes_signed"]:
+        text += f"; indexed {summary['notes_signed']:,} notes for duplicate detection"
+    return text + (" (stopped early)" if summary["cancelled"] else "")
 
-def on_edit_record(tree, error_label):
-    """Handle edit record action."""
-    selection = tree.selection()
-    if not selection:
-        show_error(error_label, "Please select a record to edit")
-        return
+def maintenance_due():
+    """
+    Return True when no maintenance run was recorded in the last MAINTENANCE_INTERVAL_HOURS.
     
-    item = tree.item(selection[0])
-    note_id, note_text = item['values']
-    root = tree.winfo_toplevel()
-    note_edit_dialog(root, note_id=note_id, note_text=note_text, tree=tree, error_label=error_label)
+    Returns:
+        tuple: (success: bool, due_or_error: bool|str)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        last_run = conn.execute("SELECT MAX(ran_at) FROM maintenance_runs").fetchone()[0]
+        return True, last_run is None or now_ms() - last_run >= MAINTENANCE_INTERVAL_HOURS * 3600000
+    except Exception as e:
+        if conn is not None:
+            _discard_connection(conn)
+        return False, str(e)
 
-def on_delete_record(tree, error_label):
-    """Handle delete record action."""
-    selection = tree.selection()
-    if not selection:
-        show_error(error_label, "Please select a record to delete")
-        return
+def start_maintenance(root, on_done=None, vacuum=None):
+    """
+    Run run_maintenance on a worker thread.
     
-    item = tree.item(selection[0])
-    note_id, note_text = item['values']
+    Only one run per window at a time; its cancel event is kept in
+    _maintenance so user input can stop an idle run.
     
-    # Confirmation dialog
-    if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete note {note_id}?"):
-        success, error = delete_note(note_id)
-        if success:
-            refresh_notes_grid(tree, error_label)
-        else:
-            show_error(error_label, f"Delete failed: {error}")
-
-# =============================================================================
-# EXPORT FUNCTIONS
-# These functions handle exporting data to different file formats
-# Both functions use file dialogs to let users choose save location
-# =============================================================================
+    Args:
+        root (tk.Tk): Main window (schedules the result delivery)
+        on_done (callable, optional): Called with the (success, summary) outcome
+        vacuum (str, optional): Passed to run_maintenance
+        
+    Returns:
+        bool: False if a run was already in progress
+    """
+    if _maintenance["cancel"] is not None:
+        return False
+    cancel = _maintenance["cancel"] = threading.Event()
+    
+    def finished(outcome):
+        _maintenance["cancel"] = None
+        _maintenance["last_result"] = outcome
+        if on_done:
+            on_done(outcome)
+    
+    run_in_background(root, lambda: run_maintenance(vacuum=vacuum, cancel=cancel), finished,
+                      writes=True)
+    return True
 
-def export_to_excel(tree, error_label):
-    """Export notes to Excel file."""
-    filename = filedialog.asksaveasfilename(
-        defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx")],
-        initialfile="notes_export.xlsx"
-    )
+def schedule_maintenance(root, check_ms=MAINTENANCE_CHECK_MS):
+    """
+    Run maintenance in the background whenever the window is idle and it is due.
     
-    if not filename:
-        return
+    Key and mouse input anywhere in the application records the time of
+    the last input and cancels a run in progress, which then stops after
+    its current step; an after() loop checks every check_ms whether the
+    user has been idle for MAINTENANCE_IDLE_SECONDS, no writes are pending
+    and maintenance is due (maintenance_due). The interval is kept in the
+    database, so it is shared by every instance and survives restarts.
     
-    success, notes = get_notes()
-    if not success:
-        show_error(error_label, f"Database error: {notes}")
-        return
+    Args:
+        root (tk.Tk): Main window
+        check_ms (int, optional): Milliseconds between checks
+    """
+    _maintenance["last_input"] = time.monotonic()
     
-    try:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Exported Notes"
-        
-        # Headers
-        ws.append(["Note ID", "Note", "Export Date"])
-        
-        # Data with timestamp
-        export_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for note_id, note_text in notes:
-            ws.append([note_id, note_text, export_time])
-        
-        wb.save(filename)
-        show_error(error_label, f"Exported to {filename}")
-        
-    except Exception as e:
-        show_error(error_label, f"Export failed: {e}")
+    def on_input(event):
+        _maintenance["last_input"] = time.monotonic()
+        if _maintenance["cancel"] is not None:
+            _maintenance["cancel"].set()
+    
+    for sequence in ("<KeyPress>", "<ButtonPress>", "<MouseWheel>"):
+        root.bind_all(sequence, on_input, add="+")
+    
+    def check():
+        idle = time.monotonic() - _maintenance["last_input"] >= MAINTENANCE_IDLE_SECONDS
+        if idle and _maintenance["cancel"] is None and not _writer["pending"]:
+            success, due = maintenance_due()
+            if success and due:
+                start_maintenance(root)
+        root.after(check_ms, check)
+    
+    root.after(check_ms, check)
 
-def export_to_markdown(tree, error_label):
-    """Export notes to Markdown file."""
-    filename = filedialog.asksaveasfilename(
-        defaultextension=".md",
-        filetypes=[("Markdown files", "*.md")],
-        initialfile="notes_export.md"
-    )
+def backup_to_file(root, on_done=None):
+    """
+    Ask for a destination and back up the database there on a worker thread.
     
+    Args:
+        root (tk.Tk|tk.Toplevel): Window that owns the dialogs
+        on_done (callable, optional): Called with a one-line result message
+    """
+    filename = filedialog.asksaveasfilename(
+        parent=root, defaultextension=".db",
+        filetypes=[("SQLite databases", "*.db")],
+        initialfile=f"notes_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
     if not filename:
         return
+    if os.path.abspath(filename) == os.path.abspath(DB_FILE):
+        messagebox.showerror("Backup", "Choose a file other than the database itself.", parent=root)
+        return
+    
+    cancel = threading.Event()
+    dialog, status_label, progress_bar = progress_window(
+        root, "Backing Up", f"Backing up to {os.path.basename(filename)}...", cancel)
+    
+    def on_progress(value):
+        copied, total = value
+        progress_bar.config(maximum=max(total, 1), value=copied)
+        status_label.config(text=f"Backing up to {os.path.basename(filename)}: "
+                                 f"{copied:,} of {total:,} pages")
+    
+    def finished(outcome):
+        dialog.destroy()
+        success, result = outcome
+        if success:
+            message = (f"Backed up {result['bytes'] / 2**20:.1f} MiB to {filename} "
+                       f"in {result['seconds']:.2f}s")
+        else:
+            message = f"Backup failed: {result}"
+        if on_done:
+            on_done(message)
+    
+    run_in_background(root, lambda report: backup_database(filename, report, cancel),
+                      finished, on_progress)
+
+# =============================================================================
+# STARTUP TIMING
+# Startup milestones are recorded unconditionally (a list append each) and
+# printed by --startup-report, in the spirit of python -X importtime.
+# =============================================================================
+
+def mark_startup(label):
+    """Record a startup milestone with the current time."""
+    _startup_marks.append((label, time.perf_counter()))
+
+def startup_report():
+    """
+    Format the recorded startup milestones as a table.
     
-    success, notes = get_notes()
-    if not success:
-        show_error(error_label, f"Database error: {notes}")
-        return
+    Each line shows the time spent since the previous milestone and the
+    cumulative time since main.py started importing.
     
-    try:
-        export_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(f"# Exported Notes\n\n")
-            f.write(f"Export Date: {export_time}\n\n")
-            f.write("| Note ID | Note |\n")
-            f.write("|---------|------|\n")
-            
-            for note_id, note_text in notes:
-                # Escape pipe characters in note text
-                escaped_note = note_text.replace("|", "\\|")
-                f.write(f"| {note_id} | {escaped_note} |\n")
-        
-        show_error(error_label, f"Exported to {filename}")
-        
-    except Exception as e:
-        show_error(error_label, f"Export failed: {e}")
+    Returns:
+        str: Report text, one milestone per line
+    """
+    start = _startup_marks[0][1]
+    previous = start
+    lines = ["startup: step ms | cumulative ms | milestone"]
+    for label, moment in _startup_marks:
+        lines.append(f"startup: {(moment - previous) * 1000:>7.1f} | "
+                     f"{(moment - start) * 1000:>13.1f} | {label}")
+        previous = moment
+    heavy = [name for name in ("tkinter", "openpyxl") if name in sys.modules]
+    lines.append(f"startup: {len(sys.modules)} modules loaded; "
+                 f"heavy modules: {', '.join(heavy) or 'none'}")
+    return "\n".join(lines)
 
 # =============================================================================
 # MAIN WINDOW CREATION
 # This section creates the main application window with all UI components
 # =============================================================================
 
+def load_gui():
+    """
+    Import the Tkinter modules into the module globals on first use.
+    
+    Every UI function refers to tk, ttk, messagebox and filedialog as
+    globals, so they work unchanged once this has run.
+    """
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        import tkinter as tk
+        from tkinter import ttk, messagebox, filedialog
+        mark_startup("tkinter imported")
+
 def create_main_window():
     """Create the main application window."""
+    load_gui()
     root = tk.Tk()
     root.title("Demo Notes")
     root.geometry("900x600")
@@ -547,21 +5136,35 @@ def create_main_window():
     button_frame = tk.Frame(root)
     button_frame.pack(pady=10)
     
+    # Search box between the buttons and the data grid
+    search_frame = tk.Frame(root)
+    search_frame.pack(fill=tk.X, padx=10)
+    tk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(search_frame, textvariable=search_var)
+    search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    tk.Label(search_frame, text="Starts with:").pack(side=tk.LEFT)
+    filter_var = tk.StringVar()
+    filter_entry = tk.Entry(search_frame, textvariable=filter_var, width=20)
+    filter_entry.pack(side=tk.LEFT, padx=5)
+    
     # Pack tree and scrollbar frame first
     tree_frame = tk.Frame(root)
     tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
     
     # Create data grid (Treeview) inside tree_frame
     columns = ("ID", "Note")
-    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
-    tree.heading("ID", text="Note ID")
-    tree.heading("Note", text="Note")
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15,
+                        selectmode="extended")
+    # Clicking a heading sorts by that column (in SQL, see on_sort_column)
+    tree.heading("ID", text="Note ID", command=lambda: on_sort_column(tree, "id"))
+    tree.heading("Note", text="Note", command=lambda: on_sort_column(tree, "note"))
     tree.column("ID", width=100, minwidth=50)
     tree.column("Note", width=700, minwidth=200)
     
     # Configure grid lines and row height
     style = ttk.Style()
-    style.configure("Treeview", rowheight=25)  # Increase row height to prevent overlap
+    style.configure("Treeview", rowheight=GRID_ROW_HEIGHT)  # Increase row height to prevent overlap
     style.configure("Treeview.Heading", font=("Arial", 10, "bold"))
     
     # Configure grid lines (platform dependent)
@@ -584,6 +5187,15 @@ def create_main_window():
     tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
+    # Only materialize the visible rows; pages are fetched while scrolling
+    enable_virtual_grid(tree, scrollbar, error_label)
+    
+    # Search as the user types (debounced); Escape clears the search
+    search_var.trace_add("write", lambda *args: on_search_changed(tree, search_var.get()))
+    search_entry.bind("<Escape>", lambda event: search_var.set(""))
+    filter_var.trace_add("write", lambda *args: on_filter_changed(tree, filter_var.get()))
+    filter_entry.bind("<Escape>", lambda event: filter_var.set(""))
+    
     # Buttons
     btn_new = tk.Button(button_frame, text="New Record", 
                        command=lambda: on_new_record(tree, error_label))
@@ -597,6 +5209,22 @@ def create_main_window():
                           command=lambda: on_delete_record(tree, error_label))
     btn_delete.pack(side=tk.LEFT, padx=5)
     
+    btn_replace = tk.Button(button_frame, text="Replace", 
+                           command=lambda: on_replace_records(tree, error_label))
+    btn_replace.pack(side=tk.LEFT, padx=5)
+    
+    btn_duplicates = tk.Button(button_frame, text="Duplicates", 
+                              command=lambda: on_find_duplicates(tree, error_label))
+    btn_duplicates.pack(side=tk.LEFT, padx=5)
+    
+    btn_reload = tk.Button(button_frame, text="Reload", 
+                          command=lambda: refresh_notes_grid(tree, error_label))
+    btn_reload.pack(side=tk.LEFT, padx=5)
+    
+    btn_import = tk.Button(button_frame, text="Import", 
+                          command=lambda: import_from_file(tree, error_label))
+    btn_import.pack(side=tk.LEFT, padx=5)
+    
     btn_excel = tk.Button(button_frame, text="Excel Export", 
                          command=lambda: export_to_excel(tree, error_label))
     btn_excel.pack(side=tk.LEFT, padx=5)
@@ -605,6 +5233,14 @@ def create_main_window():
                             command=lambda: export_to_markdown(tree, error_label))
     btn_markdown.pack(side=tk.LEFT, padx=5)
     
+    btn_bundle = tk.Button(button_frame, text="Bundle Export", 
+                          command=lambda: export_bundle(tree, error_label))
+    btn_bundle.pack(side=tk.LEFT, padx=5)
+    
+    btn_delta = tk.Button(button_frame, text="Delta Export", 
+                         command=lambda: export_delta(tree, error_label))
+    btn_delta.pack(side=tk.LEFT, padx=5)
+    
     btn_close = tk.Button(button_frame, text="Close", command=root.quit)
     btn_close.pack(side=tk.LEFT, padx=5)
     
@@ -618,6 +5254,21 @@ def create_main_window():
     root.bind("<Control-n>", handle_ctrl_n)
     root.bind("<Control-N>", handle_ctrl_n)
     
+    # F5 is the only full reload; edits update single rows in place
+    root.bind("<F5>", lambda event: refresh_notes_grid(tree, error_label))
+    
+    # Ctrl+F jumps to the search box
+    root.bind("<Control-f>", lambda event: search_entry.focus_set())
+    root.bind("<Control-F>", lambda event: search_entry.focus_set())
+    
+    # F12 shows the instrumentation statistics
+    root.bind("<F12>", lambda event: show_diagnostics(root))
+    
+    # Delete key removes the selected notes; Ctrl+H opens find and replace
+    tree.bind("<Delete>", lambda event: on_delete_record(tree, error_label))
+    root.bind("<Control-h>", lambda event: on_replace_records(tree, error_label))
+    root.bind("<Control-H>", lambda event: on_replace_records(tree, error_label))
+    
     return root, error_label, tree
 
 def show_error(error_label, message):
@@ -625,26 +5276,1019 @@ def show_error(error_label, message):
     error_label.config(text=message)
     error_label.after(5000, lambda: error_label.config(text=""))
 
+# =============================================================================
+# HTTP API
+# `python main.py serve` runs a small asyncio HTTP/1.1 server on localhost so
+# other tools can read and write the notes. The event loop only parses
+# requests and writes responses; every database call runs on a thread pool
+# whose threads each keep their pooled connection (reads), or on a single
+# writer thread, since SQLite allows one writer at a time anyway.
+# =============================================================================
+
+def api_error_status(error):
+    """Map a database error message to an HTTP status code."""
+    if is_conflict_error(error):
+        return 409
+    if is_locked_error(error):
+        return 503
+    return 500
+
+def api_host_allowed(host_header):
+    """Return True if a Host header names the loopback interface (or is missing)."""
+    host = host_header.lower()
+    host = host[:host.find("]") + 1] if host.startswith("[") else host.partition(":")[0]
+    return host in ("", "127.0.0.1", "localhost", "[::1]")
+
+def parse_api_view(query):
+    """
+    Build a get_notes_page view from list query parameters.
+    
+    Args:
+        query (dict): Query parameters (sort, desc, prefix)
+        
+    Returns:
+        dict: View with sort, descending and prefix
+        
+    Raises:
+        ValueError: If sort is not a known order
+    """
+    sort = query.get("sort") or "id"
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+    return {"sort": sort, "descending": query.get("desc", "") not in ("", "0", "false"),
+            "prefix": query.get("prefix", "")}
+
+def parse_api_limit(query, default):
+    """
+    Read the limit query parameter of a list or search request.
+    
+    Args:
+        query (dict): Query parameters
+        default (int): Limit when the parameter is absent or empty
+        
+    Returns:
+        int: The limit, 1 to API_PAGE_MAX
+        
+    Raises:
+        ValueError: If limit is not a whole number in that range
+    """
+    value = query.get("limit")
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= API_PAGE_MAX:
+        raise ValueError(f"limit must be a whole number from 1 to {API_PAGE_MAX}")
+    return limit
+
+def iter_view_chunks(view, chunk_size=EXPORT_CHUNK_SIZE, after_id=None):
+    """
+    Stream the notes of a view chunk by chunk, by keyset pages.
+    
+    Note ID order without a filter streams through iter_note_chunks (one
+    statement, one snapshot); other views, and any view starting after a
+    note, page with get_notes_page.
+    
+    Args:
+        view (dict): get_notes_page view
+        chunk_size (int, optional): Notes per chunk
+        after_id (int, optional): Start after this note in the view's order
+    
+    Raises:
+        sqlite3.Error: If a query fails (as a RuntimeError with its message)
+    """
+    plain = view["sort"] in (None, "id") and not view["descending"] and not view["prefix"]
+    if plain and after_id is None:
+        yield from iter_note_chunks(chunk_size)
+        return
+    while True:
+        success, page = get_notes_page(chunk_size, after_id=after_id, view=view)
+        if not success:
+            raise RuntimeError(page)
+        if not page:
+            return
+        yield page
+        after_id = page[-1][0]
+
+async def read_api_request(reader):
+    """
+    Read one HTTP/1.1 request from a connection.
+    
+    Args:
+        reader (asyncio.StreamReader): The client connection
+        
+    Returns:
+        dict|None: method, path, query, headers, body and keep_alive, or
+                   None when the client closed the connection
+        
+    Raises:
+        ValueError: If the request is malformed or its body is too large
+    """
+    from urllib.parse import urlsplit, parse_qsl, unquote
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("Malformed request line")
+    
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= 100:
+            raise ValueError("Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    
+    length = int(headers.get("content-length") or 0)
+    if length > API_MAX_BODY:
+        raise ValueError(f"Request body larger than {API_MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    
+    connection = headers.get("connection", "").lower()
+    url = urlsplit(target)
+    return {"method": method.upper(),
+            "path": unquote(url.path),
+            "query": dict(parse_qsl(url.query)),
+            "headers": headers,
+            "body": body,
+            "keep_alive": connection != "close" and (version == "HTTP/1.1"
+                                                     or connection == "keep-alive")}
+
+async def send_api_response(request, status, payload=None):
+    """
+    Send a JSON response (or an empty 204) on the request's connection.
+    
+    Args:
+        request (dict): The request (see read_api_request) with its writer
+        status (int): HTTP status code
+        payload (dict, optional): JSON body; errors are {"error": message}
+    """
+    import json
+    from http import HTTPStatus
+    body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if request['keep_alive'] else 'close'}\r\n\r\n")
+    request["status"] = status
+    request["writer"].write(head.encode("latin-1") + body)
+    await request["writer"].drain()
+
+async def stream_api_response(request, content_type, header, iter_chunks, format_chunk):
+    """
+    Stream a large response with chunked transfer encoding.
+    
+    The chunks are read and formatted on a stream worker thread and handed
+    to the event loop through a queue of API_STREAM_QUEUE chunks, so a slow
+    client holds the reader back instead of letting memory grow. Stream
+    workers are a pool of their own (API_STREAM_WORKERS): a slow client
+    holds its thread for the whole transfer, and on the read pool a few of
+    them would starve every page, get and search request. Streams beyond
+    the pool's size wait for a free thread. If the
+    client goes away the reader stops after its current chunk. A database
+    error after the headers were sent ends the connection without the final
+    empty chunk, so clients see the response as incomplete.
+    
+    Args:
+        request (dict): The request with its writer and executors
+        content_type (str): Response Content-Type
+        header (str): Text sent before the first chunk
+        iter_chunks (callable): Returns an iterator of note chunks; runs on the worker thread
+        format_chunk (callable): Formats one chunk as text
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue(API_STREAM_QUEUE)
+    cancel = threading.Event()
+    writer = request["writer"]
+    
+    def produce():
+        try:
+            for chunk in iter_chunks():
+                if cancel.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(
+                    chunks.put(format_chunk(chunk).encode("utf-8")), loop).result()
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(chunks.put(e), loop).result()
+        finally:
+            asyncio.run_coroutine_threadsafe(chunks.put(None), loop).result()
+    
+    producer = loop.run_in_executor(request["executors"]["stream"], produce)
+    request["status"] = 200
+    writer.write((f"HTTP/1.1 200 OK\r\n"
+                  f"Content-Type: {content_type}; charset=utf-8\r\n"
+                  f"Transfer-Encoding: chunked\r\n"
+                  f"Connection: {'keep-alive' if request['keep_alive'] else 'close'}\r\n\r\n"
+                  ).encode("latin-1"))
+    pending = [header.encode("utf-8")] if header else []
+    try:
+        while True:
+            data = pending.pop() if pending else await chunks.get()
+            if data is None:
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+                break
+            if isinstance(data, Exception):
+                request["keep_alive"] = False
+                request["status"] = 500
+                break
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+    finally:
+        cancel.set()
+        while not producer.done():
+            # Unblock the worker if it is waiting for queue space
+            while not chunks.empty():
+                chunks.get_nowait()
+            await asyncio.sleep(0.001)
+
+async def run_api_db(request, kind, func, *args):
+    """Run a database function on the read pool or the writer thread and return its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request["executors"][kind], functools.partial(func, *args))
+
+def api_note_body(request):
+    """
+    Return the validated note text (and optional version) of a POST/PUT body.
+    
+    Returns:
+        tuple: (note_text: str, version: int|None)
+        
+    Raises:
+        ValueError: If the body is not {"note": "...", "version": N} JSON or
+                    the text breaks the note rules
+    """
+    import json
+    try:
+        body = json.loads(request["body"] or b"null")
+    except ValueError:
+        raise ValueError("Request body is not valid JSON")
+    if not isinstance(body, dict) or not isinstance(body.get("note"), str):
+        raise ValueError('Expected a JSON object {"note": "..."}')
+    note_text = body["note"].strip()
+    problem = check_note_text(note_text)
+    if problem:
+        raise ValueError(problem)
+    version = body.get("version")
+    # JSON true/false arrive as bool, a subclass of int
+    if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+        raise ValueError("version must be an integer")
+    return note_text, version
+
+async def api_list_notes(request):
+    """
+    GET /notes?limit=N&cursor=C&sort=id|note&desc=1&prefix=TEXT
+    
+    One page of notes with next_cursor, the cursor of the following page
+    (null on the last one). Pages are located by keyset, so walking a
+    million notes costs the same per page at the end as at the start.
+    With stream=1 the whole view is sent as chunked JSON Lines instead.
+    """
+    query = request["query"]
+    view = parse_api_view(query)
+    if query.get("stream", "") not in ("", "0", "false"):
+        await stream_api_response(request, "application/x-ndjson", "",
+                                  lambda: iter_view_chunks(view), format_jsonl_rows)
+        return
+    limit = parse_api_limit(query, API_PAGE_SIZE)
+    after_id = int(query["cursor"]) if query.get("cursor") else None
+    if after_id is not None and abs(after_id) > 2 ** 63 - 1:
+        raise ValueError("cursor is out of range")
+    success, page = await run_api_db(request, "read", get_notes_page, limit + 1, after_id, None, 0, view)
+    if not success:
+        await send_api_response(request, api_error_status(page), {"error": page})
+        return
+    # One extra row tells whether another page follows
+    next_cursor = str(page[limit - 1][0]) if len(page) > limit else None
+    await send_api_response(request, 200, {
+        "notes": [{"note_id": note_id, "note": note_text} for note_id, note_text in page[:limit]],
+        "next_cursor": next_cursor})
+
+async def api_get_note(request, note_id):
+    """GET /notes/{id}: the note with its version (for PUT)."""
+    success, note = await run_api_db(request, "read", get_note, note_id)
+    if not success:
+        await send_api_response(request, 404 if note.endswith("not found") else api_error_status(note),
+                                {"error": note})
+        return
+    await send_api_response(request, 200, dict(zip(("note_id", "note", "version"), note)))
+
+async def api_add_note(request):
+    """POST /notes {"note": "..."}: add a note; 201 with its note_id."""
+    note_text, version = api_note_body(request)
+    success, change = await run_api_db(request, "write", add_note, note_text)
+    if not success:
+        await send_api_response(request, api_error_status(change), {"error": change})
+        return
+    await send_api_response(request, 201, {"note_id": change[0], "note": change[1], "version": 1})
+
+def update_and_get_note(note_id, note_text, version):
+    """Update a note and read it back (for the API, on the writer thread)."""
+    success, note = get_note(note_id)
+    if not success:
+        return success, note
+    success, change = update_note(note_id, note_text, version)
+    if not success:
+        return success, change
+    return get_note(note_id)
+
+async def api_update_note(request, note_id):
+    """
+    PUT /notes/{id} {"note": "...", "version": N}: replace a note's text.
+    
+    With version the update only applies if nobody saved the note since
+    that version was read, otherwise 409 Conflict.
+    """
+    note_text, version = api_note_body(request)
+    success, note = await run_api_db(request, "write", update_and_get_note, note_id, note_text, version)
+    if not success:
+        await send_api_response(request, 404 if note.endswith("not found") else api_error_status(note),
+                                {"error": note})
+        return
+    await send_api_response(request, 200, dict(zip(("note_id", "note", "version"), note)))
+
+async def api_delete_note(request, note_id):
+    """DELETE /notes/{id}: 204 whether or not the note existed."""
+    success, change = await run_api_db(request, "write", delete_note, note_id)
+    if not success:
+        await send_api_response(request, api_error_status(change), {"error": change})
+        return
+    await send_api_response(request, 204)
+
+async def api_search(request):
+    """GET /search?q=WORDS&limit=N: full-text search, best matches first, with snippets."""
+    query = request["query"]
+    limit = parse_api_limit(query, min(SEARCH_RESULT_LIMIT, API_PAGE_MAX))
+    success, results = await run_api_db(request, "read", search_notes, query.get("q", ""), limit)
+    if not success:
+        await send_api_response(request, api_error_status(results), {"error": results})
+        return
+    await send_api_response(request, 200, {
+        "notes": [{"note_id": note_id, "snippet": snippet} for note_id, snippet in results]})
+
+async def api_export(request):
+    """GET /export?format=jsonl|csv|md|txt: every note, streamed as the export file would be."""
+    kind = request["query"].get("format", "jsonl")
+    content_types = {"jsonl": "application/x-ndjson", "csv": "text/csv",
+                     "md": "text/markdown", "txt": "text/plain"}
+    if kind not in content_types:
+        raise ValueError(f"format must be one of {', '.join(content_types)}")
+    header, format_chunk = text_export_format(kind, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    await stream_api_response(request, content_types[kind], header, iter_note_chunks, format_chunk)
+
+# (method, path pattern, handler); groups in the pattern are passed as int arguments
+API_ROUTES = (
+    ("GET", r"/notes", api_list_notes),
+    ("POST", r"/notes", api_add_note),
+    ("GET", r"/notes/(\d+)", api_get_note),
+    ("PUT", r"/notes/(\d+)", api_update_note),
+    ("DELETE", r"/notes/(\d+)", api_delete_note),
+    ("GET", r"/search", api_search),
+    ("GET", r"/export", api_export),
+)
+
+async def dispatch_api_request(request):
+    """
+    Route a request to its handler and turn failures into JSON errors.
+    
+    Requests whose Host is not a loopback name are refused (a web page
+    cannot reach the API through DNS rebinding), and writes must be sent as
+    application/json, which browsers cannot do cross-origin without a
+    CORS preflight this server never approves.
+    """
+    if not api_host_allowed(request["headers"].get("host", "")):
+        await send_api_response(request, 403, {"error": "Only local clients may use this API"})
+        return
+    if request["method"] in ("POST", "PUT") and not request["headers"].get(
+            "content-type", "").startswith("application/json"):
+        await send_api_response(request, 415, {"error": "Send the body as application/json"})
+        return
+    
+    allowed = []
+    for method, pattern, handler in API_ROUTES:
+        match = re.fullmatch(pattern, request["path"])
+        if not match:
+            continue
+        if method != request["method"]:
+            allowed.append(method)
+            continue
+        # Endpoint name for the instrumentation, e.g. "/notes/{id}"
+        request["endpoint"] = pattern.replace(r"(\d+)", "{id}")
+        ids = [int(group) for group in match.groups()]
+        # Note IDs are 64-bit SQLite integers: a larger one names no note
+        # (and would make SQLite raise OverflowError)
+        if any(note_id > 2 ** 63 - 1 for note_id in ids):
+            await send_api_response(request, 404, {"error": f"Note {match.group(1)} not found"})
+            return
+        try:
+            await handler(request, *ids)
+        except ValueError as e:
+            await send_api_response(request, 400, {"error": str(e)})
+        except Exception as e:
+            request["keep_alive"] = False
+            await send_api_response(request, 500, {"error": str(e)})
+        return
+    if allowed:
+        await send_api_response(request, 405, {"error": f"Use {' or '.join(allowed)}"})
+    else:
+        await send_api_response(request, 404, {"error": f"No such endpoint: {request['path']}"})
+
+async def handle_api_connection(reader, writer, executors):
+    """Serve the requests of one client connection (keep-alive) until it closes."""
+    try:
+        while True:
+            try:
+                request = await read_api_request(reader)
+            except ValueError as e:
+                request = {"keep_alive": False, "writer": writer}
+                await send_api_response(request, 400, {"error": str(e)})
+                break
+            if request is None:
+                break
+            request["writer"] = writer
+            request["executors"] = executors
+            started = time.perf_counter()
+            await dispatch_api_request(request)
+            if INSTRUMENTATION_ENABLED:
+                record_operation(f"api {request['method']} {request.get('endpoint', '(unknown)')}",
+                                 time.perf_counter() - started, error=request.get("status", 500) >= 500)
+            if not request["keep_alive"]:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except asyncio.CancelledError:
+        # Server shutting down (Ctrl+C) while the client kept its connection
+        # open; ending quietly avoids a spurious traceback on Python 3.11
+        pass
+    finally:
+        writer.close()
+
+async def serve_api(port=API_PORT, read_workers=API_READ_WORKERS, ready=None):
+    """
+    Run the HTTP API on API_HOST until cancelled.
+    
+    Args:
+        port (int, optional): TCP port (0 picks a free one)
+        read_workers (int, optional): Threads serving reads, one pooled connection each
+        ready (callable, optional): Called with the bound port once listening
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    executors = {"read": ThreadPoolExecutor(read_workers, thread_name_prefix="api-read"),
+                 "stream": ThreadPoolExecutor(API_STREAM_WORKERS, thread_name_prefix="api-stream"),
+                 "write": ThreadPoolExecutor(1, thread_name_prefix="api-write")}
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_api_connection(reader, writer, executors), API_HOST, port)
+    try:
+        if ready:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+
+def run_api_server(port=API_PORT, read_workers=API_READ_WORKERS):
+    """
+    Serve the HTTP API until interrupted (Ctrl+C).
+    
+    Returns:
+        tuple: (success: bool, error: str|None)
+    """
+    global asyncio
+    import asyncio
+    
+    def ready(bound_port):
+        print(f"Serving the notes API on http://{API_HOST}:{bound_port}/ "
+              f"({read_workers} read workers); Ctrl+C stops", file=sys.stderr, flush=True)
+    
+    try:
+        asyncio.run(serve_api(port, read_workers, ready))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        return False, str(e)
+    return True, None
+
+# =============================================================================
+# COMMAND LINE INTERFACE
+# Headless subcommands that call the database, export and import functions
+# directly. Nothing here touches Tkinter, so scripted jobs start quickly and
+# run on servers without a display. Output is one note per line as
+# "note_id<TAB>note" (or JSON lines with --json); errors go to stderr with a
+# non-zero exit code.
+# =============================================================================
+
+def print_notes(rows, as_json=False):
+    """Write (note_id, text) rows to stdout as tab-separated text or JSON lines."""
+    if as_json:
+        import json
+        sys.stdout.write("".join(json.dumps({"note_id": note_id, "note": text}) + "\n"
+                                 for note_id, text in rows))
+    else:
+        sys.stdout.write(format_text_rows(rows) if rows else "")
+
+def read_note_argument(text):
+    """Return the note text from the command line, or stdin when it is "-"."""
+    return (sys.stdin.read() if text == "-" else text).strip()
+
+def cli_list(args):
+    """List notes in note_id order, or sorted/filtered with --sort/--desc/--prefix."""
+    view = {"sort": args.sort, "descending": args.desc, "prefix": args.prefix or ""}
+    if args.limit is not None and args.limit < 0:
+        return False, "--limit must be 0 or more"
+    if args.limit is None:
+        # Stream the rest of the view without loading it into memory
+        try:
+            for chunk in iter_view_chunks(view, after_id=args.after):
+                print_notes(chunk, args.json)
+        except (sqlite3.Error, RuntimeError) as e:
+            return False, str(e)
+        return True, None
+    if args.limit == 0:
+        return True, None
+    success, rows = get_notes_page(args.limit, after_id=args.after, view=view)
+    if success:
+        print_notes(rows, args.json)
+    return success, rows
+
+def cli_get(args):
+    """Print one note; --json includes its version for update --if-version."""
+    success, note = get_note(args.note_id)
+    if not success:
+        return success, note
+    note_id, note_text, version = note
+    if args.json:
+        import json
+        print(json.dumps({"note_id": note_id, "note": note_text, "version": version}))
+    else:
+        print_notes([(note_id, note_text)])
+    return True, None
+
+def warn_similar_notes(note_text, exclude_id=None):
+    """Print the notes a text duplicates to stderr (the save goes ahead regardless)."""
+    success, matches = find_similar_notes(note_text, exclude_id)
+    if success and matches:
+        print(describe_similar_notes(matches), file=sys.stderr)
+
+def cli_add(args):
+    """Add a note and print its new ID."""
+    note_text = read_note_argument(args.text)
+    problem = check_note_text(note_text)
+    if problem:
+        return False, problem
+    warn_similar_notes(note_text)
+    success, result = add_note(note_text)
+    if success:
+        print(result[0])
+    return success, result
+
+def cli_update(args):
+    """Replace the text of an existing note."""
+    note_text = read_note_argument(args.text)
+    problem = check_note_text(note_text)
+    if problem:
+        return False, problem
+    success, result = get_note(args.note_id)
+    if not success:
+        return success, result
+    warn_similar_notes(note_text, args.note_id)
+    return update_note(args.note_id, note_text, args.if_version)
+
+def cli_delete(args):
+    """Delete notes by ID, all in one transaction."""
+    success, result = delete_notes(args.note_ids)
+    return success, None if success else result
+
+def cli_replace(args):
+    """Find and replace text in the given notes, or in every note."""
+    success, result = replace_in_notes(args.find, args.replacement, args.ids)
+    if not success:
+        return success, result
+    print(f"Changed {len(result['changes']):,} notes", file=sys.stderr)
+    if result["skipped"]:
+        print(f"Left {len(result['skipped']):,} notes unchanged (result empty or too long): "
+              + " ".join(str(note_id) for note_id in result["skipped"]), file=sys.stderr)
+    return True, None
+
+def cli_search(args):
+    """Full-text search, best matches first."""
+    success, rows = search_notes(" ".join(args.words), limit=args.limit)
+    if success:
+        print_notes(rows, args.json)
+    return success, rows
+
+def cli_duplicates(args):
+    """Print groups of duplicate and near-duplicate notes, largest first."""
+    success, report = find_duplicate_groups(args.threshold)
+    if not success:
+        return success, report
+    groups = [group for group in report["groups"] if group["exact"] or not args.exact]
+    if args.json:
+        import json
+        sys.stdout.write("".join(json.dumps({"exact": group["exact"], "notes": [
+            {"note_id": note_id, "similarity": round(similarity, 3), "note": note_text}
+            for note_id, similarity, note_text in group["notes"]]}) + "\n" for group in groups))
+    else:
+        for number, group in enumerate(groups, 1):
+            kind = "exact duplicates" if group["exact"] else "near-duplicates"
+            sys.stdout.write(f"Group {number}: {len(group['notes'])} {kind}\n" + "".join(
+                f"  {note_id}\t{similarity:.0%}\t{note_text}\n"
+                for note_id, similarity, note_text in group["notes"]))
+    print(format_duplicate_summary(report), file=sys.stderr)
+    return True, None
+
+def cli_export(args):
+    """Export to .xlsx, .md, .txt, .csv or .jsonl (+ .gz/.zst) by extension, in one scan."""
+    start = time.perf_counter()
+    success, result = write_export_bundle(args.filenames, parallel=args.parallel)
+    if success:
+        elapsed = time.perf_counter() - start
+        print(f"Exported {result:,} notes to {', '.join(args.filenames)} "
+              f"({result / elapsed if elapsed else 0:,.0f} rows/sec)", file=sys.stderr)
+    return success, result
+
+def cli_export_delta(args):
+    """Export notes changed since the last delta export to --target as CSV."""
+    success, since = get_export_watermark(args.target)
+    if not success:
+        return False, since
+    start = time.perf_counter()
+    success, result = write_delta_export(args.filename, args.target, args.full)
+    if success:
+        scope = "all notes" if args.full or since is None else f"changes since {format_timestamp(since)}"
+        print(f"Exported {result:,} rows ({scope}) to {args.filename} "
+              f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return success, result
+
+def cli_backup(args):
+    """Hot backup of the database to a file, in steps, while other processes keep writing."""
+    success, result = backup_database(args.filename, pages=args.pages)
+    if success:
+        print(f"Backed up {result['bytes'] / 2**20:.1f} MiB to {args.filename} "
+              f"in {result['seconds']:.2f}s", file=sys.stderr)
+    return success, result
+
+def cli_maintain(args):
+    """Prune tombstones, ANALYZE and vacuum now (a full VACUUM with --vacuum)."""
+    success, result = run_maintenance(analyze=not args.no_analyze,
+                                      vacuum="full" if args.vacuum else None,
+                                      prune=not args.keep_tombstones)
+    if success:
+        print(f"Maintenance {format_maintenance_summary(result)}", file=sys.stderr)
+        if result["after"]["auto_vacuum"] != "incremental":
+            print("Free pages are only released by a full VACUUM for this database "
+                  "(created before auto_vacuum): run maintain --vacuum once", file=sys.stderr)
+    return success, result
+
+def cli_serve(args):
+    """Serve the HTTP API on localhost until interrupted."""
+    return run_api_server(args.port, args.workers)
+
+def cli_import(args):
+    """Bulk import a CSV, Markdown, plain-text or Excel file."""
+    success, result = import_notes(args.filename)
+    if success:
+        rate = result["imported"] / result["seconds"] if result["seconds"] else 0
+        print(f"Imported {result['imported']:,} notes, rejected {result['rejected']:,} "
+              f"({rate:,.0f} rows/sec)", file=sys.stderr)
+    return success, result
+
+def build_cli_parser():
+    """Create the argparse parser for the command line interface."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Demo Notes. Run without arguments to open the window.")
+    parser.add_argument("--db", help=f"database file (default: {DB_FILE})")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print startup timings to stderr once the window is shown")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="close the window as soon as it is shown (for timing runs)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record operation timings and log slow SQL statements to stderr")
+    parser.add_argument("--slow-ms", type=float,
+                        help=f"slow statement threshold in ms (default: {SLOW_STATEMENT_MS})")
+    parser.add_argument("--stats-json", metavar="FILE",
+                        help="write the timings to FILE on exit (implies --instrument)")
+    parser.add_argument("--stall-ms", type=float, metavar="MS",
+                        help=f"log UI stalls longer than MS with the Tk thread's stack "
+                             f"(default: {STALL_THRESHOLD_MS}; 0 turns it off)")
+    parser.add_argument("--stall-log", metavar="FILE",
+                        help=f"rotating stall log (default: {STALL_LOG_FILE} next to the database)")
+    parser.add_argument("--busy-timeout", type=int, metavar="MS",
+                        help=f"wait this long for another writer's lock (default: {DB_BUSY_TIMEOUT_MS})")
+    parser.add_argument("--journal-mode", type=str.upper, choices=DB_JOURNAL_MODES,
+                        help=f"SQLite journal mode (default: {DB_JOURNAL_MODE}; "
+                             "DELETE when notes.db is shared between machines)")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    p_list = subparsers.add_parser("list", help="print notes in ID order")
+    p_list.add_argument("--limit", type=int, help="maximum notes to print")
+    p_list.add_argument("--after", type=int, help="only notes after this ID in the listing order")
+    p_list.add_argument("--sort", choices=sorted(SORT_ORDERS), help="sort by ID or note text")
+    p_list.add_argument("--desc", action="store_true", help="reverse the order")
+    p_list.add_argument("--prefix", help="only notes starting with this text (case-insensitive)")
+    p_list.add_argument("--json", action="store_true", help="JSON lines output")
+    p_list.set_defaults(func=cli_list)
+    
+    p_get = subparsers.add_parser("get", help="print one note")
+    p_get.add_argument("note_id", type=int)
+    p_get.add_argument("--json", action="store_true", help="JSON output, including the note's version")
+    p_get.set_defaults(func=cli_get)
+    
+    p_add = subparsers.add_parser("add", help="add a note, print its ID")
+    p_add.add_argument("text", help='note text, or "-" to read stdin')
+    p_add.set_defaults(func=cli_add)
+    
+    p_update = subparsers.add_parser("update", help="replace a note's text")
+    p_update.add_argument("note_id", type=int)
+    p_update.add_argument("text", help='new text, or "-" to read stdin')
+    p_update.add_argument("--if-version", type=int, metavar="N",
+                          help="only update if the note is still at version N (see get --json)")
+    p_update.set_defaults(func=cli_update)
+    
+    p_delete = subparsers.add_parser("delete", help="delete notes")
+    p_delete.add_argument("note_ids", type=int, nargs="+", metavar="note_id")
+    p_delete.set_defaults(func=cli_delete)
+    
+    p_replace = subparsers.add_parser("replace", help="find and replace text in notes")
+    p_replace.add_argument("find", help="text to look for (case-sensitive)")
+    p_replace.add_argument("replacement")
+    p_replace.add_argument("--ids", type=int, nargs="+", metavar="note_id",
+                           help="only edit these notes (default: every note containing FIND)")
+    p_replace.set_defaults(func=cli_replace)
+    
+    p_search = subparsers.add_parser("search", help="full-text search")
+    p_search.add_argument("words", nargs="+")
+    p_search.add_argument("--limit", type=int, default=SEARCH_RESULT_LIMIT)
+    p_search.add_argument("--json", action="store_true", help="JSON lines output")
+    p_search.set_defaults(func=cli_search)
+    
+    p_duplicates = subparsers.add_parser("duplicates",
+                                         help="list groups of duplicate and near-duplicate notes")
+    p_duplicates.add_argument("--threshold", type=float, default=DUPLICATE_SIMILARITY,
+                              help=f"lowest estimated similarity, 0-1 (default: {DUPLICATE_SIMILARITY})")
+    p_duplicates.add_argument("--exact", action="store_true",
+                              help="only notes equal apart from case, spacing and punctuation")
+    p_duplicates.add_argument("--json", action="store_true", help="one JSON line per group")
+    p_duplicates.set_defaults(func=cli_duplicates)
+    
+    p_export = subparsers.add_parser("export",
+                                     help="export to .xlsx, .md, .txt, .csv, .jsonl (+ .gz/.zst)")
+    p_export.add_argument("filenames", nargs="+", metavar="filename",
+                          help="one file per format, all written from one scan of the notes")
+    p_export.add_argument("--parallel", action="store_true",
+                          help="run each format's writer on its own thread")
+    p_export.set_defaults(func=cli_export)
+    
+    p_delta = subparsers.add_parser("export-delta",
+                                    help="CSV of notes changed since the last delta export")
+    p_delta.add_argument("filename", help=".csv, optionally .gz/.zst")
+    p_delta.add_argument("--target", default=DELTA_EXPORT_TARGET,
+                         help=f"watermark name, one per sync destination "
+                              f"(default: {DELTA_EXPORT_TARGET})")
+    p_delta.add_argument("--full", action="store_true",
+                         help="export every note and restart the delta from now")
+    p_delta.set_defaults(func=cli_export_delta)
+    
+    p_import = subparsers.add_parser("import", help="import .csv, .md, .txt or .xlsx")
+    p_import.add_argument("filename")
+    p_import.set_defaults(func=cli_import)
+    
+    p_serve = subparsers.add_parser("serve", help=f"HTTP/JSON API on {API_HOST} for other tools")
+    p_serve.add_argument("--port", type=int, default=API_PORT, help=f"default: {API_PORT}")
+    p_serve.add_argument("--workers", type=int, default=API_READ_WORKERS,
+                         help=f"threads serving reads (default: {API_READ_WORKERS})")
+    p_serve.set_defaults(func=cli_serve)
+    
+    p_backup = subparsers.add_parser("backup", help="online backup to a database file")
+    p_backup.add_argument("filename")
+    p_backup.add_argument("--pages", type=int, default=BACKUP_STEP_PAGES,
+                          help=f"pages copied per step (default: {BACKUP_STEP_PAGES})")
+    p_backup.set_defaults(func=cli_backup)
+    
+    p_maintain = subparsers.add_parser("maintain",
+                                       help="prune tombstones, ANALYZE and release free pages")
+    p_maintain.add_argument("--vacuum", action="store_true",
+                            help="full VACUUM: defragments and enables incremental vacuum "
+                                 "on older databases; blocks writers while it runs")
+    p_maintain.add_argument("--no-analyze", action="store_true", help="skip ANALYZE")
+    p_maintain.add_argument("--keep-tombstones", action="store_true",
+                            help="keep tombstones of notes already delta-exported")
+    p_maintain.set_defaults(func=cli_maintain)
+    return parser
+
+def run_cli(args):
+    """
+    Run one command line subcommand.
+    
+    Args:
+        args (argparse.Namespace): Parsed arguments with a subcommand
+        
+    Returns:
+        int: Process exit code (0 on success)
+    """
+    try:
+        success, error = init_database()
+        if success:
+            success, error = args.func(args)
+    except BrokenPipeError:
+        # Output piped into head/less that exited early
+        return 0
+    finally:
+        close_connection()
+        write_stats_json(args)
+    
+    if not success:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+def configure_instrumentation(args=None):
+    """
+    Enable instrumentation from the command line or the environment.
+    
+    NOTES_INSTRUMENT=1 and NOTES_SLOW_MS=<ms> work like --instrument and
+    --slow-ms, for launchers where adding arguments is awkward.
+    
+    Args:
+        args (argparse.Namespace, optional): Parsed arguments, if any
+    """
+    enabled = os.environ.get("NOTES_INSTRUMENT", "") not in ("", "0")
+    slow_ms = environment_number("NOTES_SLOW_MS")
+    if args is not None:
+        enabled = enabled or args.instrument or bool(args.stats_json)
+        slow_ms = args.slow_ms if args.slow_ms is not None else slow_ms
+    if enabled:
+        set_instrumentation(True, slow_ms)
+
+def configure_stall_watchdog(args=None):
+    """
+    Apply --stall-ms and --stall-log from the command line or the environment.
+    
+    NOTES_STALL_MS and NOTES_STALL_LOG work like the flags.
+    
+    Args:
+        args (argparse.Namespace, optional): Parsed arguments, if any
+    """
+    global STALL_THRESHOLD_MS, STALL_LOG_FILE
+    threshold = environment_number("NOTES_STALL_MS")
+    log_file = os.environ.get("NOTES_STALL_LOG") or None
+    if args is not None:
+        threshold = args.stall_ms if args.stall_ms is not None else threshold
+        log_file = args.stall_log or log_file
+    if threshold is not None:
+        STALL_THRESHOLD_MS = threshold
+    if log_file is not None:
+        # Relative to the working directory, not the database's folder
+        STALL_LOG_FILE = os.path.abspath(log_file)
+
+def environment_number(name, convert=float):
+    """
+    Read a non-negative number from an environment variable.
+    
+    Args:
+        name (str): Variable name
+        convert (callable, optional): int or float
+        
+    Returns:
+        int|float|None: The value, or None if the variable is unset, empty
+                        or invalid (invalid values are ignored with a warning)
+    """
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        number = convert(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        print(f"Ignoring {name}={value!r}: expected a number of 0 or more", file=sys.stderr)
+        return None
+    return number
+
+def configure_database(args=None):
+    """
+    Apply --busy-timeout and --journal-mode from the command line or the environment.
+    
+    NOTES_BUSY_TIMEOUT_MS and NOTES_JOURNAL_MODE work like the flags. Use a
+    longer busy timeout when many instances share one notes.db, and the
+    DELETE journal mode when they run on different machines (WAL needs
+    every process on the same host).
+    
+    Args:
+        args (argparse.Namespace, optional): Parsed arguments, if any
+    """
+    global DB_BUSY_TIMEOUT_MS, DB_JOURNAL_MODE
+    timeout = environment_number("NOTES_BUSY_TIMEOUT_MS", int)
+    journal = os.environ.get("NOTES_JOURNAL_MODE") or None
+    if args is not None:
+        timeout = args.busy_timeout if args.busy_timeout is not None else timeout
+        journal = args.journal_mode or journal
+    if timeout is not None:
+        DB_BUSY_TIMEOUT_MS = timeout
+    if journal is not None:
+        if journal.upper() in DB_JOURNAL_MODES:
+            DB_JOURNAL_MODE = journal.upper()
+        else:
+            print(f"Ignoring unknown journal mode {journal!r}", file=sys.stderr)
+
+def write_stats_json(args):
+    """Write the instrumentation statistics to --stats-json, if it was given."""
+    if args is not None and args.stats_json:
+        success, result = dump_instrumentation(args.stats_json)
+        if not success:
+            print(f"Could not write {args.stats_json}: {result}", file=sys.stderr)
+
 # =============================================================================
 # APPLICATION ENTRY POINT
 # Main function that initializes database and starts the GUI application
 # =============================================================================
 
-def main():
-    """Main application entry point."""
+def main(argv=None):
+    """
+    Main application entry point.
+    
+    With command line arguments the headless CLI runs instead of the window.
+    
+    Args:
+        argv (list, optional): Arguments after the program name (defaults to sys.argv[1:])
+        
+    Returns:
+        int: Process exit code
+    """
+    global DB_FILE, READ_CACHE_ENABLED
+    argv = sys.argv[1:] if argv is None else argv
+    show_report = exit_after_startup = False
+    args = None
+    if argv:
+        args = build_cli_parser().parse_args(argv)
+        if args.db:
+            DB_FILE = args.db
+        show_report, exit_after_startup = args.startup_report, args.exit_after_startup
+    configure_instrumentation(args)
+    configure_database(args)
+    configure_stall_watchdog(args)
+    if args is not None and args.command:
+        return run_cli(args)
+    mark_startup("main.py imported")
+    
+    load_gui()
     success, error = init_database()
+    mark_startup("database ready")
     if not success:
         root = tk.Tk()
         root.withdraw()
         messagebox.showerror("Database Error", f"Failed to initialize database: {error}")
-        return
+        return 1
     
     root, error_label, tree = create_main_window()
+    mark_startup("window created")
+    
+    # Pick up notes saved by other windows or processes sharing the file
+    watch_database(tree, error_label)
+    
+    # Prune, ANALYZE and vacuum in the background while the user is away
+    schedule_maintenance(root)
+    
+    # Serve grid pages and exports from memory once the cache has loaded;
+    # the first page below still comes straight from SQLite
+    READ_CACHE_ENABLED = True
+    start_cache_reload(delay=0)
     
     # Load initial data
     refresh_notes_grid(tree, error_label)
+    mark_startup("first grid page loaded")
+    
+    def on_first_idle():
+        # Runs once mainloop has drawn the window for the first time
+        mark_startup("window shown (time to first window)")
+        # Log event loop stalls from here on; startup has its own report
+        start_stall_watchdog(root)
+        if show_report:
+            print(startup_report(), file=sys.stderr)
+        if exit_after_startup:
+            root.quit()
     
-    root.mainloop()
+    root.after_idle(on_first_idle)
+    
+    try:
+        root.mainloop()
+    finally:
+        # Commit queued writes, then release the pooled connection so the
+        # WAL is checkpointed on exit
+        stop_stall_watchdog()
+        stop_writer()
+        close_note_cache()
+        close_connection()
+        write_stats_json(args)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file